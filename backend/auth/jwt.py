@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import time
+import uuid
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -10,50 +12,185 @@ import os
 
 # Agregar el directorio padre al path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS,
+    JWT_DECODE_CACHE_SIZE, JWT_DECODE_CACHE_TTL
+)
 
 from database.database import get_db
 from models_simple import User
+from auth.passwords import pwd_context
+from auth.principals import Principal, principal_cache
+from auth.keys import signing_keys
+from auth.revocation import revocation_list
+from services.cache import MISSING, TTLCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+principal_cache.watch(User)
 
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+# sha256(token) -> claims de tokens cuya firma ya se verificó
+decoded_token_cache = TTLCache(max_size=JWT_DECODE_CACHE_SIZE, ttl=JWT_DECODE_CACHE_TTL)
+
+# Versiones síncronas para scripts; en rutas usar auth.passwords.password_hasher
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def access_token_claims(user) -> dict:
+    """Claims del access token; user_type e is_active permiten autorizar sin consultar la tabla users"""
+    principal = Principal.from_user(user)
+    return {"sub": str(principal.id), "user_type": principal.user_type, "is_active": principal.is_active}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        expire = now + timedelta(minutes=15)
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    # iat con fracción de segundo: se compara contra los cortes de revocación por usuario
+    to_encode.update({"exp": expire, "iat": time.time()})
+    if signing_keys.signing_key is None:
+        raise RuntimeError("Este nodo solo verifica tokens: falta JWT_PRIVATE_KEY_FILE")
+    encoded_jwt = jwt.encode(to_encode, signing_keys.signing_key, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def create_refresh_token(user_id: int) -> str:
+    """Token de larga duración que solo sirve para obtener un nuevo par en /auth/refresh"""
+    return create_access_token(
+        {"sub": str(user_id), "type": REFRESH_TOKEN},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+def issue_tokens(user) -> dict:
+    access_token = create_access_token(
+        data=access_token_claims(user), expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": create_refresh_token(user.id),
+        "token_type": "bearer"
+    }
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _verify_token(token: str) -> dict:
+    """
+    Verificar firma y exp y retornar los claims (no modificar el dict: se comparte vía caché).
+    Un token ya verificado se sirve desde la caché hasta su exp, sin repetir la firma.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = decoded_token_cache.get(digest)
+    if payload is not MISSING:
+        return payload
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
+        payload = jwt.decode(token, signing_keys.verification_key, algorithms=[ALGORITHM])
+        int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _credentials_exception()
+
+    remaining = payload["exp"] - time.time() if "exp" in payload else decoded_token_cache.ttl
+    if remaining > 0:
+        decoded_token_cache.set(digest, payload, ttl=min(remaining, decoded_token_cache.ttl))
+    return payload
+
+def _is_revoked(payload: dict) -> bool:
+    return revocation_list.is_revoked(payload.get("jti"), int(payload["sub"]), payload.get("iat", 0))
+
+def decode_token(token: str, token_type: str = ACCESS_TOKEN) -> dict:
+    payload = _verify_token(token)
+    # Los tokens emitidos antes de existir "type" son access tokens
+    if payload.get("type", ACCESS_TOKEN) != token_type or _is_revoked(payload):
+        raise _credentials_exception()
+    return payload
+
+def decode_access_token(token: str) -> dict:
+    return decode_token(token, ACCESS_TOKEN)
+
+def revoke_token(payload: dict):
+    if payload.get("jti"):
+        revocation_list.revoke(payload["jti"], payload.get("exp", time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400))
+
+def claim_token(payload: dict) -> bool:
+    """Revocar el token de forma atómica; False si ya estaba revocado (p. ej. un refresh reutilizado)"""
+    if not payload.get("jti"):
+        return False
+    return revocation_list.claim(payload["jti"], payload.get("exp", time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400))
+
+def revoke_user_sessions(user_id: int):
+    """Invalidar todos los access y refresh tokens emitidos hasta ahora para el usuario"""
+    revocation_list.revoke_user(user_id, time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+def revoke_session(access_token: Optional[str], refresh_token: Optional[str] = None):
+    """Logout: revocar los tokens recibidos; los inválidos o ya expirados se ignoran"""
+    for token in (access_token, refresh_token):
+        if not token:
+            continue
+        try:
+            revoke_token(_verify_token(token))
+        except HTTPException:
+            pass
+
+def _load_user(payload: dict, db: Session) -> User:
+    """Usuario del token: primero la caché de principals, luego la base de datos"""
+    user_id = int(payload["sub"])
+    jti = payload.get("jti")
+    user = principal_cache.get(User, user_id, jti, db)
     if user is None:
-        raise credentials_exception
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            raise _credentials_exception()
+        principal_cache.set(user, jti)
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    return _load_user(decode_access_token(token), db)
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
+
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """
+    Ruta rápida para endpoints que solo necesitan id/tipo del usuario: se confía en los
+    claims del token salvo que el usuario haya cambiado después de emitirlo
+    """
+    payload = decode_access_token(token)
+    if "is_active" in payload and not principal_cache.is_stale(int(payload["sub"]), payload.get("iat", 0)):
+        principal = Principal.from_claims(payload)
+    else:
+        principal = Principal.from_user(_load_user(payload, db), payload.get("jti"))
+
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+def rotate_refresh_token(refresh_token: str, db: Session) -> dict:
+    """Canjear un refresh token por un par nuevo; el canjeado queda revocado (rotación)"""
+    payload = _verify_token(refresh_token)
+    if payload.get("type") != REFRESH_TOKEN:
+        raise _credentials_exception()
+    # Reclamar (revocar) el token antes de emitir nada: de dos canjes concurrentes solo uno gana
+    if _is_revoked(payload) or not claim_token(payload):
+        # Reutilizar un refresh token ya rotado indica que pudo ser robado: cerrar todas las sesiones
+        revoke_user_sessions(int(payload["sub"]))
+        raise _credentials_exception()
+
+    user = _load_user(payload, db)
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return issue_tokens(user)
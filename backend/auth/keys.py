@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from jose import jwk
+from jose.backends.base import Key
+
+from config import ALGORITHM, SECRET_KEY, JWT_PRIVATE_KEY_FILE, JWT_PUBLIC_KEY_FILE
+
+# Algoritmos asimétricos soportados por python-jose (RSA, RSA-PSS y ECDSA)
+ASYMMETRIC_PREFIXES = ("RS", "PS", "ES")
+
+
+@dataclass(frozen=True)
+class SigningKeys:
+    """
+    Claves JWT construidas una sola vez al arrancar.
+    Con algoritmos asimétricos un nodo sin clave privada solo puede verificar tokens.
+    """
+    algorithm: str
+    verification_key: Key
+    signing_key: Optional[Key]
+
+
+def _read(path: str) -> str:
+    with open(path, "r") as key_file:
+        return key_file.read()
+
+
+def load_signing_keys(
+    algorithm: str = ALGORITHM,
+    secret_key: str = SECRET_KEY,
+    private_key_file: str = JWT_PRIVATE_KEY_FILE,
+    public_key_file: str = JWT_PUBLIC_KEY_FILE
+) -> SigningKeys:
+    if algorithm.startswith("HS"):
+        key = jwk.construct(secret_key, algorithm)
+        return SigningKeys(algorithm=algorithm, verification_key=key, signing_key=key)
+
+    if algorithm.startswith(ASYMMETRIC_PREFIXES):
+        if not public_key_file:
+            raise ValueError(f"JWT_PUBLIC_KEY_FILE es obligatorio con {algorithm}")
+        signing_key = jwk.construct(_read(private_key_file), algorithm) if private_key_file else None
+        return SigningKeys(
+            algorithm=algorithm,
+            verification_key=jwk.construct(_read(public_key_file), algorithm),
+            signing_key=signing_key
+        )
+
+    raise ValueError(f"Algoritmo JWT no soportado: {algorithm}")
+
+
+signing_keys = load_signing_keys()
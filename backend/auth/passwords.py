@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+import asyncio
+import threading
+import time
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from sqlalchemy.orm import Session
+
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+# Subir BCRYPT_ROUNDS marca los hashes anteriores como obsoletos y se re-hashean en el siguiente login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de hilos acotado para no bloquear el event loop.
+    Si hay más de max_pending operaciones en curso o en cola se responde 503
+    en lugar de dejar que una ráfaga de logins acapare el servidor.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int, max_pending: int):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_wait = 0.0
+        self.total_work = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Demasiadas solicitudes de autenticación, intenta de nuevo en unos segundos",
+                    headers={"Retry-After": "1"}
+                )
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.total_wait += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.total_work += time.perf_counter() - started
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), job)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Retorna (válida, nuevo_hash); nuevo_hash no es None si el hash usa parámetros obsoletos"""
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if valid and new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    async def dummy_verify(self):
+        """Gastar el mismo tiempo que una verificación real (evita enumerar usuarios por tiempo)"""
+        await self._run(self.context.dummy_verify)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "running": self.running,
+                "queue_depth": self.pending - self.running,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "avg_queue_wait_ms": round(self.total_wait / self.completed * 1000, 3) if self.completed else 0.0,
+                "avg_hash_ms": round(self.total_work / self.completed * 1000, 3) if self.completed else 0.0
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+async def verify_user_password(user, password: str, db: Session) -> bool:
+    """
+    Verificar la contraseña de un usuario fuera del event loop.
+    Si el hash guardado usa parámetros obsoletos se reemplaza por uno nuevo.
+    """
+    # Devolver la conexión al pool antes de esperar a bcrypt: retenerla durante
+    # el hash agota el pool en una ráfaga de logins y el checkout síncrono bloquea el loop.
+    # Tras close() el usuario queda desacoplado pero con sus columnas cargadas.
+    db.close()
+
+    if user is None or not user.hashed_password:
+        await password_hasher.dummy_verify()
+        return False
+
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if valid and new_hash:
+        model = type(user)
+        db.query(model).filter(model.id == user.id).update(
+            {"hashed_password": new_hash}, synchronize_session=False
+        )
+        db.commit()
+        user.hashed_password = new_hash
+    return valid
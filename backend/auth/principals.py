@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from config import PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES
+from services.cache import MISSING, TTLCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Identidad mínima del usuario autenticado, construida sin consultar la tabla users"""
+    id: int
+    user_type: Optional[str]
+    is_active: bool
+    jti: Optional[str] = None
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> "Principal":
+        return cls(
+            id=int(payload["sub"]),
+            user_type=payload.get("user_type"),
+            is_active=bool(payload.get("is_active", True)),
+            jti=payload.get("jti")
+        )
+
+    @classmethod
+    def from_user(cls, user, jti: Optional[str] = None) -> "Principal":
+        user_type = getattr(user.user_type, "value", user.user_type)
+        return cls(id=user.id, user_type=user_type, is_active=bool(user.is_active), jti=jti)
+
+
+class PrincipalCache:
+    """
+    Caché de usuarios autenticados por (user_id, jti) con TTL corto.
+    Guarda los valores de columnas, no la instancia ORM, y en cada acierto se
+    adjunta una copia a la sesión de la petición sin consultar la base de datos.
+    Los cambios en un usuario la invalidan vía eventos del ORM (solo en este proceso;
+    en otros workers el dato puede quedar viejo hasta PRINCIPAL_CACHE_TTL segundos).
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_size: int = PRINCIPAL_CACHE_SIZE):
+        self.users = TTLCache(max_size=max_size, ttl=ttl)
+        # user_id -> momento de la última invalidación; basta con recordarlo mientras
+        # puedan existir tokens emitidos antes de ese momento
+        self.invalidated = TTLCache(max_size=max_size, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+    def get(self, model, user_id: int, jti: Optional[str], db: Session):
+        entry = self.users.get((user_id, jti))
+        if entry is MISSING:
+            return None
+        cached_at, values = entry
+        if self.is_stale(user_id, cached_at):
+            self.users.pop((user_id, jti))
+            return None
+        instance = model(**values)
+        make_transient_to_detached(instance)
+        return db.merge(instance, load=False)
+
+    def set(self, user, jti: Optional[str]):
+        values: Dict[str, Any] = {
+            attr.key: getattr(user, attr.key) for attr in inspect(type(user)).column_attrs
+        }
+        self.users.set((user.id, jti), (time.time(), values))
+
+    def is_stale(self, user_id: int, issued_at: float) -> bool:
+        """True si el usuario cambió después de issued_at (momento de caché o iat del token)"""
+        invalidated_at = self.invalidated.get(user_id)
+        return invalidated_at is not MISSING and issued_at <= invalidated_at
+
+    def invalidate(self, user_id: int):
+        self.invalidated.set(user_id, time.time())
+
+    def clear(self):
+        self.users.clear()
+        self.invalidated.clear()
+
+    def stats(self) -> dict:
+        return {"users": self.users.stats(), "invalidated": len(self.invalidated)}
+
+    def watch(self, model):
+        """Invalidar automáticamente cuando el ORM actualiza o borra un usuario"""
+        def _invalidate(mapper, connection, target):
+            self.invalidate(target.id)
+
+        event.listen(model, "after_update", _invalidate)
+        event.listen(model, "after_delete", _invalidate)
+
+
+principal_cache = PrincipalCache()
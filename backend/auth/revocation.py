@@ -0,0 +1,210 @@
+from typing import Dict, Optional
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+
+from config import (
+    REVOCATION_DB, REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE,
+    REVOCATION_SYNC_INTERVAL
+)
+
+# Purgar expirados (y reconstruir el filtro de Bloom) como mucho cada 10 minutos
+PURGE_INTERVAL = 600
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom: responde "seguro que no está" o "puede estar" en O(k).
+    Sin falsos negativos; los falsos positivos se descartan con el conjunto exacto.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Lista de tokens revocados consultada en cada petición autenticada.
+    - Por jti: filtro de Bloom + dict exacto jti -> exp (se purga al expirar el token)
+    - Por usuario: instante de corte; se rechazan los tokens emitidos antes (cerrar todas las sesiones)
+    Se persiste en SQLite para sobrevivir reinicios y cada worker incorpora
+    periódicamente las revocaciones hechas por los demás.
+    """
+
+    def __init__(
+        self,
+        db_path: str = REVOCATION_DB,
+        capacity: int = REVOCATION_BLOOM_CAPACITY,
+        error_rate: float = REVOCATION_BLOOM_ERROR_RATE,
+        sync_interval: float = REVOCATION_SYNC_INTERVAL
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, float] = {}
+        self._user_cutoffs: Dict[int, tuple] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._last_purge = time.time()
+        # La base se abre en el primer uso (importar el módulo no crea archivos)
+        self.db_path = db_path
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Conexión a la base de revocaciones, abierta al primer uso; llamar con el lock tomado"""
+        if self._db is None and self.db_path:
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            # AUTOINCREMENT: los ids nunca se reutilizan, así la carga incremental no pierde filas
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, "
+                "revoked_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def is_revoked(self, jti: Optional[str], user_id: int, issued_at: float) -> bool:
+        self.sync()
+        cutoff = self._user_cutoffs.get(user_id)
+        if cutoff is not None and issued_at < cutoff[0]:
+            return True
+        if jti is None or jti not in self._bloom:
+            return False
+        expires_at = self._tokens.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def revoke(self, jti: str, expires_at: float):
+        """Revocar un token hasta su exp (después ya no es válido de todos modos)"""
+        with self._lock:
+            self._remember_token(jti, expires_at)
+            self._persist(jti, time.time(), expires_at)
+
+    def claim(self, jti: str, expires_at: float) -> bool:
+        """
+        Revocar el token solo si nadie lo revocó antes: INSERT sobre la clave única,
+        atómico también entre workers. False = ya estaba revocado (token reutilizado).
+        """
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                if jti in self._tokens:
+                    return False
+            else:
+                try:
+                    db.execute(
+                        "INSERT INTO revoked_tokens (key, revoked_at, expires_at) VALUES (?, ?, ?)",
+                        (jti, time.time(), expires_at)
+                    )
+                    db.commit()
+                except sqlite3.IntegrityError:
+                    db.rollback()
+                    return False
+            self._remember_token(jti, expires_at)
+            return True
+
+    def revoke_user(self, user_id: int, expires_at: float):
+        """Rechazar todos los tokens del usuario emitidos hasta ahora; expires_at = exp del token más largo"""
+        revoked_at = time.time()
+        with self._lock:
+            self._user_cutoffs[user_id] = (revoked_at, expires_at)
+            self._persist(f"user:{user_id}", revoked_at, expires_at)
+
+    def _remember_token(self, jti: str, expires_at: float):
+        if jti not in self._tokens:
+            if self._bloom.count >= self._bloom.capacity:
+                self._rebuild_bloom(capacity=max(self.capacity, len(self._tokens) * 2))
+            self._bloom.add(jti)
+        self._tokens[jti] = expires_at
+
+    def _rebuild_bloom(self, capacity: int):
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._tokens:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def _persist(self, key: str, revoked_at: float, expires_at: float):
+        db = self._connection()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO revoked_tokens (key, revoked_at, expires_at) VALUES (?, ?, ?)",
+            (key, revoked_at, expires_at)
+        )
+        db.commit()
+
+    def sync(self, force: bool = False):
+        """Cargar revocaciones nuevas de otros workers y purgar las expiradas"""
+        now = time.time()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        with self._lock:
+            self._last_sync = now
+            if now - self._last_purge >= PURGE_INTERVAL:
+                self._purge_locked(now)
+            db = self._connection()
+            if db is None:
+                return
+            rows = db.execute(
+                "SELECT id, key, revoked_at, expires_at FROM revoked_tokens "
+                "WHERE id > ? AND expires_at > ? ORDER BY id",
+                (self._last_id, now)
+            ).fetchall()
+            for row_id, key, revoked_at, expires_at in rows:
+                self._last_id = max(self._last_id, row_id)
+                if key.startswith("user:"):
+                    user_id = int(key[5:])
+                    current = self._user_cutoffs.get(user_id)
+                    if current is None or current[0] < revoked_at:
+                        self._user_cutoffs[user_id] = (revoked_at, expires_at)
+                else:
+                    self._remember_token(key, expires_at)
+
+    def _purge_locked(self, now: float):
+        self._last_purge = now
+        expired = [jti for jti, expires_at in self._tokens.items() if expires_at <= now]
+        for jti in expired:
+            del self._tokens[jti]
+        for user_id in [uid for uid, (_, expires_at) in self._user_cutoffs.items() if expires_at <= now]:
+            del self._user_cutoffs[user_id]
+        if expired:
+            # El filtro de Bloom no admite borrados: se reconstruye con lo que sigue vigente
+            self._rebuild_bloom(capacity=max(self.capacity, len(self._tokens) * 2))
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+                db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._tokens),
+            "revoked_users": len(self._user_cutoffs),
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hashes
+        }
+
+
+revocation_list = RevocationList()
@@ -6,6 +6,20 @@ load_dotenv()
 # Configuración de la base de datos
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./autoassist.db")
 
+# Pool de conexiones (Postgres u otros motores con servidor)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# PRAGMAs de SQLite aplicados a cada conexión nueva
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negativo = KiB
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # ms
+
 # Configuración del servidor
 HOST = os.getenv("HOST", "127.0.0.1")
 PORT = int(os.getenv("PORT", 8000))
@@ -15,13 +29,106 @@ RELOAD = os.getenv("RELOAD", "true").lower() == "true"
 SECRET_KEY = os.getenv("SECRET_KEY", "tu_clave_secreta_muy_segura_aqui_cambiala_en_produccion")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+# Con RS256/ES256 los tokens se firman con la clave privada y se verifican con la pública
+# (un nodo que solo verifica no necesita JWT_PRIVATE_KEY_FILE ni SECRET_KEY)
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE", "")
+JWT_PUBLIC_KEY_FILE = os.getenv("JWT_PUBLIC_KEY_FILE", "")
+# Caché de tokens ya verificados (por hash del token, respetando exp)
+JWT_DECODE_CACHE_SIZE = int(os.getenv("JWT_DECODE_CACHE_SIZE", 10000))
+JWT_DECODE_CACHE_TTL = int(os.getenv("JWT_DECODE_CACHE_TTL", 300))
+
+# Hash de contraseñas (bcrypt en un pool de hilos acotado)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+# Caché de usuarios autenticados (evita consultar users en cada petición)
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+
+# Lista de revocación de tokens (filtro de Bloom + conjunto exacto, persistida en SQLite)
+REVOCATION_DB = os.getenv("REVOCATION_DB", "revoked_tokens.db")
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", 5))
 
 # Configuración de Binance (opcional)
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY", "")
 BINANCE_SECRET_KEY = os.getenv("BINANCE_SECRET_KEY", "")
 BINANCE_TESTNET = os.getenv("BINANCE_TESTNET", "true").lower() == "true"
+# Cliente asíncrono de Binance Pay: timeouts, reintentos y cortocircuito
+BINANCE_CONNECT_TIMEOUT = float(os.getenv("BINANCE_CONNECT_TIMEOUT", 3))
+BINANCE_READ_TIMEOUT = float(os.getenv("BINANCE_READ_TIMEOUT", 10))
+BINANCE_MAX_RETRIES = int(os.getenv("BINANCE_MAX_RETRIES", 2))
+BINANCE_RETRY_BACKOFF = float(os.getenv("BINANCE_RETRY_BACKOFF", 0.5))  # base del backoff exponencial
+BINANCE_RETRY_BACKOFF_MAX = float(os.getenv("BINANCE_RETRY_BACKOFF_MAX", 4))
+BINANCE_BREAKER_FAILURES = int(os.getenv("BINANCE_BREAKER_FAILURES", 5))
+BINANCE_BREAKER_RESET = float(os.getenv("BINANCE_BREAKER_RESET", 30))  # segundos abierto antes de probar
+# Webhook de Binance Pay y conciliación de pagos pendientes
+BINANCE_WEBHOOK_TOLERANCE = int(os.getenv("BINANCE_WEBHOOK_TOLERANCE", 300))  # segundos de desfase aceptados
+# Un número de certificado desconocido vuelve a pedir los certificados como mucho una vez por intervalo
+BINANCE_CERT_REFRESH_INTERVAL = int(os.getenv("BINANCE_CERT_REFRESH_INTERVAL", 300))
+BINANCE_RECONCILE_INTERVAL = int(os.getenv("BINANCE_RECONCILE_INTERVAL", 60))
+BINANCE_RECONCILE_MIN_AGE = int(os.getenv("BINANCE_RECONCILE_MIN_AGE", 60))  # margen para que llegue el webhook
+BINANCE_RECONCILE_BATCH = int(os.getenv("BINANCE_RECONCILE_BATCH", 200))
+BINANCE_RECONCILE_CONCURRENCY = int(os.getenv("BINANCE_RECONCILE_CONCURRENCY", 5))
+# Cotizaciones crypto/fiat en memoria, renovadas en segundo plano
+EXCHANGE_RATE_PAIRS = os.getenv("EXCHANGE_RATE_PAIRS", "BNB/USD,BTC/USD,ETH/USD")
+EXCHANGE_RATE_REFRESH_INTERVAL = float(os.getenv("EXCHANGE_RATE_REFRESH_INTERVAL", 15))
+# Más vieja que esto, la cotización no se usa para cobrar (503)
+EXCHANGE_RATE_MAX_AGE = float(os.getenv("EXCHANGE_RATE_MAX_AGE", 120))
 
 # Configuración de PayPal (opcional)
 PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID", "")
 PAYPAL_CLIENT_SECRET = os.getenv("PAYPAL_CLIENT_SECRET", "")
-PAYPAL_MODE = os.getenv("PAYPAL_MODE", "sandbox") 
\ No newline at end of file
+PAYPAL_MODE = os.getenv("PAYPAL_MODE", "sandbox")
+
+# Configuración del cliente HTTP compartido (APIs externas)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", 15))
+
+# Caché de geocodificación (memoria + SQLite opcional)
+GEOCODING_CACHE_TTL = int(os.getenv("GEOCODING_CACHE_TTL", 7 * 24 * 3600))
+GEOCODING_CACHE_SIZE = int(os.getenv("GEOCODING_CACHE_SIZE", 10000))
+GEOCODING_CACHE_PRECISION = int(os.getenv("GEOCODING_CACHE_PRECISION", 4))
+GEOCODING_CACHE_DB = os.getenv("GEOCODING_CACHE_DB", "")  # Vacío = sin caché en disco
+GEOCODING_CACHE_DB_MAX_ROWS = int(os.getenv("GEOCODING_CACHE_DB_MAX_ROWS", 200000))
+
+# Google Distance Matrix (lotes de un origen y muchos destinos)
+DISTANCE_MATRIX_MAX_DESTINATIONS = int(os.getenv("DISTANCE_MATRIX_MAX_DESTINATIONS", 25))
+DISTANCE_MATRIX_MAX_ELEMENTS = int(os.getenv("DISTANCE_MATRIX_MAX_ELEMENTS", 100))
+DISTANCE_MATRIX_CONCURRENCY = int(os.getenv("DISTANCE_MATRIX_CONCURRENCY", 4))
+
+# Caché de estadísticas del panel KrizoWorker (por user_id)
+KRIZOWORKER_STATS_CACHE_TTL = int(os.getenv("KRIZOWORKER_STATS_CACHE_TTL", 30))
+KRIZOWORKER_STATS_CACHE_SIZE = int(os.getenv("KRIZOWORKER_STATS_CACHE_SIZE", 10000))
+
+# Idempotency-Key en endpoints de pagos (respuestas guardadas en idempotency_keys)
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 3600))  # segundos que se reproduce la respuesta
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60))  # vencimiento de un reclamo sin respuesta
+IDEMPOTENCY_PURGE_INTERVAL = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", 3600))
+
+# Verificación periódica de saldos contra el libro mayor (wallet_ledger)
+WALLET_LEDGER_VERIFY_INTERVAL = int(os.getenv("WALLET_LEDGER_VERIFY_INTERVAL", 3600))
+WALLET_LEDGER_TOLERANCE = float(os.getenv("WALLET_LEDGER_TOLERANCE", 0.005))
+
+# Aplicar migraciones de Alembic al arrancar. Con varios workers conviene
+# desactivarlo y ejecutar `alembic upgrade head` una vez antes del despliegue
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
+
+# Histograma de calificaciones por negocio (resumen de la página del negocio)
+RATING_SUMMARY_CACHE_TTL = int(os.getenv("RATING_SUMMARY_CACHE_TTL", 300))
+RATING_SUMMARY_CACHE_SIZE = int(os.getenv("RATING_SUMMARY_CACHE_SIZE", 10000))
+
+# Agregados diarios de analytics (tabla daily_business_metrics)
+ROLLUP_REFRESH_INTERVAL = int(os.getenv("ROLLUP_REFRESH_INTERVAL", 60))  # segundos entre pasadas
+# Margen para no adelantar la marca de agua a transacciones aún sin commit
+ROLLUP_WATERMARK_LAG = int(os.getenv("ROLLUP_WATERMARK_LAG", 30))
+
+# Motor asíncrono (aiosqlite / asyncpg). Por defecto se deriva de DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
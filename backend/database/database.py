@@ -1,22 +1,130 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import sys
 import os
 
 # Agregar el directorio padre al path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, ASYNC_DATABASE_URL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_BUSY_TIMEOUT
+)
+from database.pool_metrics import PoolWaitMetrics, timed_pool_class
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+# Tiempos de espera de checkout de cada motor (ver pool_status)
+sync_pool_metrics = PoolWaitMetrics()
+async_pool_metrics = PoolWaitMetrics()
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.split("://", 1)[-1] in ("", "/"))
+
+def engine_options(url: str, pool_base, metrics: PoolWaitMetrics) -> dict:
+    """Opciones de create_engine: pool dimensionado desde config y medido"""
+    options = {}
+    if url.startswith("sqlite") and "aiosqlite" not in url:
+        options["connect_args"] = {"check_same_thread": False}
+    if _is_memory_sqlite(url):
+        # SQLite en memoria usa su propio pool de una conexión por hilo
+        return options
+    options.update(
+        poolclass=timed_pool_class(pool_base, metrics),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+    return options
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    PRAGMAs por conexión: WAL permite lectores concurrentes con un escritor,
+    synchronous=NORMAL es seguro con WAL y busy_timeout evita "database is locked"
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, QueuePool, sync_pool_metrics))
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "connect", set_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def to_async_url(url: str) -> str:
+    """Convertir una URL síncrona al driver asíncrono equivalente"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg2:"):
+        return url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgres:"):
+        return url.replace("postgres:", "postgresql+asyncpg:", 1)
+    return url
+
+# Motor asíncrono para las rutas que no deben bloquear el event loop.
+# Se crea de forma perezosa para no exigir el driver a quien solo usa el motor síncrono.
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+        _async_engine = create_async_engine(url, **engine_options(url, AsyncAdaptedQueuePool, async_pool_metrics))
+        if url.startswith("sqlite"):
+            event.listen(_async_engine.sync_engine, "connect", set_sqlite_pragmas)
+        # expire_on_commit=False: tras el commit los objetos se siguen pudiendo leer sin E/S implícita
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _AsyncSessionLocal = None
+
+def _describe_pool(pool, metrics: PoolWaitMetrics) -> dict:
+    info = {"pool": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            info[name] = getattr(pool, name)()
+    info["checkout_wait"] = metrics.snapshot()
+    return info
+
+def pool_status() -> dict:
+    """Ocupación y tiempos de espera de los pools, para dimensionarlos con tráfico real"""
+    status = {"sync": _describe_pool(engine.pool, sync_pool_metrics)}
+    if _async_engine is not None:
+        status["async"] = _describe_pool(_async_engine.sync_engine.pool, async_pool_metrics)
+    return status
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def async_session():
+    """Sesión asíncrona para usar fuera de una petición (tareas en segundo plano)"""
+    get_async_engine()
+    return _AsyncSessionLocal()
+
+# Dependency asíncrona
+async def get_async_db():
+    async with async_session() as db:
+        yield db
@@ -0,0 +1,23 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+
+from database.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    # Rutas absolutas: la aplicación puede arrancar desde cualquier directorio
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(revision: str = "head"):
+    """Aplicar las migraciones pendientes (equivale a `alembic upgrade head`)"""
+    command.upgrade(alembic_config(), revision)
+    # Las conexiones abiertas antes de migrar pueden conservar planes del esquema anterior
+    engine.dispose()
@@ -0,0 +1,92 @@
+from typing import Dict, List, Type
+import bisect
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool
+
+# Límites (en segundos) de los buckets del histograma de espera
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolWaitMetrics:
+    """
+    Tiempos de espera al pedir una conexión al pool (checkout).
+    Un p99 alto o timeouts frecuentes indican que pool_size/max_overflow se quedan cortos.
+    """
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.bucket_counts: List[int] = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def observe_timeout(self, seconds: float):
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait = max(self.max_wait, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Percentil aproximado: límite superior del bucket que lo contiene"""
+        with self._lock:
+            if not self.checkouts:
+                return 0.0
+            target = q * self.checkouts
+            seen = 0
+            for limit, count in zip(self.buckets, self.bucket_counts):
+                seen += count
+                if seen >= target:
+                    return limit
+            return self.max_wait
+
+    def snapshot(self) -> Dict:
+        p50, p95, p99 = self.percentile(0.50), self.percentile(0.95), self.percentile(0.99)
+        with self._lock:
+            histogram = {f"le_{limit}": count for limit, count in zip(self.buckets, self.bucket_counts)}
+            histogram["le_inf"] = self.bucket_counts[-1]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "p50_wait_ms": p50 * 1000,
+                "p95_wait_ms": p95 * 1000,
+                "p99_wait_ms": p99 * 1000,
+                "histogram": histogram
+            }
+
+
+def timed_pool_class(base: Type[Pool], metrics: PoolWaitMetrics) -> Type[Pool]:
+    """
+    Subclase del pool que mide cuánto tarda cada checkout: la espera en cola
+    cuando el pool está agotado más el pre-ping o la apertura de conexiones nuevas
+    """
+
+    class TimedPool(base):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                metrics.observe_timeout(time.perf_counter() - start)
+                raise
+            metrics.observe(time.perf_counter() - start)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from database.models import (
+    Notification, Delivery, Transaction, Rating, PaymentMethod, Payment,
+    TransactionType, PaymentStatus
+)
+from services.rollups import changed_days_query
+
+# nombre -> función que construye la consulta con valores de ejemplo
+HOT_QUERIES: Dict[str, Callable[[], Select]] = {}
+
+
+def hot_query(name: str):
+    """Registrar una consulta frecuente para verificar su plan con EXPLAIN"""
+    def register(builder: Callable[[], Select]) -> Callable[[], Select]:
+        HOT_QUERIES[name] = builder
+        return builder
+    return register
+
+
+@hot_query("notificaciones_no_leidas")
+def _unread_notifications() -> Select:
+    return select(Notification.id).where(
+        Notification.user_id == 1,
+        Notification.is_read == False
+    ).order_by(Notification.created_at.desc()).limit(20)
+
+
+@hot_query("entregas_por_estado")
+def _deliveries_by_status() -> Select:
+    return select(Delivery.id).where(
+        Delivery.user_id == 1,
+        Delivery.status.in_(["pending", "accepted", "in_progress"])
+    ).order_by(Delivery.created_at.desc())
+
+
+@hot_query("ganancias_del_usuario")
+def _user_earnings() -> Select:
+    return select(func.sum(Transaction.amount)).where(
+        Transaction.user_id == 1,
+        Transaction.type == TransactionType.PAYMENT,
+        Transaction.status == PaymentStatus.COMPLETED,
+        Transaction.created_at >= "2024-01-01"
+    )
+
+
+@hot_query("ingresos_del_negocio")
+def _business_revenue() -> Select:
+    return select(func.sum(Transaction.amount)).where(
+        Transaction.business_id == 1,
+        Transaction.status == PaymentStatus.COMPLETED,
+        Transaction.created_at >= "2024-01-01"
+    )
+
+
+@hot_query("histograma_de_calificaciones")
+def _rating_histogram() -> Select:
+    return select(Rating.rating, func.count()).where(
+        Rating.business_id == 1
+    ).group_by(Rating.rating)
+
+
+@hot_query("metodo_de_pago_por_defecto")
+def _default_payment_method() -> Select:
+    return select(PaymentMethod.id).where(
+        PaymentMethod.user_id == 1,
+        PaymentMethod.is_default == True
+    )
+
+
+@hot_query("pago_binance_por_prepay_id")
+def _binance_payment_by_prepay_id() -> Select:
+    return select(Payment.id).where(Payment.binance_prepay_id == "prepay")
+
+
+@hot_query("pagos_binance_pendientes")
+def _pending_binance_payments() -> Select:
+    return select(Payment.binance_prepay_id).where(
+        Payment.payment_provider == "binance_pay",
+        Payment.status == PaymentStatus.PENDING,
+        Payment.created_at <= "2024-01-01",
+        Payment.binance_prepay_id.isnot(None)
+    ).order_by(Payment.created_at).limit(200)
+
+
+@hot_query("cambios_para_agregados_transacciones")
+def _changed_transactions() -> Select:
+    return changed_days_query(Transaction, datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+
+@hot_query("cambios_para_agregados_entregas")
+def _changed_deliveries() -> Select:
+    return changed_days_query(Delivery, datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+
+def explain(connection: Connection, statement: Select) -> List[str]:
+    """Plan de ejecución como líneas de texto (SQLite y PostgreSQL)"""
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    if connection.dialect.name == "postgresql":
+        # Con tablas pequeñas el planificador prefiere Seq Scan aunque exista el índice:
+        # desactivarlo muestra si hay un camino por índice
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}")]
+    raise ValueError(f"EXPLAIN no soportado para {connection.dialect.name}")
+
+
+def full_table_scans(dialect: str, plan: List[str]) -> List[str]:
+    """Líneas del plan que recorren una tabla completa sin índice"""
+    if dialect == "sqlite":
+        # "SCAN tabla" sin "USING ... INDEX"; "SEARCH" siempre usa un índice
+        return [line for line in plan if line.startswith("SCAN ") and "INDEX" not in line]
+    return [line for line in plan if "Seq Scan" in line]
+
+
+def check_hot_queries(connection: Connection) -> Dict[str, List[str]]:
+    """nombre -> líneas con recorrido completo, solo para las consultas que fallan"""
+    failures = {}
+    for name, builder in HOT_QUERIES.items():
+        transaction = connection.begin()
+        try:
+            scans = full_table_scans(connection.dialect.name, explain(connection, builder()))
+        finally:
+            transaction.rollback()
+        if scans:
+            failures[name] = scans
+    return failures
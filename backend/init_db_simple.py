@@ -1,8 +1,9 @@
 from database.database import engine, Base
-from models_simple import User, ServiceProfile
+from models_simple import User, ServiceProfile, create_missing_indexes
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
     print("Base de datos inicializada correctamente")
 
 if __name__ == "__main__":
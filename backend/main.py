@@ -9,7 +9,18 @@ from dotenv import load_dotenv
 from routers import auth, payment, analytics
 
 # Importar servicios básicos
-from database.database import engine, Base
+from database.database import dispose_async_engine, pool_status
+from database.migrations import upgrade_database
+from config import RUN_MIGRATIONS_ON_STARTUP
+from services.http_client import startup_http_session, shutdown_http_session
+from payment.binance import startup_binance_service, shutdown_binance_service, get_binance_service
+from payment.exchange_rates import exchange_rate_refresher
+from services.binance_payments import binance_reconciler
+from services.wallet_ledger import ledger_verifier
+from auth.passwords import password_hasher
+# Registra los contadores incrementales de ServiceProfile sobre los eventos del ORM
+from services.provider_stats import provider_stats  # noqa: F401
+from services.rollups import rollup_job
 
 # Cargar variables de entorno
 load_dotenv()
@@ -26,11 +37,32 @@ app_config = {
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Eventos de inicio y cierre de la aplicación"""
-    # Crear tablas al inicio
-    Base.metadata.create_all(bind=engine)
-    print("✅ Base de datos inicializada correctamente")
+    # Esquema versionado con Alembic (migrations/)
+    if RUN_MIGRATIONS_ON_STARTUP:
+        upgrade_database()
+        print("✅ Migraciones de base de datos aplicadas")
+    # Pool de conexiones HTTP compartido para APIs externas
+    await startup_http_session()
+    # Cliente de Binance Pay sobre ese pool (timeouts, reintentos y cortocircuito)
+    startup_binance_service()
+    # Cotizaciones crypto/fiat en memoria para el checkout
+    exchange_rate_refresher.start()
+    # Pagos de Binance Pay pendientes cuyo webhook no llegó
+    binance_reconciler.start()
+    # Saldos de billeteras contra el libro mayor
+    ledger_verifier.start()
+    # Agregados diarios de analytics (revenue y entregas por negocio)
+    rollup_job.start()
     print("🚀 Krizo API iniciada")
     yield
+    await rollup_job.stop()
+    await exchange_rate_refresher.stop()
+    await binance_reconciler.stop()
+    await ledger_verifier.stop()
+    shutdown_binance_service()
+    await shutdown_http_session()
+    await dispose_async_engine()
+    password_hasher.shutdown()
     print("🛑 Krizo API detenida")
 
 # Crear aplicación FastAPI
@@ -68,6 +100,21 @@ async def health_check():
         "timestamp": "2024-01-01T00:00:00Z"
     }
 
+@app.get("/health/database")
+async def database_health():
+    """Ocupación del pool de conexiones y tiempos de espera de checkout"""
+    return pool_status()
+
+@app.get("/health/password-hashing")
+async def password_hashing_health():
+    """Profundidad de cola y tiempos del pool de hash de contraseñas"""
+    return password_hasher.stats()
+
+@app.get("/health/binance")
+async def binance_health():
+    """Estado del cortocircuito del cliente de Binance Pay"""
+    return get_binance_service().breaker.stats()
+
 @app.get("/api/v1/status")
 async def api_status():
     """Estado de la API"""
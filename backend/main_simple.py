@@ -12,8 +12,9 @@ from auth_simple import router as auth_router
 from routers.services import router as services_router
 
 # Importar servicios básicos
-from database.database import engine, Base
-from models_simple import User  # Importar el modelo para crear las tablas
+from database.database import engine, Base, pool_status
+from models_simple import User, create_missing_indexes  # Importar el modelo para crear las tablas
+from auth.passwords import password_hasher
 
 # Configuración de la aplicación
 app_config = {
@@ -29,9 +30,11 @@ async def lifespan(app: FastAPI):
     """Eventos de inicio y cierre de la aplicación"""
     # Crear tablas al inicio
     Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
     print("✅ Base de datos inicializada correctamente")
     print("🚀 Krizo API iniciada")
     yield
+    password_hasher.shutdown()
     print("🛑 Krizo API detenida")
 
 # Crear aplicación FastAPI
@@ -44,6 +47,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Incluir routers
@@ -68,6 +72,16 @@ async def health_check():
         "timestamp": "2024-01-01T00:00:00Z"
     }
 
+@app.get("/health/database")
+async def database_health():
+    """Ocupación del pool de conexiones y tiempos de espera de checkout"""
+    return pool_status()
+
+@app.get("/health/password-hashing")
+async def password_hashing_health():
+    """Profundidad de cola y tiempos del pool de hash de contraseñas"""
+    return password_hasher.stats()
+
 @app.get("/api/v1/status")
 async def api_status():
     """Estado de la API"""
@@ -0,0 +1,571 @@
+"""Esquema base: las tablas que creaba Base.metadata.create_all al arrancar
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+
+Copia fija del esquema de database/models.py anterior a Alembic; no importa
+los modelos, que siguen cambiando en las revisiones posteriores. Las bases
+existentes (creadas con create_all) ya tienen estas tablas: se saltan y solo
+queda registrada la revisión.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Tipos ENUM de PostgreSQL compartidos entre tablas: se crean una vez en upgrade()
+# (en otros motores son VARCHAR)
+USER_TYPE = postgresql.ENUM(
+    "PERSONAL", "BUSINESS", "SERVICE_PROVIDER",
+    name="usertype", create_type=False
+)
+VERIFICATION_STATUS = postgresql.ENUM(
+    "PENDING", "VERIFIED", "REJECTED",
+    name="verificationstatus", create_type=False
+)
+NOTIFICATION_TYPE = postgresql.ENUM(
+    "ORDER_STATUS", "PAYMENT", "PROMOTION", "LOYALTY", "SYSTEM",
+    name="notificationtype", create_type=False
+)
+NOTIFICATION_PRIORITY = postgresql.ENUM(
+    "LOW", "MEDIUM", "HIGH", "URGENT",
+    name="notificationpriority", create_type=False
+)
+PAYMENT_METHOD = postgresql.ENUM(
+    "CREDIT_CARD", "DEBIT_CARD", "BANK_TRANSFER", "WALLET", "PAYPAL", "BINANCE_PAY", "CRYPTO",
+    name="paymentmethod", create_type=False
+)
+PROMOTION_TYPE = postgresql.ENUM(
+    "PERCENTAGE", "FIXED_AMOUNT", "FREE_DELIVERY", "LOYALTY_POINTS",
+    name="promotiontype", create_type=False
+)
+PROMOTION_STATUS = postgresql.ENUM(
+    "ACTIVE", "INACTIVE", "EXPIRED", "SCHEDULED",
+    name="promotionstatus", create_type=False
+)
+TRANSACTION_TYPE = postgresql.ENUM(
+    "DEPOSIT", "WITHDRAWAL", "PAYMENT", "REFUND", "COMMISSION",
+    name="transactiontype", create_type=False
+)
+PAYMENT_STATUS = postgresql.ENUM(
+    "PENDING", "COMPLETED", "FAILED", "REFUNDED",
+    name="paymentstatus", create_type=False
+)
+
+# En orden de dependencias (claves foráneas)
+BASELINE_TABLES = [
+    "locations",
+    "maintenance_mode",
+    "system_configs",
+    "users",
+    "admin_users",
+    "business_profiles",
+    "device_tokens",
+    "notification_preferences",
+    "notifications",
+    "payment_methods",
+    "service_profiles",
+    "wallets",
+    "analytics",
+    "audit_logs",
+    "dashboards",
+    "loyalty_programs",
+    "products",
+    "promotions",
+    "services",
+    "transactions",
+    "deliveries",
+    "loyalty_members",
+    "payments",
+    "promotion_redemptions",
+    "loyalty_transactions",
+    "ratings",
+    "reports",
+    "rating_responses",
+    "review_images",
+]
+
+ENUMS = [
+    USER_TYPE,
+    VERIFICATION_STATUS,
+    NOTIFICATION_TYPE,
+    NOTIFICATION_PRIORITY,
+    PAYMENT_METHOD,
+    PROMOTION_TYPE,
+    PROMOTION_STATUS,
+    TRANSACTION_TYPE,
+    PAYMENT_STATUS,
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    for enum in ENUMS:
+        enum.create(bind, checkfirst=True)
+
+    if "locations" not in existing:
+        op.create_table(
+            "locations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("latitude", sa.Float(), nullable=False),
+            sa.Column("longitude", sa.Float(), nullable=False),
+            sa.Column("address", sa.String()),
+            sa.Column("city", sa.String()),
+            sa.Column("state", sa.String()),
+            sa.Column("country", sa.String()),
+            sa.Column("postal_code", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_locations_id", "locations", ["id"])
+
+    if "maintenance_mode" not in existing:
+        op.create_table(
+            "maintenance_mode",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("message", sa.Text()),
+            sa.Column("allowed_ips", sa.JSON()),
+            sa.Column("start_time", sa.DateTime()),
+            sa.Column("end_time", sa.DateTime()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_maintenance_mode_id", "maintenance_mode", ["id"])
+
+    if "system_configs" not in existing:
+        op.create_table(
+            "system_configs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("key", sa.String(), nullable=False, unique=True),
+            sa.Column("value", sa.JSON(), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("is_public", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_system_configs_id", "system_configs", ["id"])
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String()),
+            sa.Column("phone", sa.String()),
+            sa.Column("cedula", sa.String()),
+            sa.Column("hashed_password", sa.String()),
+            sa.Column("user_type", USER_TYPE),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+            sa.Column("first_name", sa.String()),
+            sa.Column("last_name", sa.String()),
+            sa.Column("birth_date", sa.DateTime()),
+            sa.Column("address", sa.String()),
+            sa.Column("face_photo_url", sa.String()),
+            sa.Column("id_card_photo_url", sa.String()),
+            sa.Column("verification_status", VERIFICATION_STATUS),
+            sa.Column("verification_documents", sa.JSON()),
+            sa.Column("wallet_balance", sa.Float()),
+        )
+        op.create_index("ix_users_cedula", "users", ["cedula"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_phone", "users", ["phone"], unique=True)
+
+    if "admin_users" not in existing:
+        op.create_table(
+            "admin_users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+            sa.Column("role", sa.String(), nullable=False),
+            sa.Column("permissions", sa.JSON()),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_admin_users_id", "admin_users", ["id"])
+
+    if "business_profiles" not in existing:
+        op.create_table(
+            "business_profiles",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("business_name", sa.String()),
+            sa.Column("rif_number", sa.String()),
+            sa.Column("rif_document_url", sa.String()),
+            sa.Column("business_address", sa.String()),
+            sa.Column("permits", sa.JSON()),
+            sa.Column("verification_status", VERIFICATION_STATUS),
+            sa.Column("location", sa.JSON()),
+            sa.Column("description", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_business_profiles_id", "business_profiles", ["id"])
+
+    if "device_tokens" not in existing:
+        op.create_table(
+            "device_tokens",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("token", sa.String(), unique=True),
+            sa.Column("device_type", sa.String()),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_device_tokens_id", "device_tokens", ["id"])
+
+    if "notification_preferences" not in existing:
+        op.create_table(
+            "notification_preferences",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+            sa.Column("email_enabled", sa.Boolean()),
+            sa.Column("push_enabled", sa.Boolean()),
+            sa.Column("sms_enabled", sa.Boolean()),
+            sa.Column("order_updates", sa.Boolean()),
+            sa.Column("payment_updates", sa.Boolean()),
+            sa.Column("promotion_updates", sa.Boolean()),
+            sa.Column("loyalty_updates", sa.Boolean()),
+            sa.Column("system_updates", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_notification_preferences_id", "notification_preferences", ["id"])
+
+    if "notifications" not in existing:
+        op.create_table(
+            "notifications",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("type", NOTIFICATION_TYPE),
+            sa.Column("priority", NOTIFICATION_PRIORITY),
+            sa.Column("title", sa.String()),
+            sa.Column("message", sa.String()),
+            sa.Column("data", sa.JSON()),
+            sa.Column("is_read", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("read_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_notifications_id", "notifications", ["id"])
+
+    if "payment_methods" not in existing:
+        op.create_table(
+            "payment_methods",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("type", PAYMENT_METHOD),
+            sa.Column("is_default", sa.Boolean()),
+            sa.Column("details", sa.JSON()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_payment_methods_id", "payment_methods", ["id"])
+
+    if "service_profiles" not in existing:
+        op.create_table(
+            "service_profiles",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("service_name", sa.String()),
+            sa.Column("service_type", USER_TYPE),
+            sa.Column("is_available", sa.Boolean()),
+            sa.Column("base_price", sa.Float()),
+            sa.Column("price_per_km", sa.Float()),
+            sa.Column("service_radius", sa.Float()),
+            sa.Column("working_hours", sa.JSON()),
+            sa.Column("description", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_service_profiles_id", "service_profiles", ["id"])
+
+    if "wallets" not in existing:
+        op.create_table(
+            "wallets",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+            sa.Column("balance", sa.Float()),
+            sa.Column("currency", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_wallets_id", "wallets", ["id"])
+
+    if "analytics" not in existing:
+        op.create_table(
+            "analytics",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("business_id", sa.Integer(), sa.ForeignKey("business_profiles.id")),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("metric_type", sa.String(), nullable=False),
+            sa.Column("metric_value", sa.Float(), nullable=False),
+            sa.Column("period", sa.String(), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_analytics_id", "analytics", ["id"])
+
+    if "audit_logs" not in existing:
+        op.create_table(
+            "audit_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("admin_user_id", sa.Integer(), sa.ForeignKey("admin_users.id")),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("action", sa.String(), nullable=False),
+            sa.Column("resource_type", sa.String(), nullable=False),
+            sa.Column("resource_id", sa.Integer()),
+            sa.Column("details", sa.JSON()),
+            sa.Column("ip_address", sa.String()),
+            sa.Column("user_agent", sa.String()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_audit_logs_id", "audit_logs", ["id"])
+
+    if "dashboards" not in existing:
+        op.create_table(
+            "dashboards",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("business_id", sa.Integer(), sa.ForeignKey("business_profiles.id")),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("config", sa.JSON()),
+            sa.Column("is_default", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_dashboards_id", "dashboards", ["id"])
+
+    if "loyalty_programs" not in existing:
+        op.create_table(
+            "loyalty_programs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("business_profile_id", sa.Integer(), sa.ForeignKey("business_profiles.id")),
+            sa.Column("name", sa.String()),
+            sa.Column("description", sa.String()),
+            sa.Column("points_per_currency", sa.Float()),
+            sa.Column("min_points_redemption", sa.Integer()),
+            sa.Column("points_value", sa.Float()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_loyalty_programs_id", "loyalty_programs", ["id"])
+
+    if "products" not in existing:
+        op.create_table(
+            "products",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("business_id", sa.Integer(), sa.ForeignKey("business_profiles.id")),
+            sa.Column("name", sa.String()),
+            sa.Column("description", sa.String()),
+            sa.Column("price", sa.Float()),
+            sa.Column("quantity", sa.Integer()),
+            sa.Column("images", sa.JSON()),
+            sa.Column("is_available", sa.Boolean()),
+        )
+        op.create_index("ix_products_id", "products", ["id"])
+
+    if "promotions" not in existing:
+        op.create_table(
+            "promotions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("business_profile_id", sa.Integer(), sa.ForeignKey("business_profiles.id")),
+            sa.Column("name", sa.String()),
+            sa.Column("description", sa.String()),
+            sa.Column("type", PROMOTION_TYPE),
+            sa.Column("value", sa.Float()),
+            sa.Column("min_purchase", sa.Float()),
+            sa.Column("max_discount", sa.Float()),
+            sa.Column("start_date", sa.DateTime(timezone=True)),
+            sa.Column("end_date", sa.DateTime(timezone=True)),
+            sa.Column("status", PROMOTION_STATUS),
+            sa.Column("code", sa.String(), unique=True),
+            sa.Column("usage_limit", sa.Integer()),
+            sa.Column("usage_count", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_promotions_id", "promotions", ["id"])
+
+    if "services" not in existing:
+        op.create_table(
+            "services",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("business_profile_id", sa.Integer(), sa.ForeignKey("business_profiles.id")),
+            sa.Column("service_profile_id", sa.Integer(), sa.ForeignKey("service_profiles.id")),
+            sa.Column("name", sa.String()),
+            sa.Column("description", sa.String()),
+            sa.Column("price", sa.Float()),
+            sa.Column("is_available", sa.Boolean()),
+            sa.Column("promotion_status", sa.Boolean()),
+            sa.Column("promotion_end_date", sa.DateTime()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_services_id", "services", ["id"])
+
+    if "transactions" not in existing:
+        op.create_table(
+            "transactions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("wallet_id", sa.Integer(), sa.ForeignKey("wallets.id")),
+            sa.Column("amount", sa.Float()),
+            sa.Column("type", TRANSACTION_TYPE),
+            sa.Column("status", PAYMENT_STATUS),
+            sa.Column("description", sa.String()),
+            sa.Column("meta_data", sa.JSON()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_transactions_id", "transactions", ["id"])
+
+    if "deliveries" not in existing:
+        op.create_table(
+            "deliveries",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id")),
+            sa.Column("status", sa.String()),
+            sa.Column("pickup_location", sa.JSON()),
+            sa.Column("delivery_location", sa.JSON()),
+            sa.Column("total_price", sa.Float()),
+            sa.Column("notes", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("completed_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_deliveries_id", "deliveries", ["id"])
+
+    if "loyalty_members" not in existing:
+        op.create_table(
+            "loyalty_members",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("loyalty_program_id", sa.Integer(), sa.ForeignKey("loyalty_programs.id")),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("points_balance", sa.Integer()),
+            sa.Column("total_points_earned", sa.Integer()),
+            sa.Column("total_points_redeemed", sa.Integer()),
+            sa.Column("tier", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_loyalty_members_id", "loyalty_members", ["id"])
+
+    if "payments" not in existing:
+        op.create_table(
+            "payments",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("transaction_id", sa.Integer(), sa.ForeignKey("transactions.id"), unique=True),
+            sa.Column("payment_method_id", sa.Integer(), sa.ForeignKey("payment_methods.id")),
+            sa.Column("amount", sa.Float()),
+            sa.Column("currency", sa.String()),
+            sa.Column("crypto_currency", sa.String()),
+            sa.Column("crypto_amount", sa.Float()),
+            sa.Column("status", PAYMENT_STATUS),
+            sa.Column("payment_provider", sa.String()),
+            sa.Column("payment_provider_id", sa.String()),
+            sa.Column("binance_prepay_id", sa.String()),
+            sa.Column("binance_qr_code", sa.String()),
+            sa.Column("binance_deep_link", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_payments_id", "payments", ["id"])
+
+    if "promotion_redemptions" not in existing:
+        op.create_table(
+            "promotion_redemptions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("promotion_id", sa.Integer(), sa.ForeignKey("promotions.id")),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("transaction_id", sa.Integer(), sa.ForeignKey("transactions.id")),
+            sa.Column("amount_saved", sa.Float()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_promotion_redemptions_id", "promotion_redemptions", ["id"])
+
+    if "loyalty_transactions" not in existing:
+        op.create_table(
+            "loyalty_transactions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("loyalty_member_id", sa.Integer(), sa.ForeignKey("loyalty_members.id")),
+            sa.Column("transaction_id", sa.Integer(), sa.ForeignKey("transactions.id")),
+            sa.Column("points", sa.Integer()),
+            sa.Column("type", sa.String()),
+            sa.Column("description", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_loyalty_transactions_id", "loyalty_transactions", ["id"])
+
+    if "ratings" not in existing:
+        op.create_table(
+            "ratings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("business_id", sa.Integer(), sa.ForeignKey("business_profiles.id"), nullable=False),
+            sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id")),
+            sa.Column("delivery_id", sa.Integer(), sa.ForeignKey("deliveries.id")),
+            sa.Column("rating", sa.Integer(), nullable=False),
+            sa.Column("review", sa.Text()),
+            sa.Column("is_anonymous", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_ratings_id", "ratings", ["id"])
+
+    if "reports" not in existing:
+        op.create_table(
+            "reports",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("business_id", sa.Integer(), sa.ForeignKey("business_profiles.id")),
+            sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id")),
+            sa.Column("delivery_id", sa.Integer(), sa.ForeignKey("deliveries.id")),
+            sa.Column("report_type", sa.String(), nullable=False),
+            sa.Column("reason", sa.String(), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("status", sa.String()),
+            sa.Column("admin_notes", sa.Text()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_reports_id", "reports", ["id"])
+
+    if "rating_responses" not in existing:
+        op.create_table(
+            "rating_responses",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("rating_id", sa.Integer(), sa.ForeignKey("ratings.id"), nullable=False),
+            sa.Column("business_id", sa.Integer(), sa.ForeignKey("business_profiles.id"), nullable=False),
+            sa.Column("response", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_rating_responses_id", "rating_responses", ["id"])
+
+    if "review_images" not in existing:
+        op.create_table(
+            "review_images",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("rating_id", sa.Integer(), sa.ForeignKey("ratings.id"), nullable=False),
+            sa.Column("image_url", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_review_images_id", "review_images", ["id"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in reversed(BASELINE_TABLES):
+        op.drop_table(table)
+    for enum in reversed(ENUMS):
+        enum.drop(bind, checkfirst=True)
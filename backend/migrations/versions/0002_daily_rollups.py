@@ -0,0 +1,54 @@
+"""Agregados diarios por negocio y marca de agua del job que los mantiene
+
+Revision ID: 0002_daily_rollups
+Revises: 0001_baseline
+Create Date: 2026-10-17
+
+Los índices de expresión sobre la última modificación de transactions y
+deliveries permiten que cada pasada del job lea solo las filas nuevas.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_daily_rollups"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+# nombre, tabla, expresión: la misma que services.rollups.CHANGED_AT
+CHANGED_AT_INDEXES = [
+    ("ix_transactions_changed_at", "transactions", "coalesce(updated_at, created_at)"),
+    ("ix_deliveries_changed_at", "deliveries", "coalesce(completed_at, created_at)"),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("daily_business_metrics"):
+        op.create_table(
+            "daily_business_metrics",
+            sa.Column("business_id", sa.Integer(), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("revenue", sa.Float(), nullable=False),
+            sa.Column("transactions", sa.Integer(), nullable=False),
+            sa.Column("deliveries", sa.Integer(), nullable=False),
+            sa.Column("completed_deliveries", sa.Integer(), nullable=False),
+            sa.Column("delivery_hours", sa.Float(), nullable=False),
+            sa.Column("timed_deliveries", sa.Integer(), nullable=False),
+        )
+    if not inspector.has_table("rollup_watermarks"):
+        op.create_table(
+            "rollup_watermarks",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("value", sa.DateTime(), nullable=False),
+        )
+    # SQLite no refleja índices de expresión: IF NOT EXISTS en lugar del inspector
+    for name, table, expression in CHANGED_AT_INDEXES:
+        op.create_index(name, table, [sa.text(expression)], if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in CHANGED_AT_INDEXES:
+        op.drop_index(name, table_name=table)
+    op.drop_table("rollup_watermarks")
+    op.drop_table("daily_business_metrics")
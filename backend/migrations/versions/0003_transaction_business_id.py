@@ -0,0 +1,68 @@
+"""transactions.business_id indexado, rellenado desde meta_data["business_id"]
+
+Revision ID: 0003_transaction_business_id
+Revises: 0002_daily_rollups
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_transaction_business_id"
+down_revision = "0002_daily_rollups"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_transactions_business_status_created"
+BATCH_SIZE = 5000
+# Índice de expresión de 0002: en SQLite batch_alter_table recrea la tabla sin
+# él (no se puede reflejar), así que se vuelve a crear después de cada batch
+CHANGED_AT_INDEX = ("ix_transactions_changed_at", "coalesce(updated_at, created_at)")
+
+
+def _restore_changed_at_index():
+    name, expression = CHANGED_AT_INDEX
+    op.create_index(name, "transactions", [sa.text(expression)], if_not_exists=True)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "business_id" not in {column["name"] for column in inspector.get_columns("transactions")}:
+        with op.batch_alter_table("transactions") as batch:
+            batch.add_column(sa.Column("business_id", sa.Integer(), nullable=True))
+            batch.create_foreign_key(
+                "fk_transactions_business_id", "business_profiles", ["business_id"], ["id"]
+            )
+        _restore_changed_at_index()
+
+    # Relleno por lotes de ids; solo filas sin business_id
+    transactions = sa.table(
+        "transactions",
+        sa.column("id", sa.Integer()),
+        sa.column("business_id", sa.Integer()),
+        sa.column("meta_data", sa.JSON()),
+    )
+    meta_business_id = transactions.c.meta_data["business_id"].as_integer()
+    max_id = bind.execute(sa.select(sa.func.max(transactions.c.id))).scalar() or 0
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        bind.execute(
+            transactions.update()
+            .where(
+                transactions.c.id >= start,
+                transactions.c.id < start + BATCH_SIZE,
+                transactions.c.business_id.is_(None),
+                meta_business_id.isnot(None),
+            )
+            .values(business_id=meta_business_id)
+        )
+
+    if INDEX_NAME not in {index["name"] for index in inspector.get_indexes("transactions")}:
+        op.create_index(INDEX_NAME, "transactions", ["business_id", "status", "created_at"])
+
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name="transactions")
+    # Al borrar la columna se borra también su clave foránea
+    with op.batch_alter_table("transactions") as batch:
+        batch.drop_column("business_id")
+    _restore_changed_at_index()
@@ -0,0 +1,36 @@
+"""Índices compuestos para las consultas más frecuentes de los routers
+
+Revision ID: 0004_hot_query_indexes
+Revises: 0003_transaction_business_id
+Create Date: 2026-10-17
+
+Cada índice sigue el orden de la consulta: igualdades primero y la columna
+de rango u orden al final. database/query_plans.py verifica que se usen.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_hot_query_indexes"
+down_revision = "0003_transaction_business_id"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_notifications_user_read_created", "notifications", ["user_id", "is_read", "created_at"]),
+    ("ix_deliveries_user_status_created", "deliveries", ["user_id", "status", "created_at"]),
+    ("ix_transactions_user_type_status_created", "transactions", ["user_id", "type", "status", "created_at"]),
+    ("ix_ratings_business_rating", "ratings", ["business_id", "rating"]),
+    ("ix_payment_methods_user_default", "payment_methods", ["user_id", "is_default"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,43 @@
+"""Eventos de webhook de pagos e índices para confirmar pagos de Binance Pay
+
+Revision ID: 0005_binance_webhooks
+Revises: 0004_hot_query_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_binance_webhooks"
+down_revision = "0004_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_payments_binance_prepay_id", "payments", ["binance_prepay_id"]),
+    ("ix_payments_provider_status_created", "payments", ["payment_provider", "status", "created_at"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("payment_webhook_events"):
+        op.create_table(
+            "payment_webhook_events",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("provider", sa.String(), nullable=False),
+            sa.Column("event_id", sa.String(), nullable=False),
+            sa.Column("event_type", sa.String()),
+            sa.Column("payload", sa.JSON()),
+            sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint("provider", "event_id", name="uq_payment_webhook_events_provider_event"),
+        )
+        op.create_index("ix_payment_webhook_events_id", "payment_webhook_events", ["id"])
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_table("payment_webhook_events")
@@ -0,0 +1,41 @@
+"""Libro mayor de billeteras (wallet_ledger) con un asiento de apertura por saldo existente
+
+Revision ID: 0006_wallet_ledger
+Revises: 0005_binance_webhooks
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_wallet_ledger"
+down_revision = "0005_binance_webhooks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("wallet_ledger"):
+        return
+    op.create_table(
+        "wallet_ledger",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("wallet_id", sa.Integer(), sa.ForeignKey("wallets.id"), nullable=False),
+        sa.Column("transaction_id", sa.Integer(), sa.ForeignKey("transactions.id"), nullable=True),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("balance_after", sa.Float(), nullable=False),
+        sa.Column("entry_type", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_wallet_ledger_id", "wallet_ledger", ["id"])
+    op.create_index("ix_wallet_ledger_wallet_id", "wallet_ledger", ["wallet_id", "id"])
+    # Los saldos anteriores al libro mayor entran como asiento de apertura
+    op.execute(
+        "INSERT INTO wallet_ledger (wallet_id, amount, balance_after, entry_type) "
+        "SELECT id, balance, balance, 'opening' FROM wallets "
+        "WHERE balance IS NOT NULL AND balance <> 0"
+    )
+
+
+def downgrade():
+    op.drop_table("wallet_ledger")
@@ -0,0 +1,38 @@
+"""Contadores de ServiceProfile (servicios, ganancias, reseñas y calificación)
+
+Revision ID: 0008_service_profile_counters
+Revises: 0007_idempotency_keys
+Create Date: 2026-10-17
+
+Las columnas nacen en 0; `python scripts/reconcile_provider_stats.py` las
+calcula para los datos existentes.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_service_profile_counters"
+down_revision = "0007_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ("total_services", sa.Integer()),
+    ("total_earnings", sa.Float()),
+    ("total_reviews", sa.Integer()),
+    ("average_rating", sa.Float()),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column["name"] for column in inspector.get_columns("service_profiles")}
+    with op.batch_alter_table("service_profiles") as batch:
+        for name, type_ in COLUMNS:
+            if name not in existing:
+                batch.add_column(sa.Column(name, type_, nullable=True, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("service_profiles") as batch:
+        for name, _ in reversed(COLUMNS):
+            batch.drop_column(name)
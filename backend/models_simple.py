@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Enum, Float, JSON, Text
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Enum, Float, Index, JSON, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -46,6 +46,12 @@ class User(Base):
 
 class ServiceProfile(Base):
     __tablename__ = "service_profiles"
+    __table_args__ = (
+        # Búsqueda por radio del marketplace (rectángulo lat/lng); el de lng
+        # permite usar índices también en el OR con "sin ubicación"
+        Index("ix_service_profiles_location", "location_lat", "location_lng"),
+        Index("ix_service_profiles_location_lng", "location_lng"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
@@ -93,4 +99,14 @@ class ServiceProfile(Base):
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+def create_missing_indexes(bind):
+    """
+    CREATE INDEX IF NOT EXISTS de los índices de ServiceProfile: create_all no
+    toca tablas que ya existen, así que las bases anteriores no los tendrían.
+    """
+    for index in ServiceProfile.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+
@@ -3,16 +3,61 @@ import hmac
 import hashlib
 import time
 import json
-import requests
-from typing import Optional, Dict, Any
+import random
+import asyncio
+import logging
+import aiohttp
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from typing import Optional, Dict, Any, Mapping
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 import qrcode
 import base64
 from io import BytesIO
 
+from config import (
+    BINANCE_CONNECT_TIMEOUT, BINANCE_READ_TIMEOUT, BINANCE_MAX_RETRIES,
+    BINANCE_RETRY_BACKOFF, BINANCE_RETRY_BACKOFF_MAX,
+    BINANCE_BREAKER_FAILURES, BINANCE_BREAKER_RESET, BINANCE_WEBHOOK_TOLERANCE,
+    BINANCE_CERT_REFRESH_INTERVAL
+)
+from payment.exchange_rates import ExchangeRateCache, exchange_rates
+from services.circuit_breaker import CircuitBreaker
+from services.http_client import get_http_session
+
+logger = logging.getLogger(__name__)
+
+# Respuestas que vale la pena reintentar (límite de tasa y errores del servidor)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# api.binance.com no lista pares contra USD: se cotizan contra USDT (1:1, ver PEGGED)
+TICKER_QUOTE_ASSETS = {"USD": "USDT"}
+
+
+class _RetryableError(Exception):
+    """Fallo transitorio de red o del servidor de Binance"""
+
+
 class BinancePayService:
-    def __init__(self):
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        rates: ExchangeRateCache = exchange_rates
+    ):
+        self.session = session
+        self.rates = rates
+        # Claves públicas de Binance para verificar webhooks, por número de certificado
+        self._webhook_keys: Dict[str, Any] = {}
+        self._certificates_lock = asyncio.Lock()
+        self._certificates_fetched_at: Optional[float] = None
+        self.breaker = breaker or CircuitBreaker(BINANCE_BREAKER_FAILURES, BINANCE_BREAKER_RESET)
+        self.timeout = aiohttp.ClientTimeout(
+            total=BINANCE_CONNECT_TIMEOUT + BINANCE_READ_TIMEOUT,
+            sock_connect=BINANCE_CONNECT_TIMEOUT,
+            sock_read=BINANCE_READ_TIMEOUT
+        )
         self.api_key = os.getenv("BINANCE_API_KEY")
         self.secret_key = os.getenv("BINANCE_SECRET_KEY")
         self.base_url = "https://api.binance.com"  # Para producción
@@ -34,38 +79,92 @@ class BinancePayService:
             hashlib.sha256
         ).hexdigest()
 
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Realizar petición autenticada a la API de Binance"""
-        url = f"{self._get_base_url()}{endpoint}"
+    def _signed_headers(self, body: Optional[str]) -> Dict[str, str]:
         timestamp = str(int(time.time() * 1000))
-        
         headers = {
             "Content-Type": "application/json",
             "BinancePay-Timestamp": timestamp,
             "BinancePay-Nonce": timestamp,
             "BinancePay-Certificate-SN": self.api_key
         }
-        
-        if data:
-            payload = json.dumps(data)
-            headers["BinancePay-Signature"] = self._generate_signature(payload)
-        
+        if body:
+            headers["BinancePay-Signature"] = self._generate_signature(body)
+        return headers
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Backoff exponencial con jitter completo: uniforme en [0, base * 2^intento]"""
+        return random.uniform(0, min(BINANCE_RETRY_BACKOFF_MAX, BINANCE_RETRY_BACKOFF * 2 ** attempt))
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[str],
+        params: Optional[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        session = self.session or await get_http_session()
         try:
-            if method.upper() == "POST":
-                response = requests.post(url, headers=headers, json=data)
-            else:
-                response = requests.get(url, headers=headers)
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
+            async with session.request(
+                method, url, headers=headers, data=body, params=params, timeout=self.timeout
+            ) as response:
+                if response.status in RETRYABLE_STATUS:
+                    raise _RetryableError(f"HTTP {response.status}")
+                if response.status >= 400:
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                        detail=f"Error en la comunicación con Binance: HTTP {response.status}"
+                    )
+                return await response.json(content_type=None)
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            raise _RetryableError(str(e) or type(e).__name__) from e
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict[str, str]] = None,
+        signed: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Petición a la API de Binance sobre el pool HTTP compartido, con timeouts
+        de conexión/lectura, reintentos acotados ante fallos transitorios y
+        cortocircuito: con Binance caído se responde 503 sin esperar a la red
+        """
+        if not self.breaker.allow():
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error en la comunicación con Binance: {str(e)}"
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Binance Pay no disponible temporalmente",
+                headers={"Retry-After": str(int(self.breaker.retry_after()) + 1)}
             )
 
-    def create_payment_order(
+        url = f"{self._get_base_url()}{endpoint}"
+        # Se serializa una vez para que la firma corresponda exactamente al cuerpo enviado
+        body = json.dumps(data) if data is not None else None
+        for attempt in range(BINANCE_MAX_RETRIES + 1):
+            headers = self._signed_headers(body) if signed else {}
+            try:
+                result = await self._send(method.upper(), url, headers, body, params)
+            except _RetryableError as e:
+                if attempt < BINANCE_MAX_RETRIES:
+                    logger.warning("Binance %s %s falló (%s), reintento %s", method, endpoint, e, attempt + 1)
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                self.breaker.record_failure()
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Error en la comunicación con Binance: {e}"
+                )
+            except HTTPException:
+                # Binance respondió (error del cliente): el servicio está disponible
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def create_payment_order(
         self,
         amount: float,
         currency: str = "USD",
@@ -75,10 +174,11 @@ class BinancePayService:
     ) -> Dict[str, Any]:
         """Crear orden de pago con Binance Pay"""
         
-        # Obtener tasa de cambio actual
-        exchange_rate = self._get_exchange_rate(currency, crypto_currency)
-        crypto_amount = amount / exchange_rate
+        # Cotización en memoria (la renueva ExchangeRateRefresher)
+        quote = self.rates.get(crypto_currency, currency)
+        crypto_amount = amount / quote.rate
         
+        # merchantTradeNo fijo para toda la llamada: un reintento no crea una segunda orden
         data = {
             "env": {
                 "terminalType": "WEB"
@@ -99,7 +199,7 @@ class BinancePayService:
             data["returnUrl"] = return_url
         
         try:
-            response = self._make_request("POST", "/binancepay/openapi/v2/order", data)
+            response = await self._make_request("POST", "/binancepay/openapi/v2/order", data)
             
             if response.get("status") == "SUCCESS":
                 result = response.get("data", {})
@@ -111,6 +211,8 @@ class BinancePayService:
                     "currency": currency,
                     "crypto_amount": crypto_amount,
                     "crypto_currency": crypto_currency,
+                    "exchange_rate": quote.rate,
+                    "exchange_rate_age": quote.age,
                     "status": "PENDING",
                     "expires_at": datetime.utcnow() + timedelta(minutes=15)
                 }
@@ -120,13 +222,15 @@ class BinancePayService:
                     detail=f"Error al crear orden de pago: {response.get('message', 'Error desconocido')}"
                 )
                 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al procesar pago con Binance: {str(e)}"
             )
 
-    def check_payment_status(self, prepay_id: str) -> Dict[str, Any]:
+    async def check_payment_status(self, prepay_id: str) -> Dict[str, Any]:
         """Verificar estado de un pago"""
         
         data = {
@@ -134,7 +238,7 @@ class BinancePayService:
         }
         
         try:
-            response = self._make_request("POST", "/binancepay/openapi/v2/order", data)
+            response = await self._make_request("POST", "/binancepay/openapi/v2/order/query", data)
             
             if response.get("status") == "SUCCESS":
                 result = response.get("data", {})
@@ -152,34 +256,84 @@ class BinancePayService:
                     detail=f"Error al verificar estado: {response.get('message', 'Error desconocido')}"
                 )
                 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al verificar estado del pago: {str(e)}"
             )
 
-    def _get_exchange_rate(self, fiat_currency: str, crypto_currency: str) -> float:
-        """Obtener tasa de cambio actual"""
+    def _may_fetch_certificates(self) -> bool:
+        return (
+            self._certificates_fetched_at is None
+            or time.monotonic() - self._certificates_fetched_at >= BINANCE_CERT_REFRESH_INTERVAL
+        )
+
+    async def _webhook_public_key(self, serial: Optional[str]):
+        """
+        Clave pública del certificado indicado. Un número desconocido pide los
+        certificados a Binance como mucho una vez cada BINANCE_CERT_REFRESH_INTERVAL
+        segundos; entre medio se rechaza sin salir a la red (la firma aún no se verificó)
+        """
+        if serial not in self._webhook_keys and self._may_fetch_certificates():
+            async with self._certificates_lock:
+                # Otro webhook pudo haberlos pedido mientras se esperaba el lock
+                if serial not in self._webhook_keys and self._may_fetch_certificates():
+                    # Se marca antes del pedido: un fallo tampoco se reintenta en cada webhook
+                    self._certificates_fetched_at = time.monotonic()
+                    response = await self._make_request("POST", "/binancepay/openapi/certificates", {})
+                    for certificate in response.get("data") or []:
+                        self._webhook_keys[certificate["certSerial"]] = serialization.load_pem_public_key(
+                            certificate["certPublic"].encode("utf-8")
+                        )
+        if serial is None and len(self._webhook_keys) == 1:
+            return next(iter(self._webhook_keys.values()))
+        return self._webhook_keys.get(serial)
+
+    async def verify_webhook(self, headers: Mapping[str, str], body: bytes) -> bool:
+        """
+        Verificar BinancePay-Signature: RSA-SHA256 (base64) sobre
+        "timestamp\nnonce\nbody\n" con la clave pública de Binance. Se rechazan
+        timestamps fuera de BINANCE_WEBHOOK_TOLERANCE para evitar reenvíos
+        """
+        timestamp = headers.get("BinancePay-Timestamp")
+        nonce = headers.get("BinancePay-Nonce")
+        signature = headers.get("BinancePay-Signature")
+        if not (timestamp and nonce and signature):
+            return False
         try:
-            # Usar API pública de Binance para obtener precio
-            symbol = f"{crypto_currency}{fiat_currency}"
-            response = requests.get(f"{self._get_base_url()}/api/v3/ticker/price", params={"symbol": symbol})
-            response.raise_for_status()
-            
-            data = response.json()
-            return float(data.get("price", 0))
-            
-        except Exception as e:
-            # Si falla, usar tasa por defecto
-            default_rates = {
-                "BNB": 300.0,  # BNB a USD
-                "BTC": 45000.0,  # BTC a USD
-                "ETH": 3000.0,  # ETH a USD
-                "USDT": 1.0,  # USDT a USD
-            }
-            return default_rates.get(crypto_currency, 1.0)
+            if abs(time.time() - int(timestamp) / 1000) > BINANCE_WEBHOOK_TOLERANCE:
+                return False
+            signature = base64.b64decode(signature)
+        except ValueError:
+            return False
+
+        public_key = await self._webhook_public_key(headers.get("BinancePay-Certificate-SN"))
+        if public_key is None:
+            return False
+        payload = f"{timestamp}\n{nonce}\n".encode("utf-8") + body + b"\n"
+        try:
+            public_key.verify(signature, payload, padding.PKCS1v15(), hashes.SHA256())
+        except InvalidSignature:
+            return False
+        return True
 
-    def create_crypto_payment(
+    async def _get_exchange_rate(self, fiat_currency: str, crypto_currency: str) -> float:
+        """
+        Consultar el precio actual en la API pública de Binance. Solo lo usa el
+        refresco en segundo plano; el checkout lee self.rates
+        """
+        symbol = f"{crypto_currency}{TICKER_QUOTE_ASSETS.get(fiat_currency, fiat_currency)}"
+        data = await self._make_request(
+            "GET", "/api/v3/ticker/price", params={"symbol": symbol}, signed=False
+        )
+        price = float(data.get("price", 0))
+        if price <= 0:
+            raise ValueError(f"Precio inválido para {symbol}: {data.get('price')}")
+        return price
+
+    async def create_crypto_payment(
         self,
         amount_usd: float,
         crypto_currency: str,
@@ -191,12 +345,12 @@ class BinancePayService:
         if not wallet_address:
             wallet_address = self._generate_wallet_address(crypto_currency)
         
-        # Obtener tasa de cambio
-        exchange_rate = self._get_exchange_rate("USD", crypto_currency)
-        crypto_amount = amount_usd / exchange_rate
+        # Cotización en memoria (la renueva ExchangeRateRefresher)
+        quote = self.rates.get(crypto_currency, "USD")
+        crypto_amount = amount_usd / quote.rate
         
-        # Generar QR code
-        qr_code = self._generate_qr_code(wallet_address)
+        # Generar QR code (PIL es CPU: fuera del event loop)
+        qr_code = await asyncio.to_thread(self._generate_qr_code, wallet_address)
         
         return {
             "payment_id": f"crypto_{int(time.time() * 1000)}",
@@ -205,7 +359,8 @@ class BinancePayService:
             "crypto_currency": crypto_currency,
             "wallet_address": wallet_address,
             "qr_code": qr_code,
-            "exchange_rate": exchange_rate,
+            "exchange_rate": quote.rate,
+            "exchange_rate_age": quote.age,
             "expires_at": datetime.utcnow() + timedelta(hours=1)
         }
 
@@ -262,7 +417,7 @@ class BinancePayService:
             ]
         }
 
-    def refund_payment(self, transaction_id: str, amount: float) -> Dict[str, Any]:
+    async def refund_payment(self, transaction_id: str, amount: float) -> Dict[str, Any]:
         """Procesar reembolso de un pago"""
         # Nota: Los reembolsos en Binance Pay requieren configuración especial
         # y aprobación de Binance
@@ -274,7 +429,7 @@ class BinancePayService:
         }
         
         try:
-            response = self._make_request("POST", "/binancepay/openapi/v2/refund", data)
+            response = await self._make_request("POST", "/binancepay/openapi/v2/refund", data)
             
             if response.get("status") == "SUCCESS":
                 return {
@@ -288,8 +443,48 @@ class BinancePayService:
                     detail=f"Error al procesar reembolso: {response.get('message', 'Error desconocido')}"
                 )
                 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al procesar reembolso: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+
+
+# Instancia por proceso, creada en el lifespan de la app (None sin credenciales)
+_binance_service: Optional[BinancePayService] = None
+_binance_started = False
+
+
+def startup_binance_service() -> Optional[BinancePayService]:
+    """Crear el cliente de Binance Pay (llamar desde el lifespan de la app)"""
+    global _binance_service, _binance_started
+    if not _binance_started:
+        _binance_started = True
+        try:
+            _binance_service = BinancePayService()
+        except ValueError:
+            print("⚠️ Binance Pay no disponible - credenciales no configuradas")
+    return _binance_service
+
+
+def shutdown_binance_service():
+    """Soltar el cliente; las conexiones pertenecen a la sesión HTTP compartida"""
+    global _binance_service, _binance_started
+    _binance_service = None
+    _binance_started = False
+
+
+def get_binance_service() -> BinancePayService:
+    """
+    Dependency de FastAPI; 503 si Binance Pay no está configurado.
+    Si la app no lo creó en el lifespan, se crea en el primer uso.
+    """
+    service = startup_binance_service()
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de Binance Pay no disponible"
+        )
+    return service
@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException, status
+
+from config import EXCHANGE_RATE_PAIRS, EXCHANGE_RATE_REFRESH_INTERVAL, EXCHANGE_RATE_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+# Stablecoins cotizadas 1:1 contra su moneda; no se consultan
+PEGGED = {("USDT", "USD"), ("BUSD", "USD"), ("USDC", "USD")}
+
+Pair = Tuple[str, str]  # (crypto, fiat)
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Precio de 1 unidad de crypto en fiat y cuándo se obtuvo"""
+    crypto: str
+    fiat: str
+    rate: float
+    fetched_at: float  # time.time()
+    source: str = "binance"
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    def as_dict(self) -> dict:
+        return {
+            "crypto": self.crypto,
+            "fiat": self.fiat,
+            "rate": self.rate,
+            "source": self.source,
+            "age_seconds": round(self.age, 1),
+            "stale": self.age > EXCHANGE_RATE_MAX_AGE
+        }
+
+
+def _parse_pairs(spec: str) -> List[Pair]:
+    """"BNB/USD,BTC/USD" -> [("BNB", "USD"), ("BTC", "USD")]"""
+    pairs = []
+    for item in spec.split(","):
+        if "/" in item:
+            crypto, fiat = item.strip().upper().split("/", 1)
+            pairs.append((crypto, fiat))
+    return pairs
+
+
+class ExchangeRateCache:
+    """
+    Cotizaciones en memoria por par (crypto, fiat). Las lee el checkout sin tocar
+    la red; las escribe ExchangeRateRefresher. Solo se aceptan los pares
+    configurados (EXCHANGE_RATE_PAIRS) y las stablecoins de PEGGED: otro par es
+    un 400, no una consulta más a Binance. Una cotización más vieja que
+    EXCHANGE_RATE_MAX_AGE no se usa para cobrar: se responde 503 en su lugar.
+    """
+
+    def __init__(self, pairs: Iterable[Pair] = (), max_age: float = EXCHANGE_RATE_MAX_AGE):
+        self.max_age = max_age
+        self.pairs = frozenset(pairs)
+        self._quotes: Dict[Pair, Quote] = {}
+
+    def get(self, crypto: str, fiat: str) -> Quote:
+        pair = (crypto.upper(), fiat.upper())
+        if pair in PEGGED:
+            return Quote(*pair, rate=1.0, fetched_at=time.time(), source="peg")
+        if pair not in self.pairs:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Par {pair[0]}/{pair[1]} no soportado"
+            )
+
+        quote = self._quotes.get(pair)
+        if quote is None or quote.age > self.max_age:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Cotización {pair[0]}/{pair[1]} no disponible, intente nuevamente",
+                headers={"Retry-After": str(int(EXCHANGE_RATE_REFRESH_INTERVAL))}
+            )
+        return quote
+
+    def set(self, crypto: str, fiat: str, rate: float, fetched_at: Optional[float] = None):
+        self._quotes[(crypto, fiat)] = Quote(crypto, fiat, rate, fetched_at or time.time())
+
+    def quotes(self) -> List[Quote]:
+        return [self._quotes[pair] for pair in sorted(self._quotes)]
+
+
+class ExchangeRateRefresher:
+    """Tarea en segundo plano que renueva todas las cotizaciones cada `interval` segundos"""
+
+    def __init__(
+        self,
+        cache: ExchangeRateCache,
+        fetch: Callable[[], Optional[Callable[[str, str], Awaitable[float]]]],
+        interval: float = EXCHANGE_RATE_REFRESH_INTERVAL
+    ):
+        self.cache = cache
+        # Devuelve la función de consulta (None si el proveedor no está configurado)
+        self.fetch = fetch
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Consultar todos los pares en paralelo; retorna cuántos se actualizaron"""
+        fetch = self.fetch()
+        if fetch is None:
+            return 0
+        pairs = sorted(self.cache.pairs)
+        results = await asyncio.gather(*(fetch(fiat, crypto) for crypto, fiat in pairs), return_exceptions=True)
+
+        updated = 0
+        for (crypto, fiat), result in zip(pairs, results):
+            if isinstance(result, Exception) or not result:
+                # Se conserva la cotización anterior hasta que supere EXCHANGE_RATE_MAX_AGE
+                logger.warning("No se pudo cotizar %s/%s: %s", crypto, fiat, result)
+                continue
+            self.cache.set(crypto, fiat, float(result))
+            updated += 1
+        return updated
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Error actualizando cotizaciones")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _binance_fetch():
+    # Import diferido: payment.binance usa este módulo
+    from payment.binance import startup_binance_service
+    service = startup_binance_service()
+    return service._get_exchange_rate if service else None
+
+
+exchange_rates = ExchangeRateCache(_parse_pairs(EXCHANGE_RATE_PAIRS))
+exchange_rate_refresher = ExchangeRateRefresher(exchange_rates, _binance_fetch)
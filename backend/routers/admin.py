@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database.database import get_db
+from database.database import get_async_db
 from schemas.admin import (
     SystemConfig, SystemConfigCreate, SystemConfigUpdate,
     AdminUser, AdminUserCreate, AdminUserUpdate,
@@ -39,20 +39,20 @@ def require_super_admin(current_user: User = Depends(get_current_user)):
 @router.get("/dashboard", response_model=AdminDashboard)
 async def get_admin_dashboard(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener dashboard de administración"""
     admin_service = AdminService(db)
-    return admin_service.get_admin_dashboard()
+    return await admin_service.get_admin_dashboard()
 
 @router.get("/system/status", response_model=SystemStatus)
 async def get_system_status(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener estado del sistema"""
     admin_service = AdminService(db)
-    status_data = admin_service.get_system_status()
+    status_data = await admin_service.get_system_status()
     return SystemStatus(**status_data)
 
 # Rutas de configuración del sistema
@@ -60,30 +60,30 @@ async def get_system_status(
 async def create_system_config(
     config_data: SystemConfigCreate,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear una nueva configuración del sistema"""
     admin_service = AdminService(db)
-    return admin_service.create_system_config(config_data)
+    return await admin_service.create_system_config(config_data)
 
 @router.get("/config", response_model=List[SystemConfig])
 async def get_system_configs(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener todas las configuraciones del sistema"""
     admin_service = AdminService(db)
-    return admin_service.get_public_configs()
+    return await admin_service.get_public_configs()
 
 @router.get("/config/{key}", response_model=SystemConfig)
 async def get_system_config(
     key: str,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener una configuración específica"""
     admin_service = AdminService(db)
-    config = admin_service.get_system_config(key)
+    config = await admin_service.get_system_config(key)
     if not config:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,21 +96,21 @@ async def update_system_config(
     key: str,
     config_update: SystemConfigUpdate,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar una configuración del sistema"""
     admin_service = AdminService(db)
-    return admin_service.update_system_config(key, config_update)
+    return await admin_service.update_system_config(key, config_update)
 
 @router.delete("/config/{key}")
 async def delete_system_config(
     key: str,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar una configuración del sistema"""
     admin_service = AdminService(db)
-    admin_service.delete_system_config(key)
+    await admin_service.delete_system_config(key)
     return {"message": "Configuración eliminada exitosamente"}
 
 # Rutas de administradores
@@ -118,41 +118,41 @@ async def delete_system_config(
 async def create_admin_user(
     admin_data: AdminUserCreate,
     current_user: User = Depends(require_super_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear un nuevo administrador (solo super admin)"""
     admin_service = AdminService(db)
-    return admin_service.create_admin_user(admin_data)
+    return await admin_service.create_admin_user(admin_data)
 
 @router.get("/users", response_model=List[AdminUser])
 async def get_admin_users(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener todos los administradores"""
     admin_service = AdminService(db)
-    return admin_service.get_admin_users()
+    return await admin_service.get_admin_users()
 
 @router.put("/users/{admin_id}", response_model=AdminUser)
 async def update_admin_user(
     admin_id: int,
     admin_update: AdminUserUpdate,
     current_user: User = Depends(require_super_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar un administrador (solo super admin)"""
     admin_service = AdminService(db)
-    return admin_service.update_admin_user(admin_id, admin_update)
+    return await admin_service.update_admin_user(admin_id, admin_update)
 
 @router.delete("/users/{admin_id}")
 async def delete_admin_user(
     admin_id: int,
     current_user: User = Depends(require_super_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar un administrador (solo super admin)"""
     admin_service = AdminService(db)
-    admin_service.delete_admin_user(admin_id)
+    await admin_service.delete_admin_user(admin_id)
     return {"message": "Administrador eliminado exitosamente"}
 
 # Rutas de auditoría
@@ -161,11 +161,11 @@ async def create_audit_log(
     audit_data: AuditLogCreate,
     request: Request,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear un registro de auditoría"""
     admin_service = AdminService(db)
-    return admin_service.create_audit_log(audit_data, request)
+    return await admin_service.create_audit_log(audit_data, request)
 
 @router.get("/audit", response_model=List[AuditLog])
 async def get_audit_logs(
@@ -176,11 +176,11 @@ async def get_audit_logs(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener registros de auditoría con filtros"""
     admin_service = AdminService(db)
-    return admin_service.get_audit_logs(
+    return await admin_service.get_audit_logs(
         skip=skip,
         limit=limit,
         admin_user_id=admin_user_id,
@@ -193,11 +193,11 @@ async def get_audit_logs(
 @router.get("/maintenance", response_model=MaintenanceMode)
 async def get_maintenance_mode(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener configuración de modo mantenimiento"""
     admin_service = AdminService(db)
-    maintenance = admin_service.get_maintenance_mode()
+    maintenance = await admin_service.get_maintenance_mode()
     if not maintenance:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -209,24 +209,24 @@ async def get_maintenance_mode(
 async def update_maintenance_mode(
     maintenance_update: MaintenanceModeUpdate,
     current_user: User = Depends(require_super_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar modo mantenimiento (solo super admin)"""
     admin_service = AdminService(db)
-    return admin_service.update_maintenance_mode(maintenance_update)
+    return await admin_service.update_maintenance_mode(maintenance_update)
 
 @router.get("/maintenance/check")
 async def check_maintenance_mode(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verificar si el sistema está en modo mantenimiento"""
     admin_service = AdminService(db)
     client_ip = request.client.host if request.client else None
-    is_maintenance = admin_service.is_maintenance_mode(client_ip)
+    is_maintenance = await admin_service.is_maintenance_mode(client_ip)
     
     if is_maintenance:
-        maintenance = admin_service.get_maintenance_mode()
+        maintenance = await admin_service.get_maintenance_mode()
         return {
             "maintenance_mode": True,
             "message": maintenance.message if maintenance else "Sistema en mantenimiento"
@@ -240,11 +240,11 @@ async def check_permissions(
     resource: str,
     action: str,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verificar permisos de administrador"""
     admin_service = AdminService(db)
-    has_permission = admin_service.check_admin_permissions(
+    has_permission = await admin_service.check_admin_permissions(
         current_user.id,
         resource,
         action
@@ -259,11 +259,11 @@ async def check_permissions(
 @router.post("/backup")
 async def create_backup(
     current_user: User = Depends(require_super_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear backup del sistema (solo super admin)"""
     admin_service = AdminService(db)
-    backup_data = admin_service.backup_system_data()
+    backup_data = await admin_service.backup_system_data()
     return {
         "message": "Backup creado exitosamente",
         "backup_data": backup_data
@@ -272,19 +272,19 @@ async def create_backup(
 # Rutas públicas
 @router.get("/public/config", response_model=List[SystemConfig])
 async def get_public_configs(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener configuraciones públicas del sistema"""
     admin_service = AdminService(db)
-    return admin_service.get_public_configs()
+    return await admin_service.get_public_configs()
 
 @router.get("/public/status")
 async def get_public_status(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener estado público del sistema"""
     admin_service = AdminService(db)
-    status_data = admin_service.get_system_status()
+    status_data = await admin_service.get_system_status()
     return {
         "total_users": status_data["total_users"],
         "total_businesses": status_data["total_businesses"],
@@ -1,21 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database.database import get_db
+from database.database import get_async_db
 from schemas.report import (
     Report, ReportCreate, ReportUpdate, Analytics, AnalyticsCreate,
     Dashboard, DashboardCreate, DashboardUpdate, BusinessMetrics,
     RevenueMetrics, DeliveryMetrics, AnalyticsFilter, ReportFilter
 )
-from services.analytics import AnalyticsService
+from services.analytics import AnalyticsService, krizoworker_stats_cache
+from services.cache import MISSING
 from auth.jwt import get_current_user
 from database.models import User, UserType
 from datetime import date, timedelta
-from sqlalchemy import func, and_, extract
+from sqlalchemy import func, and_, extract, select
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 
-from database.database import get_db
+from database.database import get_async_db
 from database.models import User, Delivery, Rating, Transaction, Payment
 from auth.jwt import get_current_user
 
@@ -28,11 +29,11 @@ router = APIRouter(
 async def create_report(
     report_data: ReportCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear un nuevo reporte"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.create_report(current_user.id, report_data)
+    return await analytics_service.create_report(current_user.id, report_data)
 
 @router.get("/reports", response_model=List[Report])
 async def get_reports(
@@ -44,7 +45,7 @@ async def get_reports(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener reportes con filtros (solo para administradores)"""
     # Verificar permisos de administrador
@@ -62,14 +63,14 @@ async def get_reports(
         business_id=business_id,
         user_id=user_id
     )
-    return analytics_service.get_reports(skip=skip, limit=limit, filters=filters)
+    return await analytics_service.get_reports(skip=skip, limit=limit, filters=filters)
 
 @router.put("/reports/{report_id}", response_model=Report)
 async def update_report(
     report_id: int,
     report_update: ReportUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar un reporte (solo para administradores)"""
     # Verificar permisos de administrador
@@ -80,13 +81,13 @@ async def update_report(
         )
     
     analytics_service = AnalyticsService(db)
-    return analytics_service.update_report(report_id, report_update)
+    return await analytics_service.update_report(report_id, report_update)
 
 @router.get("/business/{business_id}/metrics", response_model=BusinessMetrics)
 async def get_business_metrics(
     business_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener métricas generales de un negocio"""
     # Verificar que el usuario es propietario del negocio o administrador
@@ -99,7 +100,7 @@ async def get_business_metrics(
         )
     
     analytics_service = AnalyticsService(db)
-    metrics = analytics_service.get_business_metrics(business_id)
+    metrics = await analytics_service.get_business_metrics(business_id)
     return BusinessMetrics(**metrics)
 
 @router.get("/business/{business_id}/revenue", response_model=RevenueMetrics)
@@ -108,7 +109,7 @@ async def get_revenue_metrics(
     start_date: date = Query(default_factory=lambda: date.today() - timedelta(days=30)),
     end_date: date = Query(default_factory=lambda: date.today()),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener métricas de ingresos de un negocio"""
     # Verificar permisos
@@ -121,7 +122,7 @@ async def get_revenue_metrics(
         )
     
     analytics_service = AnalyticsService(db)
-    metrics = analytics_service.get_revenue_metrics(business_id, start_date, end_date)
+    metrics = await analytics_service.get_revenue_metrics(business_id, start_date, end_date)
     return RevenueMetrics(**metrics)
 
 @router.get("/business/{business_id}/deliveries", response_model=DeliveryMetrics)
@@ -130,7 +131,7 @@ async def get_delivery_metrics(
     start_date: date = Query(default_factory=lambda: date.today() - timedelta(days=30)),
     end_date: date = Query(default_factory=lambda: date.today()),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener métricas de entregas de un negocio"""
     # Verificar permisos
@@ -143,14 +144,14 @@ async def get_delivery_metrics(
         )
     
     analytics_service = AnalyticsService(db)
-    metrics = analytics_service.get_delivery_metrics(business_id, start_date, end_date)
+    metrics = await analytics_service.get_delivery_metrics(business_id, start_date, end_date)
     return DeliveryMetrics(**metrics)
 
 @router.get("/business/{business_id}/weekly-report")
 async def get_weekly_report(
     business_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener reporte semanal de un negocio"""
     # Verificar permisos
@@ -163,17 +164,17 @@ async def get_weekly_report(
         )
     
     analytics_service = AnalyticsService(db)
-    return analytics_service.generate_weekly_report(business_id)
+    return await analytics_service.generate_weekly_report(business_id)
 
 @router.post("/analytics", response_model=Analytics)
 async def create_analytics_entry(
     analytics_data: AnalyticsCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear una entrada de analytics"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.create_analytics_entry(analytics_data)
+    return await analytics_service.create_analytics_entry(analytics_data)
 
 @router.get("/analytics", response_model=List[Analytics])
 async def get_analytics(
@@ -186,7 +187,7 @@ async def get_analytics(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener datos de analytics con filtros"""
     analytics_service = AnalyticsService(db)
@@ -198,17 +199,17 @@ async def get_analytics(
         business_id=business_id,
         user_id=user_id
     )
-    return analytics_service.get_analytics(skip=skip, limit=limit, filters=filters)
+    return await analytics_service.get_analytics(skip=skip, limit=limit, filters=filters)
 
 @router.post("/dashboards", response_model=Dashboard)
 async def create_dashboard(
     dashboard_data: DashboardCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear un nuevo dashboard"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.create_dashboard(
+    return await analytics_service.create_dashboard(
         current_user.id,
         dashboard_data.dict()
     )
@@ -216,22 +217,22 @@ async def create_dashboard(
 @router.get("/dashboards", response_model=List[Dashboard])
 async def get_user_dashboards(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener dashboards del usuario"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.get_user_dashboards(current_user.id)
+    return await analytics_service.get_user_dashboards(current_user.id)
 
 @router.put("/dashboards/{dashboard_id}", response_model=Dashboard)
 async def update_dashboard(
     dashboard_id: int,
     dashboard_update: DashboardUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar un dashboard"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.update_dashboard(
+    return await analytics_service.update_dashboard(
         dashboard_id,
         current_user.id,
         dashboard_update.dict(exclude_unset=True)
@@ -241,17 +242,17 @@ async def update_dashboard(
 async def delete_dashboard(
     dashboard_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar un dashboard"""
     analytics_service = AnalyticsService(db)
-    analytics_service.delete_dashboard(dashboard_id, current_user.id)
+    await analytics_service.delete_dashboard(dashboard_id, current_user.id)
     return {"message": "Dashboard eliminado exitosamente"}
 
 @router.get("/my-business/metrics")
 async def get_my_business_metrics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener métricas del negocio del usuario actual"""
     if current_user.user_type != UserType.BUSINESS or not current_user.business_profile:
@@ -261,7 +262,7 @@ async def get_my_business_metrics(
         )
     
     analytics_service = AnalyticsService(db)
-    metrics = analytics_service.get_business_metrics(current_user.business_profile.id)
+    metrics = await analytics_service.get_business_metrics(current_user.business_profile.id)
     return BusinessMetrics(**metrics)
 
 @router.get("/my-business/revenue")
@@ -269,7 +270,7 @@ async def get_my_business_revenue(
     start_date: date = Query(default_factory=lambda: date.today() - timedelta(days=30)),
     end_date: date = Query(default_factory=lambda: date.today()),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener métricas de ingresos del negocio del usuario actual"""
     if current_user.user_type != UserType.BUSINESS or not current_user.business_profile:
@@ -279,7 +280,7 @@ async def get_my_business_revenue(
         )
     
     analytics_service = AnalyticsService(db)
-    metrics = analytics_service.get_revenue_metrics(
+    metrics = await analytics_service.get_revenue_metrics(
         current_user.business_profile.id,
         start_date,
         end_date
@@ -290,7 +291,7 @@ async def get_my_business_revenue(
 async def get_krizoworker_stats(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener estadísticas reales de un KrizoWorker"""
     
@@ -301,113 +302,29 @@ async def get_krizoworker_stats(
             detail="No tienes permisos para ver estas estadísticas"
         )
     
+    # Las estadísticas solo se cachean tras validar al KrizoWorker
+    cached = krizoworker_stats_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
+
     # Verificar que el usuario sea un KrizoWorker
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user or user.user_type != "SERVICE_PROVIDER":
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario KrizoWorker no encontrado"
         )
     
-    # Calcular fechas
-    now = datetime.utcnow()
-    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    start_of_year = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # 1. Ganancias totales (todas las transacciones completadas)
-    total_earnings = db.query(func.sum(Transaction.amount)).filter(
-        and_(
-            Transaction.user_id == user_id,
-            Transaction.type == "PAYMENT",
-            Transaction.status == "COMPLETED"
-        )
-    ).scalar() or 0.0
-    
-    # 2. Ganancias del mes actual
-    monthly_earnings = db.query(func.sum(Transaction.amount)).filter(
-        and_(
-            Transaction.user_id == user_id,
-            Transaction.type == "PAYMENT",
-            Transaction.status == "COMPLETED",
-            Transaction.created_at >= start_of_month
-        )
-    ).scalar() or 0.0
-    
-    # 3. Servicios completados (deliveries completados)
-    completed_services = db.query(func.count(Delivery.id)).filter(
-        and_(
-            Delivery.user_id == user_id,
-            Delivery.status == "completed"
-        )
-    ).scalar() or 0
-    
-    # 4. Servicios pendientes (deliveries pendientes o en progreso)
-    pending_services = db.query(func.count(Delivery.id)).filter(
-        and_(
-            Delivery.user_id == user_id,
-            Delivery.status.in_(["pending", "accepted", "in_progress"])
-        )
-    ).scalar() or 0
-    
-    # 5. Calificación promedio y número de reseñas
-    rating_stats = db.query(
-        func.avg(Rating.rating).label('avg_rating'),
-        func.count(Rating.id).label('total_reviews')
-    ).filter(
-        Rating.user_id == user_id
-    ).first()
-    
-    avg_rating = float(rating_stats.avg_rating) if rating_stats.avg_rating else 0.0
-    total_reviews = rating_stats.total_reviews or 0
-    
-    # 6. Tasa de aceptación (deliveries aceptados vs total de solicitudes)
-    total_requests = db.query(func.count(Delivery.id)).filter(
-        Delivery.user_id == user_id
-    ).scalar() or 0
-    
-    accepted_requests = db.query(func.count(Delivery.id)).filter(
-        and_(
-            Delivery.user_id == user_id,
-            Delivery.status.in_(["accepted", "in_progress", "completed"])
-        )
-    ).scalar() or 0
-    
-    acceptance_rate = (accepted_requests / total_requests * 100) if total_requests > 0 else 0
-    
-    # 7. Tiempo promedio de respuesta (tiempo entre creación y aceptación)
-    response_times = db.query(
-        func.avg(
-            func.extract('epoch', Delivery.updated_at - Delivery.created_at) / 60
-        ).label('avg_response_minutes')
-    ).filter(
-        and_(
-            Delivery.user_id == user_id,
-            Delivery.status.in_(["accepted", "in_progress", "completed"]),
-            Delivery.updated_at != Delivery.created_at
-        )
-    ).scalar() or 0
-    
-    avg_response_minutes = int(response_times) if response_times else 0
-    
-    return {
-        "total_earnings": round(total_earnings, 2),
-        "monthly_earnings": round(monthly_earnings, 2),
-        "completed_services": completed_services,
-        "pending_services": pending_services,
-        "average_rating": round(avg_rating, 1),
-        "total_reviews": total_reviews,
-        "acceptance_rate": round(acceptance_rate, 0),
-        "response_time_minutes": avg_response_minutes,
-        "user_id": user_id,
-        "calculated_at": now.isoformat()
-    }
+    stats = await AnalyticsService(db).get_krizoworker_stats(user_id)
+    krizoworker_stats_cache.set(user_id, stats)
+    return stats
 
 @router.get("/krizoworker/recent-deliveries/{user_id}")
 async def get_krizoworker_recent_deliveries(
     user_id: int,
     limit: int = 10,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener entregas recientes de un KrizoWorker"""
     
@@ -419,11 +336,11 @@ async def get_krizoworker_recent_deliveries(
         )
     
     # Obtener entregas recientes
-    recent_deliveries = db.query(Delivery).filter(
+    recent_deliveries = (await db.scalars(select(Delivery).where(
         Delivery.user_id == user_id
     ).order_by(
         Delivery.created_at.desc()
-    ).limit(limit).all()
+    ).limit(limit))).all()
     
     return [
         {
@@ -444,7 +361,7 @@ async def get_krizoworker_earnings_chart(
     user_id: int,
     period: str = "month",  # month, week, year
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener datos para gráfico de ganancias"""
     
@@ -470,10 +387,10 @@ async def get_krizoworker_earnings_chart(
         start_date = now - timedelta(days=365)
         group_by = func.date_trunc('month', Transaction.created_at)
     
-    earnings_data = db.query(
+    earnings_data = (await db.execute(select(
         group_by.label('date'),
         func.sum(Transaction.amount).label('earnings')
-    ).filter(
+    ).where(
         and_(
             Transaction.user_id == user_id,
             Transaction.type == "PAYMENT",
@@ -484,7 +401,7 @@ async def get_krizoworker_earnings_chart(
         group_by
     ).order_by(
         group_by
-    ).all()
+    ))).all()
     
     return [
         {
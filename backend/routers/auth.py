@@ -7,12 +7,15 @@ from database.database import get_db
 from database.models import User as UserModel
 from schemas.user import UserCreate, User, UserRegisterResponse, UserTypeEnum, VerificationStatusEnum, UserMe
 from pydantic import BaseModel
+from auth.passwords import password_hasher, verify_user_password
+from typing import Optional
 from auth.jwt import (
-    verify_password,
-    get_password_hash,
-    create_access_token,
+    issue_tokens,
+    rotate_refresh_token,
+    revoke_session,
+    revoke_user_sessions,
     get_current_active_user,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
+    optional_oauth2_scheme,
 )
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -27,8 +30,14 @@ class RegisterRequest(BaseModel):
     address: str
     userType: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 @router.post("/register", response_model=UserRegisterResponse)
-def register(user_data: RegisterRequest, db: Session = Depends(get_db)):
+async def register(user_data: RegisterRequest, db: Session = Depends(get_db)):
     # Verificar si el usuario ya existe por email, teléfono o cédula
     db_user = db.query(UserModel).filter(
         (UserModel.email == user_data.email) | 
@@ -55,7 +64,7 @@ def register(user_data: RegisterRequest, db: Session = Depends(get_db)):
             )
     
     # Crear nuevo usuario
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = UserModel(
         email=user_data.email,
         phone=user_data.phone,
@@ -94,21 +103,15 @@ async def login(
     # Buscar usuario por email
     user = db.query(UserModel).filter(UserModel.email == credentials.get("email")).first()
     
-    if not user or not verify_password(credentials.get("password"), user.hashed_password):
+    if not await verify_user_password(user, credentials.get("password"), db):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-    
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **issue_tokens(user),
         "user": {
             "id": user.id,
             "first_name": user.first_name,
@@ -135,21 +138,15 @@ async def login_token(
         (UserModel.cedula == form_data.username)
     ).first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not await verify_user_password(user, form_data.password, db):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-    
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **issue_tokens(user),
         "user": {
             "id": user.id,
             "email": user.email,
@@ -176,12 +173,34 @@ async def read_users_me(current_user: UserModel = Depends(get_current_active_use
         updated_at=current_user.updated_at or current_user.created_at  # Usar created_at si updated_at es None
     )
 
+@router.post("/refresh")
+async def refresh(body: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Canjear el refresh token por un nuevo par; el anterior deja de ser válido
+    """
+    return rotate_refresh_token(body.refresh_token, db)
+
 @router.post("/logout")
-async def logout():
+async def logout(
+    body: Optional[LogoutRequest] = None,
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+):
     """
-    Endpoint de logout - En una implementación real, aquí invalidarías el token
+    Endpoint de logout - revoca el access token actual y el refresh token si se envía
     """
+    revoke_session(token, body.refresh_token if body else None)
     return {
         "message": "Logout exitoso",
         "status": "success"
+    }
+
+@router.post("/logout-all")
+async def logout_all(current_user: UserModel = Depends(get_current_active_user)):
+    """
+    Cerrar todas las sesiones del usuario en todos los dispositivos
+    """
+    revoke_user_sessions(current_user.id)
+    return {
+        "message": "Todas las sesiones fueron cerradas",
+        "status": "success"
     } 
\ No newline at end of file
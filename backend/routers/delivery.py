@@ -5,25 +5,11 @@ from database.database import get_db
 from database.models import User, Delivery, Service
 from schemas.service import DeliveryCreate, Delivery as DeliverySchema
 from auth.jwt import get_current_active_user
-import math
+from services.geodesic import haversine_km
 from datetime import datetime
 
 router = APIRouter(prefix="/delivery", tags=["delivery"])
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calcula la distancia entre dos puntos usando la fórmula de Haversine"""
-    R = 6371  # Radio de la Tierra en kilómetros
-
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    distance = R * c
-
-    return distance
-
 @router.post("/", response_model=DeliverySchema)
 async def create_delivery(
     delivery_data: DeliveryCreate,
@@ -43,7 +29,7 @@ async def create_delivery(
         )
     
     # Calcular la distancia y el precio
-    distance = calculate_distance(
+    distance = haversine_km(
         delivery_data.pickup_location["lat"],
         delivery_data.pickup_location["lng"],
         delivery_data.delivery_location["lat"],
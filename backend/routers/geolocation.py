@@ -3,9 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List
 from database.database import get_db
 from schemas.geolocation import (
-    Location, LocationCreate, DistanceResponse, GeocodingResponse
+    Location, LocationCreate, DistanceBatchRequest, DistanceResponse, GeocodingResponse
 )
-from services.geolocation import GeolocationService
+from services.geolocation import GeolocationService, get_geolocation_service
 from auth.jwt import get_current_user
 from database.models import User, Location as LocationModel
 
@@ -112,11 +112,10 @@ async def delete_location(
 async def calculate_distance(
     origin: LocationCreate,
     destination: LocationCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    geolocation_service: GeolocationService = Depends(get_geolocation_service)
 ):
     """Calcular distancia y costo de envío entre dos ubicaciones"""
-    geolocation_service = GeolocationService()
-    
     # Crear objetos Location para el cálculo
     origin_location = LocationModel(**origin.dict())
     destination_location = LocationModel(**destination.dict())
@@ -143,13 +142,43 @@ async def calculate_distance(
         is_within_radius=is_within_radius
     )
 
+@router.post("/calculate-distances", response_model=List[DistanceResponse])
+async def calculate_distances(
+    request: DistanceBatchRequest,
+    geolocation_service: GeolocationService = Depends(get_geolocation_service)
+):
+    """Calcular distancia y costo de envío desde un origen hasta varios destinos"""
+    origin_location = LocationModel(**request.origin.dict())
+    destination_locations = [
+        LocationModel(**destination.dict()) for destination in request.destinations
+    ]
+
+    # Una llamada a la API por cada lote de destinos, en paralelo
+    distances = await geolocation_service.calculate_distances(
+        origin_location,
+        destination_locations
+    )
+
+    return [
+        DistanceResponse(
+            distance_km=distance_km,
+            duration_minutes=duration_minutes,
+            delivery_fee=geolocation_service.calculate_delivery_fee(distance_km),
+            is_within_radius=geolocation_service.is_within_delivery_radius(
+                origin_location,
+                destination_location
+            )
+        )
+        for destination_location, (distance_km, duration_minutes) in zip(destination_locations, distances)
+    ]
+
 @router.get("/geocode", response_model=GeocodingResponse)
 async def geocode_address(
     address: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    geolocation_service: GeolocationService = Depends(get_geolocation_service)
 ):
     """Obtener coordenadas a partir de una dirección"""
-    geolocation_service = GeolocationService()
     coordinates = await geolocation_service.get_coordinates_from_address(address)
     
     if not coordinates:
@@ -173,10 +202,10 @@ async def geocode_address(
 async def reverse_geocode(
     latitude: float,
     longitude: float,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    geolocation_service: GeolocationService = Depends(get_geolocation_service)
 ):
     """Obtener dirección a partir de coordenadas"""
-    geolocation_service = GeolocationService()
     address = await geolocation_service.get_address_from_coordinates(
         latitude,
         longitude
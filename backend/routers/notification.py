@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database.database import get_db
+from database.database import get_async_db
 from schemas.notification import (
     Notification, NotificationCreate, NotificationPreference,
     DeviceTokenCreate, NotificationResponse
 )
 from services.notification import NotificationService
-from auth.jwt import get_current_user
-from database.models import User
+from auth.jwt import get_current_principal
+from auth.principals import Principal
 
 router = APIRouter(
     prefix="/notifications",
@@ -20,12 +20,12 @@ async def get_notifications(
     skip: int = 0,
     limit: int = 20,
     unread_only: bool = False,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener las notificaciones del usuario"""
     notification_service = NotificationService(db)
-    notifications = notification_service.get_user_notifications(
+    notifications = await notification_service.get_user_notifications(
         current_user.id,
         skip=skip,
         limit=limit,
@@ -35,23 +35,23 @@ async def get_notifications(
 
 @router.get("/unread/count")
 async def get_unread_count(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener el número de notificaciones no leídas"""
     notification_service = NotificationService(db)
-    count = notification_service.get_unread_count(current_user.id)
+    count = await notification_service.get_unread_count(current_user.id)
     return {"count": count}
 
 @router.post("/{notification_id}/read")
 async def mark_as_read(
     notification_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Marcar una notificación como leída"""
     notification_service = NotificationService(db)
-    notification = notification_service.mark_notification_as_read(
+    notification = await notification_service.mark_notification_as_read(
         notification_id,
         current_user.id
     )
@@ -59,33 +59,33 @@ async def mark_as_read(
 
 @router.post("/read/all")
 async def mark_all_as_read(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Marcar todas las notificaciones como leídas"""
     notification_service = NotificationService(db)
-    notification_service.mark_all_as_read(current_user.id)
+    await notification_service.mark_all_as_read(current_user.id)
     return {"message": "Todas las notificaciones han sido marcadas como leídas"}
 
 @router.get("/preferences", response_model=NotificationPreference)
 async def get_notification_preferences(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener las preferencias de notificación del usuario"""
     notification_service = NotificationService(db)
-    preferences = notification_service.get_notification_preferences(current_user.id)
+    preferences = await notification_service.get_notification_preferences(current_user.id)
     return preferences
 
 @router.put("/preferences", response_model=NotificationPreference)
 async def update_notification_preferences(
     preferences: NotificationPreference,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar las preferencias de notificación del usuario"""
     notification_service = NotificationService(db)
-    updated_preferences = notification_service.update_notification_preferences(
+    updated_preferences = await notification_service.update_notification_preferences(
         current_user.id,
         preferences.dict()
     )
@@ -94,12 +94,12 @@ async def update_notification_preferences(
 @router.post("/device-token", response_model=DeviceTokenCreate)
 async def register_device_token(
     device_token: DeviceTokenCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Registrar un token de dispositivo para notificaciones push"""
     notification_service = NotificationService(db)
-    token = notification_service.register_device_token(
+    token = await notification_service.register_device_token(
         current_user.id,
         device_token.token,
         device_token.device_type
@@ -109,10 +109,10 @@ async def register_device_token(
 @router.delete("/device-token/{token}")
 async def unregister_device_token(
     token: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar un token de dispositivo"""
     notification_service = NotificationService(db)
-    notification_service.unregister_device_token(token)
+    await notification_service.unregister_device_token(token)
     return {"message": "Token de dispositivo eliminado exitosamente"} 
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Request
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from typing import List
-from database.database import get_db
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import get_db, get_async_db
 from database.models import User, Wallet, Transaction, Payment, PaymentMethod, PaymentStatus, TransactionType
 from schemas.payment import (
     Wallet as WalletSchema,
@@ -22,18 +24,16 @@ from schemas.payment import (
 from auth.jwt import get_current_active_user
 from datetime import datetime
 from payment.paypal import PayPalService
-from payment.binance import BinancePayService
+from payment.binance import BinancePayService, get_binance_service
+from payment.exchange_rates import exchange_rates
+from services.binance_payments import BinancePaymentService
+from services.wallet_ledger import WalletLedgerService
+from services.idempotency import idempotent
+import json
 import os
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
-# Inicializar servicios de pago
-try:
-    binance_service = BinancePayService()
-except ValueError:
-    print("⚠️ Binance Pay no disponible - credenciales no configuradas")
-    binance_service = None
-
 @router.post("/wallet", response_model=WalletSchema)
 async def create_wallet(
     current_user: User = Depends(get_current_active_user),
@@ -202,8 +202,10 @@ async def set_default_payment_method(
     return {"message": "Método de pago establecido como predeterminado", "method": db_payment_method}
 
 @router.post("/deposit", response_model=PaymentResponse)
+@idempotent("deposit", PaymentResponse)
 async def deposit_money(
     payment: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -253,7 +255,7 @@ async def deposit_money(
     # Por ahora, simulamos un pago exitoso
     transaction.status = PaymentStatus.COMPLETED
     db_payment.status = PaymentStatus.COMPLETED
-    wallet.balance += payment.amount
+    WalletLedgerService(db).credit(wallet.id, payment.amount, "deposit", transaction.id)
     
     db.commit()
     db.refresh(transaction)
@@ -267,8 +269,10 @@ async def deposit_money(
     )
 
 @router.post("/withdraw", response_model=PaymentResponse)
+@idempotent("withdraw", PaymentResponse)
 async def withdraw_money(
     payment: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -280,13 +284,6 @@ async def withdraw_money(
             detail="Billetera no encontrada"
         )
     
-    # Verificar saldo suficiente
-    if wallet.balance < payment.amount:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Saldo insuficiente"
-        )
-    
     # Verificar el método de pago
     payment_method = db.query(PaymentMethod).filter(
         PaymentMethod.id == payment.payment_method_id,
@@ -325,7 +322,8 @@ async def withdraw_money(
     # Por ahora, simulamos un pago exitoso
     transaction.status = PaymentStatus.COMPLETED
     db_payment.status = PaymentStatus.COMPLETED
-    wallet.balance -= payment.amount
+    # Débito condicional al saldo: sin fondos responde 400 y no se guarda nada
+    WalletLedgerService(db).debit(wallet.id, payment.amount, "withdrawal", transaction.id)
     
     db.commit()
     db.refresh(transaction)
@@ -428,24 +426,30 @@ async def paypal_success(
             detail="Pago no encontrado"
         )
     
-    # Ejecutar el pago en PayPal
-    paypal_result = await PayPalService.execute_payment(
-        payment_id=payment.payment_provider_id,
-        payer_id=PayerID
-    )
-    
-    # Actualizar el estado de la transacción y el pago
-    transaction.status = PaymentStatus.COMPLETED
-    payment.status = PaymentStatus.COMPLETED
+    # Una confirmación repetida no vuelve a ejecutar ni abonar el pago
+    if transaction.status == PaymentStatus.PENDING:
+        # Ejecutar el pago en PayPal
+        paypal_result = await PayPalService.execute_payment(
+            payment_id=payment.payment_provider_id,
+            payer_id=PayerID
+        )
+        
+        # Actualizar el estado de la transacción y el pago; solo quien hace la
+        # transición desde PENDING abona el saldo
+        claimed = db.execute(
+            update(Transaction)
+            .where(Transaction.id == transaction.id, Transaction.status == PaymentStatus.PENDING)
+            .values(status=PaymentStatus.COMPLETED)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        payment.status = PaymentStatus.COMPLETED
+        if claimed:
+            WalletLedgerService(db).credit(transaction.wallet_id, transaction.amount, "deposit", transaction.id)
+        db.commit()
     
-    # Actualizar el saldo de la billetera
     wallet = db.query(Wallet).filter(Wallet.id == transaction.wallet_id).first()
-    wallet.balance += transaction.amount
-    
-    db.commit()
     db.refresh(transaction)
     db.refresh(payment)
-    db.refresh(wallet)
     
     return {
         "transaction": transaction,
@@ -511,42 +515,60 @@ async def refund_payment(
             detail="Pago no encontrado"
         )
     
-    # Verificar que el pago esté completado
-    if payment.status != PaymentStatus.COMPLETED:
+    # Reservar el reembolso antes de llamar a PayPal, sin retener bloqueos durante
+    # la llamada: el pago pasa de COMPLETED a REFUNDED (solo una petición lo logra)
+    # y el saldo se debita de forma condicional
+    claimed = db.execute(
+        update(Payment)
+        .where(Payment.id == payment.id, Payment.status == PaymentStatus.COMPLETED)
+        .values(status=PaymentStatus.REFUNDED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        # Cerrar la transacción ya: en SQLite el UPDATE sin filas retiene el bloqueo de escritura
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El pago debe estar completado para poder reembolsarlo"
         )
     
-    # Procesar el reembolso en PayPal
-    refund_result = await PayPalService.refund_payment(
-        payment_id=payment.payment_provider_id,
-        amount=amount
-    )
+    refund_amount = amount if amount is not None else payment.amount
+    wallet_id = payment.transaction.wallet_id
     
     # Crear la transacción de reembolso
     transaction = Transaction(
         user_id=current_user.id,
-        wallet_id=payment.transaction.wallet_id,
-        amount=float(refund_result["amount"]),
+        wallet_id=wallet_id,
+        amount=refund_amount,
         type=TransactionType.REFUND,
-        status=PaymentStatus.COMPLETED,
+        status=PaymentStatus.PENDING,
         description=f"Reembolso del pago {payment.id}",
         meta_data={"original_payment_id": payment.id}
     )
     db.add(transaction)
+    db.flush()
+    WalletLedgerService(db).debit(wallet_id, refund_amount, "refund", transaction.id)
+    db.commit()
     
-    # Actualizar el saldo de la billetera
-    wallet = db.query(Wallet).filter(Wallet.id == transaction.wallet_id).first()
-    wallet.balance -= float(refund_result["amount"])
-    
-    # Actualizar el estado del pago original
-    payment.status = PaymentStatus.REFUNDED
+    # Procesar el reembolso en PayPal
+    try:
+        refund_result = await PayPalService.refund_payment(
+            payment_id=payment.payment_provider_id,
+            amount=amount
+        )
+    except Exception:
+        # Revertir la reserva: asiento compensatorio y pago de nuevo completado
+        WalletLedgerService(db).credit(wallet_id, refund_amount, "reversal", transaction.id)
+        transaction.status = PaymentStatus.FAILED
+        payment.status = PaymentStatus.COMPLETED
+        db.commit()
+        raise
     
+    transaction.status = PaymentStatus.COMPLETED
     db.commit()
+    wallet = db.query(Wallet).filter(Wallet.id == wallet_id).first()
     db.refresh(transaction)
     db.refresh(payment)
-    db.refresh(wallet)
     
     return {
         "transaction": transaction,
@@ -556,21 +578,18 @@ async def refund_payment(
     }
 
 @router.post("/binance/create", response_model=BinancePayResponse)
+@idempotent("binance_create", BinancePayResponse)
 async def create_binance_payment(
     payment_request: BinancePayRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    binance_service: BinancePayService = Depends(get_binance_service)
 ):
     """Crear pago con Binance Pay"""
-    if not binance_service:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Servicio de Binance Pay no disponible"
-        )
-    
     try:
         # Crear orden de pago con Binance
-        binance_order = binance_service.create_payment_order(
+        binance_order = await binance_service.create_payment_order(
             amount=payment_request.amount,
             currency=payment_request.currency,
             crypto_currency=payment_request.crypto_currency,
@@ -622,10 +641,14 @@ async def create_binance_payment(
             currency=binance_order["currency"],
             crypto_amount=binance_order.get("crypto_amount"),
             crypto_currency=binance_order.get("crypto_currency"),
+            exchange_rate=binance_order.get("exchange_rate"),
+            exchange_rate_age=binance_order.get("exchange_rate_age"),
             status=binance_order["status"],
             expires_at=binance_order["expires_at"]
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -636,77 +659,58 @@ async def create_binance_payment(
 async def check_binance_payment_status(
     prepay_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Verificar estado de un pago de Binance Pay"""
-    if not binance_service:
+    """
+    Verificar estado de un pago de Binance Pay. Se lee de la base de datos:
+    el webhook y el conciliador son quienes lo actualizan
+    """
+    payment_status = await BinancePaymentService(db).get_status(prepay_id, current_user.id)
+    if payment_status is None:
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Servicio de Binance Pay no disponible"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pago no encontrado"
         )
-    
-    try:
-        # Verificar estado con Binance
-        binance_status = binance_service.check_payment_status(prepay_id)
-        
-        # Si el pago fue completado, actualizar la base de datos
-        if binance_status["status"] == "PAID":
-            payment = db.query(Payment).filter(
-                Payment.binance_prepay_id == prepay_id
-            ).first()
-            
-            if payment:
-                payment.status = PaymentStatus.COMPLETED
-                payment.payment_provider_id = binance_status.get("transaction_id")
-                
-                # Actualizar transacción
-                transaction = db.query(Transaction).filter(
-                    Transaction.id == payment.transaction_id
-                ).first()
-                
-                if transaction:
-                    transaction.status = PaymentStatus.COMPLETED
-                    
-                    # Actualizar saldo de la wallet
-                    wallet = db.query(Wallet).filter(Wallet.id == transaction.wallet_id).first()
-                    if wallet:
-                        wallet.balance += transaction.amount
-                
-                db.commit()
-        
-        return BinancePayStatus(
-            prepay_id=prepay_id,
-            status=binance_status["status"],
-            transaction_id=binance_status.get("transaction_id"),
-            amount=binance_status["amount"],
-            currency=binance_status["currency"],
-            crypto_amount=binance_status.get("crypto_amount"),
-            crypto_currency=binance_status.get("crypto_currency"),
-            paid_at=binance_status.get("paid_at")
+    return BinancePayStatus(**payment_status)
+
+@router.post("/binance/webhook")
+async def binance_webhook(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    binance_service: BinancePayService = Depends(get_binance_service)
+):
+    """Notificaciones de Binance Pay (firmadas con BinancePay-Signature)"""
+    body = await request.body()
+    if not await binance_service.verify_webhook(request.headers, body):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Firma de Binance Pay inválida"
         )
-        
-    except Exception as e:
+    try:
+        event = json.loads(body)
+    except ValueError:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al verificar estado del pago: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Notificación inválida"
         )
 
+    await BinancePaymentService(db).handle_webhook(event)
+    # Binance reintenta la notificación hasta recibir SUCCESS
+    return {"returnCode": "SUCCESS", "returnMessage": None}
+
 @router.post("/crypto/create", response_model=CryptoPaymentResponse)
+@idempotent("crypto_create", CryptoPaymentResponse)
 async def create_crypto_payment(
     payment_request: CryptoPaymentRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    binance_service: BinancePayService = Depends(get_binance_service)
 ):
     """Crear pago directo con crypto (sin Binance Pay)"""
-    if not binance_service:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Servicio de Binance Pay no disponible"
-        )
-    
     try:
         # Crear pago crypto
-        crypto_payment = binance_service.create_crypto_payment(
+        crypto_payment = await binance_service.create_crypto_payment(
             amount_usd=payment_request.amount,
             crypto_currency=payment_request.crypto_currency,
             wallet_address=payment_request.wallet_address
@@ -752,9 +756,12 @@ async def create_crypto_payment(
             wallet_address=crypto_payment["wallet_address"],
             qr_code=crypto_payment["qr_code"],
             exchange_rate=crypto_payment["exchange_rate"],
+            exchange_rate_age=crypto_payment.get("exchange_rate_age"),
             expires_at=crypto_payment["expires_at"]
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -762,14 +769,10 @@ async def create_crypto_payment(
         )
 
 @router.get("/crypto/supported")
-async def get_supported_cryptocurrencies():
+async def get_supported_cryptocurrencies(
+    binance_service: BinancePayService = Depends(get_binance_service)
+):
     """Obtener lista de criptomonedas soportadas"""
-    if not binance_service:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Servicio de Binance Pay no disponible"
-        )
-    
     try:
         return binance_service.get_supported_cryptocurrencies()
     except Exception as e:
@@ -778,12 +781,21 @@ async def get_supported_cryptocurrencies():
             detail=f"Error al obtener criptomonedas soportadas: {str(e)}"
         )
 
+@router.get("/crypto/rates")
+async def get_exchange_rates():
+    """Cotizaciones en memoria usadas para cobrar, con su antigüedad"""
+    return {
+        "max_age_seconds": exchange_rates.max_age,
+        "quotes": [quote.as_dict() for quote in exchange_rates.quotes()]
+    }
+
 @router.post("/binance/refund/{transaction_id}")
 async def refund_binance_payment(
     transaction_id: str,
     amount: float,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    binance_service: BinancePayService = Depends(get_binance_service)
 ):
     """Procesar reembolso de un pago de Binance Pay"""
     try:
@@ -799,12 +811,50 @@ async def refund_binance_payment(
                 detail="Pago no encontrado"
             )
         
-        # Procesar reembolso con Binance
-        refund_result = binance_service.refund_payment(transaction_id, amount)
+        if amount <= 0 or amount > payment.amount:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El monto del reembolso debe ser positivo y no superar el del pago"
+            )
         
-        # Crear transacción de reembolso
         wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+        if not wallet:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Wallet no encontrada"
+            )
+        
+        # Reservar el reembolso antes de llamar a Binance, igual que refund_payment:
+        # el pago pasa de COMPLETED a REFUNDED y solo una petición lo logra
+        claimed = db.execute(
+            update(Payment)
+            .where(Payment.id == payment.id, Payment.status == PaymentStatus.COMPLETED)
+            .values(status=PaymentStatus.REFUNDED)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            # Cerrar la transacción ya: en SQLite el UPDATE sin filas retiene el bloqueo de escritura
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El pago debe estar completado para poder reembolsarlo"
+            )
+        db.commit()
         
+        # Procesar reembolso con Binance; si falla, el pago vuelve a estar completado
+        try:
+            refund_result = await binance_service.refund_payment(transaction_id, amount)
+        except Exception:
+            db.execute(
+                update(Payment)
+                .where(Payment.id == payment.id, Payment.status == PaymentStatus.REFUNDED)
+                .values(status=PaymentStatus.COMPLETED)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            raise
+        
+        # Crear transacción de reembolso
         refund_transaction = Transaction(
             user_id=current_user.id,
             wallet_id=wallet.id,
@@ -815,9 +865,10 @@ async def refund_binance_payment(
             meta_data={"original_payment_id": payment.id}
         )
         db.add(refund_transaction)
+        db.flush()
         
         # Actualizar saldo de la wallet
-        wallet.balance += amount
+        WalletLedgerService(db).credit(wallet.id, amount, "refund", refund_transaction.id)
         
         db.commit()
         
@@ -828,6 +879,8 @@ async def refund_binance_payment(
             "message": "Reembolso procesado exitosamente"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database.database import get_db
+from database.database import get_async_db
 from schemas.rating import (
     Rating, RatingCreate, RatingUpdate, RatingWithDetails,
     BusinessRatingSummary, RatingFilter, ReviewImage, RatingResponse,
@@ -20,11 +20,11 @@ router = APIRouter(
 async def create_rating(
     rating_data: RatingCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear una nueva calificación"""
     rating_service = RatingService(db)
-    return rating_service.create_rating(current_user.id, rating_data)
+    return await rating_service.create_rating(current_user.id, rating_data)
 
 @router.get("/", response_model=List[Rating])
 async def get_ratings(
@@ -35,7 +35,7 @@ async def get_ratings(
     max_rating: Optional[int] = Query(None, ge=1, le=5),
     has_review: Optional[bool] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener calificaciones con filtros"""
     rating_service = RatingService(db)
@@ -47,14 +47,14 @@ async def get_ratings(
             max_rating=max_rating,
             has_review=has_review
         )
-        return rating_service.get_business_ratings(
+        return await rating_service.get_business_ratings(
             business_id,
             skip=skip,
             limit=limit,
             filters=filters
         )
     else:
-        return rating_service.get_user_ratings(
+        return await rating_service.get_user_ratings(
             current_user.id,
             skip=skip,
             limit=limit
@@ -65,11 +65,11 @@ async def get_my_ratings(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener las calificaciones del usuario actual"""
     rating_service = RatingService(db)
-    return rating_service.get_user_ratings(
+    return await rating_service.get_user_ratings(
         current_user.id,
         skip=skip,
         limit=limit
@@ -79,11 +79,11 @@ async def get_my_ratings(
 async def get_rating(
     rating_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener una calificación específica con detalles"""
     rating_service = RatingService(db)
-    rating_details = rating_service.get_rating_with_details(rating_id)
+    rating_details = await rating_service.get_rating_with_details(rating_id)
     
     if not rating_details:
         raise HTTPException(
@@ -98,11 +98,11 @@ async def update_rating(
     rating_id: int,
     rating_update: RatingUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar una calificación"""
     rating_service = RatingService(db)
-    return rating_service.update_rating(
+    return await rating_service.update_rating(
         rating_id,
         current_user.id,
         rating_update
@@ -112,28 +112,24 @@ async def update_rating(
 async def delete_rating(
     rating_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar una calificación"""
     rating_service = RatingService(db)
-    rating_service.delete_rating(rating_id, current_user.id)
+    await rating_service.delete_rating(rating_id, current_user.id)
     return {"message": "Calificación eliminada exitosamente"}
 
 @router.get("/business/{business_id}/summary", response_model=BusinessRatingSummary)
 async def get_business_rating_summary(
     business_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener resumen de calificaciones de un negocio"""
     rating_service = RatingService(db)
-    summary = rating_service.get_business_rating_summary(business_id)
+    summary = await rating_service.get_business_rating_summary(business_id)
     
     # Obtener calificaciones recientes
-    recent_ratings = rating_service.get_business_ratings(
-        business_id,
-        skip=0,
-        limit=5
-    )
+    recent_ratings = await rating_service.get_recent_ratings(business_id)
     
     return BusinessRatingSummary(
         **summary,
@@ -145,11 +141,11 @@ async def add_review_image(
     rating_id: int,
     image_data: ReviewImageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Agregar imagen a una reseña"""
     rating_service = RatingService(db)
-    return rating_service.add_review_image(
+    return await rating_service.add_review_image(
         rating_id,
         current_user.id,
         image_data.image_url
@@ -160,7 +156,7 @@ async def create_rating_response(
     rating_id: int,
     response_data: RatingResponseCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear respuesta del negocio a una calificación"""
     # Verificar que el usuario es un negocio
@@ -171,7 +167,7 @@ async def create_rating_response(
         )
     
     rating_service = RatingService(db)
-    return rating_service.create_rating_response(
+    return await rating_service.create_rating_response(
         rating_id,
         current_user.business_profile.id,
         response_data.response
@@ -184,28 +180,21 @@ async def get_business_reviews(
     limit: int = Query(20, ge=1, le=100),
     min_rating: Optional[int] = Query(None, ge=1, le=5),
     max_rating: Optional[int] = Query(None, ge=1, le=5),
-    db: Session = Depends(get_db)
+    has_review: Optional[bool] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obtener todas las reseñas de un negocio"""
+    """Obtener las reseñas de un negocio con imágenes, respuestas y nombres"""
     rating_service = RatingService(db)
     filters = RatingFilter(
         business_id=business_id,
         min_rating=min_rating,
-        max_rating=max_rating
+        max_rating=max_rating,
+        has_review=has_review
     )
     
-    ratings = rating_service.get_business_ratings(
+    return await rating_service.get_business_ratings_with_details(
         business_id,
         skip=skip,
         limit=limit,
         filters=filters
     )
-    
-    # Obtener detalles completos para cada calificación
-    detailed_ratings = []
-    for rating in ratings:
-        details = rating_service.get_rating_with_details(rating.id)
-        if details:
-            detailed_ratings.append(details)
-    
-    return detailed_ratings 
\ No newline at end of file
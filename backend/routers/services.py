@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 import random
-import math
 
 from database.database import get_db
 from models_simple import User as UserModel, ServiceProfile
 from auth.jwt import get_current_active_user
+from services.geodesic import haversine_one_to_many
+from services.marketplace import build_krizoworkers_query, decode_cursor, encode_cursor, parse_services
 
 router = APIRouter(prefix="/services", tags=["services"])
 
@@ -39,25 +41,51 @@ class ServiceProfileRequest(BaseModel):
     location: dict
     vehicle_data: Optional[dict] = None
 
-def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Calcular distancia entre dos puntos usando la fórmula de Haversine"""
-    R = 6371  # Radio de la Tierra en kilómetros
-    
-    lat1_rad = math.radians(lat1)
-    lng1_rad = math.radians(lng1)
-    lat2_rad = math.radians(lat2)
-    lng2_rad = math.radians(lng2)
-    
-    dlat = lat2_rad - lat1_rad
-    dlng = lng2_rad - lng1_rad
-    
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
+def _page_distances(rows, lat: Optional[float], lng: Optional[float]) -> dict:
+    """Calcular todas las distancias de la página en una sola operación"""
+    if not (lat and lng):
+        return {}
+    located = [
+        row[1] for row in rows
+        if row[1].location_lat and row[1].location_lng
+    ]
+    if not located:
+        return {}
+    located_distances = haversine_one_to_many(
+        lat, lng,
+        [profile.location_lat for profile in located],
+        [profile.location_lng for profile in located]
+    )
+    return {
+        profile.id: float(distance)
+        for profile, distance in zip(located, located_distances)
+    }
+
+def _build_worker_response(user: UserModel, profile: ServiceProfile, distance: float) -> KrizoWorkerResponse:
+    return KrizoWorkerResponse(
+        id=user.id,
+        name=f"{user.first_name} {user.last_name}",
+        rating=profile.average_rating or 4.0,
+        review_count=profile.total_reviews or 0,
+        services=profile.services or [],
+        experience=profile.experience_years or 1,
+        distance=distance,
+        is_online=profile.is_online,
+        response_time=random.randint(5, 30),  # Simulado por ahora
+        hourly_rate=random.uniform(25, 100),  # Simulado por ahora
+        location={
+            "lat": profile.location_lat or 10.4806,
+            "lng": profile.location_lng or -66.9036,
+            "address": profile.location_address or "Caracas, Venezuela"
+        },
+        description=profile.professional_description or f"Profesional con {profile.experience_years or 1} años de experiencia.",
+        specializations=profile.services or [],
+        available_hours=profile.available_hours or {"start": "07:00", "end": "19:00"}
+    )
 
 @router.get("/marketplace", response_model=List[KrizoWorkerResponse])
 async def get_krizoworkers(
+    response: Response,
     lat: Optional[float] = Query(None, description="Latitud del usuario"),
     lng: Optional[float] = Query(None, description="Longitud del usuario"),
     max_distance: Optional[float] = Query(50, description="Distancia máxima en km"),
@@ -65,87 +93,84 @@ async def get_krizoworkers(
     min_rating: Optional[float] = Query(0, description="Rating mínimo"),
     online_only: Optional[bool] = Query(False, description="Solo trabajadores en línea"),
     sort_by: Optional[str] = Query("distance", description="Ordenar por: distance, rating, price, experience"),
+    limit: int = Query(50, ge=1, le=200, description="Cantidad máxima de resultados"),
+    offset: int = Query(0, ge=0, description="Resultados a omitir (ignorado si se envía cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (header X-Next-Cursor)"),
+    stream: bool = Query(False, description="Emitir los resultados como NDJSON"),
     db: Session = Depends(get_db)
 ):
     """
-    Obtener lista de KrizoWorkers disponibles ordenados por proximidad
+    Obtener lista de KrizoWorkers disponibles ordenados por proximidad.
+    Si hay más resultados, el header X-Next-Cursor trae el cursor de la página siguiente.
     """
+    cursor_values = None
+    if cursor:
+        try:
+            cursor_values = decode_cursor(cursor, sort_by, lat, lng)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        # Obtener todos los KrizoWorkers con sus perfiles de servicio
-        workers_query = db.query(UserModel, ServiceProfile).join(
-            ServiceProfile, UserModel.id == ServiceProfile.user_id
-        ).filter(
-            UserModel.user_type == "SERVICE_PROVIDER",
-            UserModel.is_active == True
+        # Todos los filtros, el orden y la paginación se resuelven en SQL
+        workers_query = build_krizoworkers_query(
+            db,
+            lat=lat,
+            lng=lng,
+            max_distance=max_distance,
+            services=parse_services(services),
+            min_rating=min_rating,
+            online_only=online_only,
+            sort_by=sort_by,
+            cursor_values=cursor_values
         )
+        if cursor_values is None and offset:
+            workers_query = workers_query.offset(offset)
 
-        # Filtrar por estado online si se solicita
-        if online_only:
-            workers_query = workers_query.filter(ServiceProfile.is_online == True)
+        # Pedir una fila extra para saber si existe una página siguiente
+        workers_data = workers_query.limit(limit + 1).all()
+        next_cursor = None
+        if len(workers_data) > limit:
+            workers_data = workers_data[:limit]
+            next_cursor = encode_cursor(sort_by, workers_data[-1][2:])
 
-        workers_data = workers_query.all()
+        distances = _page_distances(workers_data, lat, lng)
 
-        # Convertir a formato de respuesta
-        workers_response = []
-        for user, profile in workers_data:
-            # Calcular distancia si se proporcionan coordenadas
-            distance = 0.0
-            if lat and lng and profile.location_lat and profile.location_lng:
-                distance = calculate_distance(
-                    lat, lng, 
-                    profile.location_lat, profile.location_lng
-                )
-            else:
-                # Distancia simulada si no hay coordenadas
-                distance = random.uniform(1.0, 20.0)
+        def iter_workers():
+            for user, profile, *_ in workers_data:
+                if profile.id in distances:
+                    distance = distances[profile.id]
+                else:
+                    # Distancia simulada si no hay coordenadas
+                    distance = random.uniform(1.0, min(20.0, max_distance or 20.0))
+                yield _build_worker_response(user, profile, distance)
 
-            # Filtrar por distancia
-            if max_distance and distance > max_distance:
-                continue
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
 
-            # Filtrar por rating
-            if min_rating and profile.average_rating < min_rating:
-                continue
+        # La tarifa es simulada y la distancia sin coordenadas también,
+        # así que esos criterios se ordenan dentro de la página
+        sort_in_page = sort_by == "price" or (sort_by == "distance" and not (lat and lng))
 
-            # Filtrar por servicios
-            if services:
-                requested_services = [s.strip() for s in services.split(',')]
-                if not any(service in profile.services for service in requested_services):
-                    continue
-
-            # Crear respuesta
-            worker_response = KrizoWorkerResponse(
-                id=user.id,
-                name=f"{user.first_name} {user.last_name}",
-                rating=profile.average_rating or 4.0,
-                review_count=profile.total_reviews or 0,
-                services=profile.services or [],
-                experience=profile.experience_years or 1,
-                distance=distance,
-                is_online=profile.is_online,
-                response_time=random.randint(5, 30),  # Simulado por ahora
-                hourly_rate=random.uniform(25, 100),  # Simulado por ahora
-                location={
-                    "lat": profile.location_lat or 10.4806,
-                    "lng": profile.location_lng or -66.9036,
-                    "address": profile.location_address or "Caracas, Venezuela"
-                },
-                description=profile.professional_description or f"Profesional con {profile.experience_years or 1} años de experiencia.",
-                specializations=profile.services or [],
-                available_hours=profile.available_hours or {"start": "07:00", "end": "19:00"}
+        if stream and not sort_in_page:
+            return StreamingResponse(
+                (worker.model_dump_json() + "\n" for worker in iter_workers()),
+                media_type="application/x-ndjson",
+                headers=headers
             )
-            workers_response.append(worker_response)
 
-        # Ordenar resultados
-        if sort_by == "distance":
+        workers_response = list(iter_workers())
+        if sort_by == "distance" and not (lat and lng):
             workers_response.sort(key=lambda x: x.distance)
-        elif sort_by == "rating":
-            workers_response.sort(key=lambda x: x.rating, reverse=True)
         elif sort_by == "price":
             workers_response.sort(key=lambda x: x.hourly_rate)
-        elif sort_by == "experience":
-            workers_response.sort(key=lambda x: x.experience, reverse=True)
 
+        if stream:
+            return StreamingResponse(
+                (worker.model_dump_json() + "\n" for worker in workers_response),
+                media_type="application/x-ndjson",
+                headers=headers
+            )
+
+        response.headers.update(headers)
         return workers_response
 
     except Exception as e:
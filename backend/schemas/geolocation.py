@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 class LocationBase(BaseModel):
     latitude: float = Field(..., ge=-90, le=90, description="Latitud en grados decimales")
@@ -22,6 +22,10 @@ class Location(LocationBase):
     class Config:
         orm_mode = True
 
+class DistanceBatchRequest(BaseModel):
+    origin: LocationCreate
+    destinations: List[LocationCreate] = Field(..., min_length=1, max_length=500, description="Destinos a evaluar desde el origen")
+
 class DistanceResponse(BaseModel):
     distance_km: float = Field(..., description="Distancia en kilómetros")
     duration_minutes: float = Field(..., description="Duración estimada en minutos")
@@ -79,7 +79,7 @@ class PaymentBase(BaseModel):
     binance_deep_link: Optional[str] = Field(None, description="Deep link para app Binance")
 
 class PaymentCreate(PaymentBase):
-    pass
+    payment_method_id: Optional[int] = Field(None, description="Método de pago del usuario")
 
 class Payment(PaymentBase):
     id: int
@@ -113,6 +113,8 @@ class BinancePayResponse(BaseModel):
     currency: str = Field(..., description="Moneda del pago")
     crypto_amount: Optional[float] = Field(None, description="Cantidad en crypto")
     crypto_currency: Optional[str] = Field(None, description="Moneda crypto")
+    exchange_rate: Optional[float] = Field(None, description="Tasa de cambio usada")
+    exchange_rate_age: Optional[float] = Field(None, description="Antigüedad de la cotización en segundos")
     status: str = Field(..., description="Estado del pago")
     expires_at: datetime = Field(..., description="Fecha de expiración")
 
@@ -140,4 +142,5 @@ class CryptoPaymentResponse(BaseModel):
     wallet_address: str = Field(..., description="Dirección de wallet para recibir")
     qr_code: str = Field(..., description="QR code con la dirección")
     exchange_rate: float = Field(..., description="Tasa de cambio")
+    exchange_rate_age: Optional[float] = Field(None, description="Antigüedad de la cotización en segundos")
     expires_at: datetime = Field(..., description="Fecha de expiración") 
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark del costo de autenticación por petición:
+decodificación JWT + búsqueda del usuario (implementación anterior) vs.
+caché de tokens verificados, caché de principals y ruta solo-claims
+"""
+
+import sys
+import os
+import tempfile
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Base de datos temporal para no tocar autoassist.db
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark_auth.db"
+
+from datetime import timedelta
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from config import SECRET_KEY, ALGORITHM
+from database.database import Base, engine, SessionLocal
+from models_simple import User, UserType
+from auth.jwt import (
+    access_token_claims, create_access_token, decode_access_token,
+    decoded_token_cache, _load_user
+)
+from auth.principals import Principal, principal_cache
+
+def bench(label: str, func, number: int = 2000, repeat: int = 5) -> float:
+    """Ejecutar una función varias veces y reportar el mejor tiempo en µs por llamada"""
+    best = min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1_000_000
+    print(f"   {label:<44} {best:10.1f} µs")
+    return best
+
+def legacy_get_current_user(token: str, db) -> User:
+    """Copia de la implementación anterior: decode completo + SELECT por petición"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return db.query(User).filter(User.id == payload.get("sub")).first()
+
+def rsa_pems():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_pem, public_pem
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(email="bench@krizo.test", phone="0", cedula="0", hashed_password="x",
+                user_type=UserType.PERSONAL, first_name="Bench", last_name="User")
+    db.add(user)
+    db.commit()
+
+    token = create_access_token(access_token_claims(user), expires_delta=timedelta(minutes=30))
+    print("🔐 Benchmark de autenticación por petición")
+
+    print(f"\n🔹 {ALGORITHM}: get_current_user")
+    before = bench("decode + SELECT users (anterior)", lambda: legacy_get_current_user(token, db))
+
+    def uncached():
+        decoded_token_cache.clear()
+        principal_cache.users.clear()
+        _load_user(decode_access_token(token), db)
+
+    bench("decode + SELECT con cachés frías", uncached)
+    decoded_token_cache.clear()
+    principal_cache.users.clear()
+    after = bench("caché de token + caché de principal", lambda: _load_user(decode_access_token(token), db))
+    claims = bench("solo claims (get_current_principal)", lambda: Principal.from_claims(decode_access_token(token)))
+    print(f"   → mejora {before / after:.1f}x con caché de principal, {before / claims:.1f}x solo claims")
+
+    print("\n🔹 RS256: verificación de firma")
+    private_pem, public_pem = rsa_pems()
+    rs_token = jwt.encode({"sub": "1"}, private_pem, algorithm="RS256")
+    public_key = jwk.construct(public_pem, "RS256")
+    pem_us = bench("PEM parseado en cada petición", lambda: jwt.decode(rs_token, public_pem, algorithms=["RS256"]), number=500)
+    key_us = bench("clave precargada al arrancar", lambda: jwt.decode(rs_token, public_key, algorithms=["RS256"]), number=500)
+    print(f"   → mejora {pem_us / key_us:.1f}x")
+
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cálculo de distancias del marketplace:
+bucle escalar por fila (implementación anterior) vs. kernel vectorizado con NumPy
+"""
+
+import sys
+import os
+import math
+import random
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.geodesic import haversine_km, haversine_one_to_many, haversine_many_to_many
+
+# Centro de Caracas
+ORIGIN = (10.4806, -66.9036)
+
+def legacy_calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Copia de la implementación por fila que usaba routers/services.py"""
+    R = 6371
+
+    lat1_rad = math.radians(lat1)
+    lng1_rad = math.radians(lng1)
+    lat2_rad = math.radians(lat2)
+    lng2_rad = math.radians(lng2)
+
+    dlat = lat2_rad - lat1_rad
+    dlng = lng2_rad - lng1_rad
+
+    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+    return R * c
+
+def random_points(count: int):
+    """Puntos aleatorios aproximadamente dentro de Venezuela"""
+    lats = [random.uniform(1.0, 12.0) for _ in range(count)]
+    lngs = [random.uniform(-73.0, -60.0) for _ in range(count)]
+    return lats, lngs
+
+def bench(label: str, func, repeat: int = 5) -> float:
+    """Ejecutar una función varias veces y reportar el mejor tiempo en ms"""
+    number = 10
+    best = min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1000
+    print(f"   {label:<28} {best:10.3f} ms")
+    return best
+
+def main():
+    random.seed(42)
+    print("📏 Benchmark de distancias Haversine")
+
+    for count in (100, 1_000, 10_000, 100_000):
+        lats, lngs = random_points(count)
+        print(f"\n🔹 {count} candidatos")
+
+        loop_ms = bench("bucle escalar (anterior)", lambda: [
+            legacy_calculate_distance(ORIGIN[0], ORIGIN[1], lat, lng)
+            for lat, lng in zip(lats, lngs)
+        ])
+        vector_ms = bench("numpy uno-a-muchos", lambda: haversine_one_to_many(ORIGIN[0], ORIGIN[1], lats, lngs))
+        print(f"   {'aceleración':<28} {loop_ms / vector_ms:10.1f}x")
+
+        # Verificar que ambos métodos coinciden
+        expected = [legacy_calculate_distance(ORIGIN[0], ORIGIN[1], lat, lng) for lat, lng in zip(lats, lngs)]
+        actual = haversine_one_to_many(ORIGIN[0], ORIGIN[1], lats, lngs)
+        max_error = max(abs(e - a) for e, a in zip(expected, actual))
+        print(f"   {'error máximo':<28} {max_error:10.2e} km")
+
+    print("\n🔹 Matriz 200 x 1000")
+    origin_lats, origin_lngs = random_points(200)
+    lats, lngs = random_points(1_000)
+    loop_ms = bench("bucle escalar (anterior)", lambda: [
+        [haversine_km(olat, olng, lat, lng) for lat, lng in zip(lats, lngs)]
+        for olat, olng in zip(origin_lats, origin_lngs)
+    ], repeat=3)
+    vector_ms = bench("numpy muchos-a-muchos", lambda: haversine_many_to_many(origin_lats, origin_lngs, lats, lngs), repeat=3)
+    print(f"   {'aceleración':<28} {loop_ms / vector_ms:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Verificar con EXPLAIN que las consultas frecuentes (database/query_plans.py)
+usan índices. Termina con código 1 si alguna recorre una tabla completa,
+para usarlo en CI después de `alembic upgrade head`.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import engine
+from database.query_plans import HOT_QUERIES, check_hot_queries
+
+def main() -> int:
+    with engine.connect() as connection:
+        failures = check_hot_queries(connection)
+
+    for name in HOT_QUERIES:
+        if name in failures:
+            print(f"❌ {name}")
+            for line in failures[name]:
+                print(f"   {line}")
+        else:
+            print(f"✅ {name}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
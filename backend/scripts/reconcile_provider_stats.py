@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir desde cero los contadores de ServiceProfile
+(servicios completados, ganancias, reseñas y calificación promedio).
+Pensado para ejecutarse periódicamente (cron) y corregir cualquier
+desviación de los contadores incrementales.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import SessionLocal
+from services.provider_stats import provider_stats
+
+def reconcile():
+    db = SessionLocal()
+    try:
+        updated = provider_stats.reconcile(db)
+        print(f"✅ Contadores reconciliados en {updated} perfiles de proveedor")
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    reconcile()
@@ -12,10 +12,11 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from payment.binance import BinancePayService
+from services.http_client import shutdown_http_session
 from database.database import SessionLocal
 from database.models import User, Wallet, Transaction, Payment, PaymentStatus, TransactionType
 
-def test_binance_pay_service():
+async def test_binance_pay_service():
     """Probar el servicio de Binance Pay"""
     print("🧪 Probando servicio de Binance Pay...")
     
@@ -50,14 +51,15 @@ def test_binance_pay_service():
         
         for fiat, crypto in test_pairs:
             try:
-                rate = binance_service._get_exchange_rate(fiat, crypto)
+                rate = await binance_service._get_exchange_rate(fiat, crypto)
+                binance_service.rates.set(crypto, fiat, rate)
                 print(f"  ✅ {crypto}/{fiat}: {rate}")
             except Exception as e:
                 print(f"  ❌ Error obteniendo {crypto}/{fiat}: {e}")
         
         # Probar creación de pago crypto directo
         print("\n💰 Probando pago crypto directo...")
-        crypto_payment = binance_service.create_crypto_payment(
+        crypto_payment = await binance_service.create_crypto_payment(
             amount_usd=50.0,
             crypto_currency="BNB"
         )
@@ -81,6 +83,8 @@ def test_binance_pay_service():
     except Exception as e:
         print(f"❌ Error en las pruebas: {e}")
         return False
+    finally:
+        await shutdown_http_session()
     
     return True
 
@@ -204,6 +208,8 @@ def main():
     for test_name, test_func in tests:
         try:
             result = test_func()
+            if asyncio.iscoroutine(result):
+                result = asyncio.run(result)
             results.append((test_name, result))
         except Exception as e:
             print(f"❌ Error en {test_name}: {e}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del resumen de calificaciones de un negocio.
+Usa una base SQLite temporal: migra, inserta calificaciones (una con imagen y
+respuesta del negocio), valida la respuesta del endpoint contra su response_model
+y comprueba que la caché del resumen se descarta al agregar una imagen.
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+
+# Base temporal, antes de cargar config
+TEMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'test_rating_summary.db')}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import SessionLocal, async_session, dispose_async_engine
+from database.migrations import upgrade_database
+from database.models import User, BusinessProfile, Rating, ReviewImage, RatingResponse
+from routers.rating import get_business_rating_summary
+from schemas.rating import BusinessRatingSummary
+from services.rating import RatingService
+
+
+def insert_rows():
+    """Un negocio con tres calificaciones; la última tiene imagen y respuesta"""
+    db = SessionLocal()
+    try:
+        db.add_all([
+            User(id=1, email="cliente@test.com", first_name="Ana", last_name="Pérez"),
+            User(id=2, email="negocio@test.com"),
+            BusinessProfile(id=1, user_id=2, business_name="Taller de prueba"),
+        ])
+        db.flush()
+        db.add_all([
+            Rating(id=1, user_id=1, business_id=1, rating=4),
+            Rating(id=2, user_id=1, business_id=1, rating=5, is_anonymous=True),
+            Rating(id=3, user_id=1, business_id=1, rating=2, review="Tardaron mucho"),
+        ])
+        db.flush()
+        db.add_all([
+            ReviewImage(rating_id=3, image_url="https://example.com/foto.jpg"),
+            RatingResponse(rating_id=3, business_id=1, response="Gracias, lo revisaremos"),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def check(label: str, actual, expected) -> bool:
+    if actual == expected:
+        print(f"  ✅ {label}: {actual}")
+        return True
+    print(f"  ❌ {label}: {actual} (esperado {expected})")
+    return False
+
+
+async def summary_body() -> dict:
+    async with async_session() as db:
+        summary = await get_business_rating_summary(business_id=1, db=db)
+    # Mismo camino que FastAPI al serializar la respuesta
+    return BusinessRatingSummary.model_validate(summary).model_dump(mode="json")
+
+
+async def test_summary():
+    """El resumen incluye las imágenes y respuestas de las calificaciones recientes"""
+    print("🧪 Probando resumen de calificaciones...")
+    insert_rows()
+    body = await summary_body()
+
+    ok = check("Total de calificaciones", body["total_ratings"], 3)
+    ok &= check("Distribución", body["rating_distribution"], {"1": 0, "2": 1, "3": 0, "4": 1, "5": 1})
+    ok &= check("Calificaciones recientes", len(body["recent_ratings"]), 3)
+    with_details = next(r for r in body["recent_ratings"] if r["id"] == 3)
+    ok &= check("Imágenes", [image["image_url"] for image in with_details["images"]],
+                ["https://example.com/foto.jpg"])
+    ok &= check("Respuestas", [response["response"] for response in with_details["responses"]],
+                ["Gracias, lo revisaremos"])
+    ok &= check("Autor", with_details["user_name"], "Ana Pérez")
+    anonymous = next(r for r in body["recent_ratings"] if r["id"] == 2)
+    ok &= check("Autor anónimo", anonymous["user_name"], None)
+
+    # Una imagen nueva descarta las recientes en caché; el histograma sigue igual
+    async with async_session() as db:
+        await RatingService(db).add_review_image(1, 1, "https://example.com/otra.jpg")
+    body = await summary_body()
+    first = next(r for r in body["recent_ratings"] if r["id"] == 1)
+    ok &= check("Imagen agregada", [image["image_url"] for image in first["images"]],
+                ["https://example.com/otra.jpg"])
+    ok &= check("Total tras agregar imagen", body["total_ratings"], 3)
+    return ok
+
+
+async def main():
+    upgrade_database()
+    try:
+        ok = await test_summary()
+    finally:
+        await dispose_async_engine()
+
+    if ok:
+        print("\n✅ Resumen de calificaciones correcto")
+    else:
+        print("\n❌ Hay diferencias en el resumen de calificaciones")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los agregados diarios (daily_business_metrics).
+Usa una base SQLite temporal: migra, inserta transacciones y entregas de un
+negocio y ejecuta una pasada del job sobre ambos modelos.
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+# Base temporal y sin margen de marca de agua, antes de cargar config
+TEMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'test_rollups.db')}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["ROLLUP_WATERMARK_LAG"] = "0"
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import SessionLocal, async_session, dispose_async_engine
+from database.migrations import upgrade_database
+from database.models import (
+    User, BusinessProfile, Service, Delivery, Transaction, PaymentStatus, TransactionType
+)
+from services.rollups import DailyRollupService, rollup_job
+
+
+def insert_rows(start: datetime):
+    """Un negocio con dos transacciones completadas, una pendiente y tres entregas"""
+    db = SessionLocal()
+    try:
+        db.add_all([
+            User(id=1, email="negocio@test.com"),
+            BusinessProfile(id=1, user_id=1, business_name="Negocio de prueba"),
+            Service(id=1, business_profile_id=1, name="Grúa", price=30.0),
+        ])
+        db.flush()
+        db.add_all([
+            Transaction(user_id=1, business_id=1, amount=20.0, type=TransactionType.PAYMENT,
+                        status=PaymentStatus.COMPLETED, created_at=start),
+            Transaction(user_id=1, business_id=1, amount=30.0, type=TransactionType.PAYMENT,
+                        status=PaymentStatus.COMPLETED, created_at=start + timedelta(days=1)),
+            Transaction(user_id=1, business_id=1, amount=99.0, type=TransactionType.PAYMENT,
+                        status=PaymentStatus.PENDING, created_at=start),
+            Delivery(user_id=1, service_id=1, status="completed", created_at=start,
+                     completed_at=start + timedelta(hours=2)),
+            Delivery(user_id=1, service_id=1, status="pending", created_at=start),
+            Delivery(user_id=1, service_id=1, status="completed", created_at=start + timedelta(days=1),
+                     completed_at=start + timedelta(days=1, hours=1)),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def check(label: str, actual, expected) -> bool:
+    if actual == expected:
+        print(f"  ✅ {label}: {actual}")
+        return True
+    print(f"  ❌ {label}: {actual} (esperado {expected})")
+    return False
+
+
+async def test_refresh():
+    """Una pasada de rollup_job sobre transacciones y entregas"""
+    print("🧪 Probando agregados diarios...")
+    start = (datetime.utcnow() - timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+    insert_rows(start)
+
+    days = await rollup_job.run_once()
+    ok = check("Días recalculados", days, 2)
+
+    async with async_session() as db:
+        service = DailyRollupService(db)
+        totals = await service.totals(1)
+        ok &= check("Ingresos", totals.revenue, 50.0)
+        ok &= check("Entregas", totals.deliveries, 3)
+        ok &= check("Entregas completadas", totals.completed_deliveries, 2)
+        ok &= check("Horas de entrega", round(totals.delivery_hours, 2), 3.0)
+        daily = await service.daily_revenue(1, start.date(), start.date() + timedelta(days=1))
+        ok &= check("Días con ingresos", [row.transactions for row in daily], [1, 1])
+
+        # Sin cambios nuevos la siguiente pasada no recalcula nada
+        ok &= check("Segunda pasada", await service.refresh(), 0)
+    return ok
+
+
+async def main():
+    upgrade_database()
+    try:
+        ok = await test_refresh()
+    finally:
+        await dispose_async_engine()
+
+    if ok:
+        print("\n✅ Agregados diarios correctos")
+    else:
+        print("\n❌ Hay diferencias en los agregados diarios")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script para comparar el saldo de cada billetera con la suma de su libro mayor
+(wallet_ledger). Sale con código 1 si encuentra diferencias, para usarlo en cron
+o en CI. La aplicación hace la misma verificación cada WALLET_LEDGER_VERIFY_INTERVAL.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import SessionLocal
+from services.wallet_ledger import WalletLedgerService
+
+def verify() -> int:
+    db = SessionLocal()
+    try:
+        mismatches = WalletLedgerService(db).mismatches()
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return 1
+    finally:
+        db.close()
+
+    if not mismatches:
+        print("✅ Todos los saldos coinciden con el libro mayor")
+        return 0
+    for mismatch in mismatches:
+        print(
+            f"❌ Billetera {mismatch['wallet_id']}: saldo {mismatch['balance']} "
+            f"≠ libro mayor {mismatch['ledger_total']}"
+        )
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(verify())
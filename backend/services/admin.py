@@ -1,6 +1,6 @@
 from fastapi import HTTPException, status, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select
 from database.models import (
     SystemConfig, AdminUser, AuditLog, MaintenanceMode, User, 
     BusinessProfile, Delivery, Transaction, Report
@@ -16,19 +16,19 @@ import json
 import time
 
 class AdminService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.start_time = time.time()
 
-    def create_system_config(
+    async def create_system_config(
         self,
         config_data: SystemConfigCreate
     ) -> SystemConfig:
         """Crear una nueva configuración del sistema"""
         # Verificar que la clave no existe
-        existing_config = self.db.query(SystemConfig).filter(
+        existing_config = await self.db.scalar(select(SystemConfig).where(
             SystemConfig.key == config_data.key
-        ).first()
+        ))
         
         if existing_config:
             raise HTTPException(
@@ -38,25 +38,25 @@ class AdminService:
 
         config = SystemConfig(**config_data.dict())
         self.db.add(config)
-        self.db.commit()
-        self.db.refresh(config)
+        await self.db.commit()
+        await self.db.refresh(config)
         return config
 
-    def get_system_config(self, key: str) -> Optional[SystemConfig]:
+    async def get_system_config(self, key: str) -> Optional[SystemConfig]:
         """Obtener una configuración específica"""
-        return self.db.query(SystemConfig).filter(SystemConfig.key == key).first()
+        return await self.db.scalar(select(SystemConfig).where(SystemConfig.key == key))
 
-    def get_public_configs(self) -> List[SystemConfig]:
+    async def get_public_configs(self) -> List[SystemConfig]:
         """Obtener configuraciones públicas"""
-        return self.db.query(SystemConfig).filter(SystemConfig.is_public == True).all()
+        return list(await self.db.scalars(select(SystemConfig).where(SystemConfig.is_public == True)))
 
-    def update_system_config(
+    async def update_system_config(
         self,
         key: str,
         config_update: SystemConfigUpdate
     ) -> SystemConfig:
         """Actualizar una configuración del sistema"""
-        config = self.db.query(SystemConfig).filter(SystemConfig.key == key).first()
+        config = await self.db.scalar(select(SystemConfig).where(SystemConfig.key == key))
         
         if not config:
             raise HTTPException(
@@ -68,13 +68,13 @@ class AdminService:
             setattr(config, key, value)
 
         config.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(config)
+        await self.db.commit()
+        await self.db.refresh(config)
         return config
 
-    def delete_system_config(self, key: str) -> bool:
+    async def delete_system_config(self, key: str) -> bool:
         """Eliminar una configuración del sistema"""
-        config = self.db.query(SystemConfig).filter(SystemConfig.key == key).first()
+        config = await self.db.scalar(select(SystemConfig).where(SystemConfig.key == key))
         
         if not config:
             raise HTTPException(
@@ -82,17 +82,17 @@ class AdminService:
                 detail="Configuración no encontrada"
             )
 
-        self.db.delete(config)
-        self.db.commit()
+        await self.db.delete(config)
+        await self.db.commit()
         return True
 
-    def create_admin_user(
+    async def create_admin_user(
         self,
         admin_data: AdminUserCreate
     ) -> AdminUser:
         """Crear un nuevo administrador"""
         # Verificar que el usuario existe
-        user = self.db.query(User).filter(User.id == admin_data.user_id).first()
+        user = await self.db.get(User, admin_data.user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -100,9 +100,9 @@ class AdminService:
             )
 
         # Verificar que no es ya administrador
-        existing_admin = self.db.query(AdminUser).filter(
+        existing_admin = await self.db.scalar(select(AdminUser).where(
             AdminUser.user_id == admin_data.user_id
-        ).first()
+        ))
         
         if existing_admin:
             raise HTTPException(
@@ -112,21 +112,21 @@ class AdminService:
 
         admin_user = AdminUser(**admin_data.dict())
         self.db.add(admin_user)
-        self.db.commit()
-        self.db.refresh(admin_user)
+        await self.db.commit()
+        await self.db.refresh(admin_user)
         return admin_user
 
-    def get_admin_users(self) -> List[AdminUser]:
+    async def get_admin_users(self) -> List[AdminUser]:
         """Obtener todos los administradores"""
-        return self.db.query(AdminUser).all()
+        return list(await self.db.scalars(select(AdminUser)))
 
-    def update_admin_user(
+    async def update_admin_user(
         self,
         admin_id: int,
         admin_update: AdminUserUpdate
     ) -> AdminUser:
         """Actualizar un administrador"""
-        admin_user = self.db.query(AdminUser).filter(AdminUser.id == admin_id).first()
+        admin_user = await self.db.get(AdminUser, admin_id)
         
         if not admin_user:
             raise HTTPException(
@@ -138,13 +138,13 @@ class AdminService:
             setattr(admin_user, key, value)
 
         admin_user.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(admin_user)
+        await self.db.commit()
+        await self.db.refresh(admin_user)
         return admin_user
 
-    def delete_admin_user(self, admin_id: int) -> bool:
+    async def delete_admin_user(self, admin_id: int) -> bool:
         """Eliminar un administrador"""
-        admin_user = self.db.query(AdminUser).filter(AdminUser.id == admin_id).first()
+        admin_user = await self.db.get(AdminUser, admin_id)
         
         if not admin_user:
             raise HTTPException(
@@ -152,21 +152,21 @@ class AdminService:
                 detail="Administrador no encontrado"
             )
 
-        self.db.delete(admin_user)
-        self.db.commit()
+        await self.db.delete(admin_user)
+        await self.db.commit()
         return True
 
-    def check_admin_permissions(
+    async def check_admin_permissions(
         self,
         user_id: int,
         resource: str,
         action: str
     ) -> bool:
         """Verificar permisos de administrador"""
-        admin_user = self.db.query(AdminUser).filter(
+        admin_user = await self.db.scalar(select(AdminUser).where(
             AdminUser.user_id == user_id,
             AdminUser.is_active == True
-        ).first()
+        ))
 
         if not admin_user:
             return False
@@ -182,7 +182,7 @@ class AdminService:
 
         return False
 
-    def create_audit_log(
+    async def create_audit_log(
         self,
         audit_data: AuditLogCreate,
         request: Request
@@ -198,11 +198,11 @@ class AdminService:
             user_agent=user_agent
         )
         self.db.add(audit_log)
-        self.db.commit()
-        self.db.refresh(audit_log)
+        await self.db.commit()
+        await self.db.refresh(audit_log)
         return audit_log
 
-    def get_audit_logs(
+    async def get_audit_logs(
         self,
         skip: int = 0,
         limit: int = 100,
@@ -212,29 +212,32 @@ class AdminService:
         resource_type: Optional[str] = None
     ) -> List[AuditLog]:
         """Obtener registros de auditoría con filtros"""
-        query = self.db.query(AuditLog)
+        query = select(AuditLog)
 
         if admin_user_id:
-            query = query.filter(AuditLog.admin_user_id == admin_user_id)
+            query = query.where(AuditLog.admin_user_id == admin_user_id)
         if user_id:
-            query = query.filter(AuditLog.user_id == user_id)
+            query = query.where(AuditLog.user_id == user_id)
         if action:
-            query = query.filter(AuditLog.action == action)
+            query = query.where(AuditLog.action == action)
         if resource_type:
-            query = query.filter(AuditLog.resource_type == resource_type)
+            query = query.where(AuditLog.resource_type == resource_type)
 
-        return query.order_by(desc(AuditLog.created_at)).offset(skip).limit(limit).all()
+        result = await self.db.scalars(
+            query.order_by(desc(AuditLog.created_at)).offset(skip).limit(limit)
+        )
+        return list(result)
 
-    def get_maintenance_mode(self) -> Optional[MaintenanceMode]:
+    async def get_maintenance_mode(self) -> Optional[MaintenanceMode]:
         """Obtener configuración de modo mantenimiento"""
-        return self.db.query(MaintenanceMode).first()
+        return await self.db.scalar(select(MaintenanceMode).limit(1))
 
-    def update_maintenance_mode(
+    async def update_maintenance_mode(
         self,
         maintenance_data: MaintenanceModeUpdate
     ) -> MaintenanceMode:
         """Actualizar modo mantenimiento"""
-        maintenance = self.db.query(MaintenanceMode).first()
+        maintenance = await self.db.scalar(select(MaintenanceMode).limit(1))
         
         if not maintenance:
             maintenance = MaintenanceMode()
@@ -244,13 +247,13 @@ class AdminService:
             setattr(maintenance, key, value)
 
         maintenance.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(maintenance)
+        await self.db.commit()
+        await self.db.refresh(maintenance)
         return maintenance
 
-    def is_maintenance_mode(self, client_ip: Optional[str] = None) -> bool:
+    async def is_maintenance_mode(self, client_ip: Optional[str] = None) -> bool:
         """Verificar si el sistema está en modo mantenimiento"""
-        maintenance = self.get_maintenance_mode()
+        maintenance = await self.get_maintenance_mode()
         
         if not maintenance or not maintenance.is_active:
             return False
@@ -261,33 +264,33 @@ class AdminService:
 
         return True
 
-    def get_system_status(self) -> Dict[str, Any]:
+    async def get_system_status(self) -> Dict[str, Any]:
         """Obtener estado del sistema"""
         # Total de usuarios
-        total_users = self.db.query(func.count(User.id)).scalar() or 0
+        total_users = await self.db.scalar(select(func.count(User.id))) or 0
         
         # Total de negocios
-        total_businesses = self.db.query(func.count(BusinessProfile.id)).scalar() or 0
+        total_businesses = await self.db.scalar(select(func.count(BusinessProfile.id))) or 0
         
         # Total de entregas
-        total_deliveries = self.db.query(func.count(Delivery.id)).scalar() or 0
+        total_deliveries = await self.db.scalar(select(func.count(Delivery.id))) or 0
         
         # Total de ingresos
-        total_revenue = self.db.query(func.sum(Transaction.amount)).filter(
+        total_revenue = await self.db.scalar(select(func.sum(Transaction.amount)).where(
             Transaction.status == "completed"
-        ).scalar() or 0.0
+        )) or 0.0
         
         # Tiempo de actividad del sistema
         system_uptime = time.time() - self.start_time
         
         # Modo mantenimiento activo
-        maintenance = self.get_maintenance_mode()
+        maintenance = await self.get_maintenance_mode()
         active_maintenance = maintenance.is_active if maintenance else False
         
         # Reportes pendientes
-        pending_reports = self.db.query(func.count(Report.id)).filter(
+        pending_reports = await self.db.scalar(select(func.count(Report.id)).where(
             Report.status == "pending"
-        ).scalar() or 0
+        )) or 0
 
         return {
             "total_users": total_users,
@@ -299,21 +302,21 @@ class AdminService:
             "pending_reports": pending_reports
         }
 
-    def get_admin_dashboard(self) -> Dict[str, Any]:
+    async def get_admin_dashboard(self) -> Dict[str, Any]:
         """Obtener dashboard de administración"""
         # Actividades recientes
-        recent_activities = self.get_audit_logs(skip=0, limit=10)
+        recent_activities = await self.get_audit_logs(skip=0, limit=10)
         
         # Estado del sistema
-        system_status = self.get_system_status()
+        system_status = await self.get_system_status()
         
         # Configuraciones del sistema
-        system_configs = self.db.query(SystemConfig).limit(5).all()
+        system_configs = list(await self.db.scalars(select(SystemConfig).limit(5)))
         
         # Usuarios activos (últimas 24 horas)
-        active_users = self.db.query(func.count(User.id)).filter(
+        active_users = await self.db.scalar(select(func.count(User.id)).where(
             User.updated_at >= datetime.utcnow() - timedelta(hours=24)
-        ).scalar() or 0
+        )) or 0
 
         return {
             "recent_activities": recent_activities,
@@ -322,17 +325,17 @@ class AdminService:
             "system_configs": system_configs
         }
 
-    def backup_system_data(self) -> Dict[str, Any]:
+    async def backup_system_data(self) -> Dict[str, Any]:
         """Crear backup de datos del sistema"""
         # Esta es una implementación básica
         # En producción, deberías usar herramientas específicas de backup
         
         backup_data = {
             "timestamp": datetime.utcnow().isoformat(),
-            "users_count": self.db.query(func.count(User.id)).scalar(),
-            "businesses_count": self.db.query(func.count(BusinessProfile.id)).scalar(),
-            "deliveries_count": self.db.query(func.count(Delivery.id)).scalar(),
-            "configs_count": self.db.query(func.count(SystemConfig.id)).scalar()
+            "users_count": await self.db.scalar(select(func.count(User.id))),
+            "businesses_count": await self.db.scalar(select(func.count(BusinessProfile.id))),
+            "deliveries_count": await self.db.scalar(select(func.count(Delivery.id))),
+            "configs_count": await self.db.scalar(select(func.count(SystemConfig.id)))
         }
         
         return backup_data 
\ No newline at end of file
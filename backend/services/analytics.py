@@ -1,6 +1,6 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, desc, select, case, true
 from database.models import (
     Report, Analytics, Dashboard, User, BusinessProfile, 
     Delivery, Transaction, Rating, Promotion, LoyaltyMember
@@ -10,18 +10,28 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 import json
 
+from config import KRIZOWORKER_STATS_CACHE_TTL, KRIZOWORKER_STATS_CACHE_SIZE
+from services.cache import TTLCache
+from services.rollups import DailyRollupService
+
+ACCEPTED_DELIVERY_STATUSES = ["accepted", "in_progress", "completed"]
+PENDING_DELIVERY_STATUSES = ["pending", "accepted", "in_progress"]
+
+# Estadísticas del panel KrizoWorker por user_id; un TTL corto basta para la pantalla de inicio
+krizoworker_stats_cache = TTLCache(max_size=KRIZOWORKER_STATS_CACHE_SIZE, ttl=KRIZOWORKER_STATS_CACHE_TTL)
+
 class AnalyticsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_report(
+    async def create_report(
         self,
         user_id: int,
         report_data: ReportCreate
     ) -> Report:
         """Crear un nuevo reporte"""
         # Verificar que el usuario existe
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = await self.db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -34,44 +44,47 @@ class AnalyticsService:
             **report_data.dict()
         )
         self.db.add(report)
-        self.db.commit()
-        self.db.refresh(report)
+        await self.db.commit()
+        await self.db.refresh(report)
         return report
 
-    def get_reports(
+    async def get_reports(
         self,
         skip: int = 0,
         limit: int = 20,
         filters: Optional[ReportFilter] = None
     ) -> List[Report]:
         """Obtener reportes con filtros"""
-        query = self.db.query(Report)
+        query = select(Report)
 
         if filters:
             if filters.report_type:
-                query = query.filter(Report.report_type == filters.report_type)
+                query = query.where(Report.report_type == filters.report_type)
             if filters.reason:
-                query = query.filter(Report.reason == filters.reason)
+                query = query.where(Report.reason == filters.reason)
             if filters.status:
-                query = query.filter(Report.status == filters.status)
+                query = query.where(Report.status == filters.status)
             if filters.business_id:
-                query = query.filter(Report.business_id == filters.business_id)
+                query = query.where(Report.business_id == filters.business_id)
             if filters.user_id:
-                query = query.filter(Report.user_id == filters.user_id)
+                query = query.where(Report.user_id == filters.user_id)
             if filters.start_date:
-                query = query.filter(Report.created_at >= filters.start_date)
+                query = query.where(Report.created_at >= filters.start_date)
             if filters.end_date:
-                query = query.filter(Report.created_at <= filters.end_date)
+                query = query.where(Report.created_at <= filters.end_date)
 
-        return query.order_by(desc(Report.created_at)).offset(skip).limit(limit).all()
+        result = await self.db.scalars(
+            query.order_by(desc(Report.created_at)).offset(skip).limit(limit)
+        )
+        return list(result)
 
-    def update_report(
+    async def update_report(
         self,
         report_id: int,
         report_update: ReportUpdate
     ) -> Report:
         """Actualizar un reporte (solo para administradores)"""
-        report = self.db.query(Report).filter(Report.id == report_id).first()
+        report = await self.db.get(Report, report_id)
         
         if not report:
             raise HTTPException(
@@ -83,38 +96,32 @@ class AnalyticsService:
             setattr(report, key, value)
 
         report.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(report)
+        await self.db.commit()
+        await self.db.refresh(report)
         return report
 
-    def get_business_metrics(self, business_id: int) -> Dict[str, Any]:
+    async def get_business_metrics(self, business_id: int) -> Dict[str, Any]:
         """Obtener métricas generales de un negocio"""
-        # Total de ingresos
-        total_revenue = self.db.query(func.sum(Transaction.amount)).filter(
-            Transaction.meta_data.contains({"business_id": business_id}),
-            Transaction.status == "completed"
-        ).scalar() or 0.0
-
-        # Total de entregas
-        total_deliveries = self.db.query(func.count(Delivery.id)).filter(
-            Delivery.service.has(business_profile_id=business_id)
-        ).scalar() or 0
+        # Total de ingresos y de entregas desde los agregados diarios
+        totals = await DailyRollupService(self.db).totals(business_id)
+        total_revenue = totals.revenue
+        total_deliveries = totals.deliveries
 
         # Promedio de calificaciones
-        avg_rating = self.db.query(func.avg(Rating.rating)).filter(
+        avg_rating = await self.db.scalar(select(func.avg(Rating.rating)).where(
             Rating.business_id == business_id
-        ).scalar() or 0.0
+        )) or 0.0
 
         # Promociones activas
-        active_promotions = self.db.query(func.count(Promotion.id)).filter(
+        active_promotions = await self.db.scalar(select(func.count(Promotion.id)).where(
             Promotion.business_profile_id == business_id,
             Promotion.status == "active"
-        ).scalar() or 0
+        )) or 0
 
         # Miembros de lealtad
-        loyalty_members = self.db.query(func.count(LoyaltyMember.id)).filter(
+        loyalty_members = await self.db.scalar(select(func.count(LoyaltyMember.id)).where(
             LoyaltyMember.loyalty_program.has(business_profile_id=business_id)
-        ).scalar() or 0
+        )) or 0
 
         return {
             "total_revenue": total_revenue,
@@ -124,76 +131,48 @@ class AnalyticsService:
             "loyalty_members": loyalty_members
         }
 
-    def get_revenue_metrics(
+    async def get_revenue_metrics(
         self,
         business_id: int,
         start_date: date,
         end_date: date
     ) -> Dict[str, Any]:
-        """Obtener métricas de ingresos"""
-        # Ingresos diarios
-        daily_revenue = self.db.query(
-            func.date(Transaction.created_at).label('date'),
-            func.sum(Transaction.amount).label('revenue')
-        ).filter(
-            Transaction.meta_data.contains({"business_id": business_id}),
-            Transaction.status == "completed",
-            func.date(Transaction.created_at) >= start_date,
-            func.date(Transaction.created_at) <= end_date
-        ).group_by(func.date(Transaction.created_at)).all()
+        """Obtener métricas de ingresos (desde daily_business_metrics, una fila por día)"""
+        rollups = DailyRollupService(self.db)
+        daily_revenue = await rollups.daily_revenue(business_id, start_date, end_date)
 
         # Calcular crecimiento
         current_period_revenue = sum([r.revenue for r in daily_revenue])
         previous_period_start = start_date - timedelta(days=(end_date - start_date).days)
-        previous_period_revenue = self.db.query(func.sum(Transaction.amount)).filter(
-            Transaction.meta_data.contains({"business_id": business_id}),
-            Transaction.status == "completed",
-            func.date(Transaction.created_at) >= previous_period_start,
-            func.date(Transaction.created_at) < start_date
-        ).scalar() or 0.0
+        previous_period_revenue = (await rollups.totals(
+            business_id, previous_period_start, start_date - timedelta(days=1)
+        )).revenue
 
         growth_rate = 0.0
         if previous_period_revenue > 0:
             growth_rate = ((current_period_revenue - previous_period_revenue) / previous_period_revenue) * 100
 
         return {
-            "daily_revenue": [{"date": str(r.date), "revenue": r.revenue} for r in daily_revenue],
+            "daily_revenue": [{"date": str(r.day), "revenue": r.revenue} for r in daily_revenue],
             "total_revenue": current_period_revenue,
             "growth_rate": round(growth_rate, 2)
         }
 
-    def get_delivery_metrics(
+    async def get_delivery_metrics(
         self,
         business_id: int,
         start_date: date,
         end_date: date
     ) -> Dict[str, Any]:
-        """Obtener métricas de entregas"""
-        # Total de entregas
-        total_deliveries = self.db.query(func.count(Delivery.id)).filter(
-            Delivery.service.has(business_profile_id=business_id),
-            func.date(Delivery.created_at) >= start_date,
-            func.date(Delivery.created_at) <= end_date
-        ).scalar() or 0
-
-        # Entregas completadas
-        completed_deliveries = self.db.query(func.count(Delivery.id)).filter(
-            Delivery.service.has(business_profile_id=business_id),
-            Delivery.status == "completed",
-            func.date(Delivery.created_at) >= start_date,
-            func.date(Delivery.created_at) <= end_date
-        ).scalar() or 0
+        """Obtener métricas de entregas (desde daily_business_metrics)"""
+        totals = await DailyRollupService(self.db).totals(business_id, start_date, end_date)
+        total_deliveries = totals.deliveries
+        completed_deliveries = totals.completed_deliveries
 
         # Tiempo promedio de entrega
-        avg_delivery_time = self.db.query(
-            func.avg(func.extract('epoch', Delivery.completed_at - Delivery.created_at) / 3600)
-        ).filter(
-            Delivery.service.has(business_profile_id=business_id),
-            Delivery.status == "completed",
-            Delivery.completed_at.isnot(None),
-            func.date(Delivery.created_at) >= start_date,
-            func.date(Delivery.created_at) <= end_date
-        ).scalar() or 0.0
+        avg_delivery_time = 0.0
+        if totals.timed_deliveries > 0:
+            avg_delivery_time = totals.delivery_hours / totals.timed_deliveries
 
         # Tasa de éxito
         success_rate = 0.0
@@ -207,43 +186,46 @@ class AnalyticsService:
             "delivery_success_rate": round(success_rate, 2)
         }
 
-    def create_analytics_entry(
+    async def create_analytics_entry(
         self,
         analytics_data: AnalyticsCreate
     ) -> Analytics:
         """Crear una entrada de analytics"""
         analytics = Analytics(**analytics_data.dict())
         self.db.add(analytics)
-        self.db.commit()
-        self.db.refresh(analytics)
+        await self.db.commit()
+        await self.db.refresh(analytics)
         return analytics
 
-    def get_analytics(
+    async def get_analytics(
         self,
         skip: int = 0,
         limit: int = 100,
         filters: Optional[AnalyticsFilter] = None
     ) -> List[Analytics]:
         """Obtener datos de analytics con filtros"""
-        query = self.db.query(Analytics)
+        query = select(Analytics)
 
         if filters:
             if filters.start_date:
-                query = query.filter(Analytics.date >= filters.start_date)
+                query = query.where(Analytics.date >= filters.start_date)
             if filters.end_date:
-                query = query.filter(Analytics.date <= filters.end_date)
+                query = query.where(Analytics.date <= filters.end_date)
             if filters.metric_type:
-                query = query.filter(Analytics.metric_type == filters.metric_type)
+                query = query.where(Analytics.metric_type == filters.metric_type)
             if filters.period:
-                query = query.filter(Analytics.period == filters.period)
+                query = query.where(Analytics.period == filters.period)
             if filters.business_id:
-                query = query.filter(Analytics.business_id == filters.business_id)
+                query = query.where(Analytics.business_id == filters.business_id)
             if filters.user_id:
-                query = query.filter(Analytics.user_id == filters.user_id)
+                query = query.where(Analytics.user_id == filters.user_id)
 
-        return query.order_by(desc(Analytics.date)).offset(skip).limit(limit).all()
+        result = await self.db.scalars(
+            query.order_by(desc(Analytics.date)).offset(skip).limit(limit)
+        )
+        return list(result)
 
-    def create_dashboard(
+    async def create_dashboard(
         self,
         user_id: int,
         dashboard_data: dict
@@ -254,27 +236,28 @@ class AnalyticsService:
             **dashboard_data
         )
         self.db.add(dashboard)
-        self.db.commit()
-        self.db.refresh(dashboard)
+        await self.db.commit()
+        await self.db.refresh(dashboard)
         return dashboard
 
-    def get_user_dashboards(self, user_id: int) -> List[Dashboard]:
+    async def get_user_dashboards(self, user_id: int) -> List[Dashboard]:
         """Obtener dashboards de un usuario"""
-        return self.db.query(Dashboard).filter(
+        result = await self.db.scalars(select(Dashboard).where(
             Dashboard.user_id == user_id
-        ).order_by(desc(Dashboard.created_at)).all()
+        ).order_by(desc(Dashboard.created_at)))
+        return list(result)
 
-    def update_dashboard(
+    async def update_dashboard(
         self,
         dashboard_id: int,
         user_id: int,
         dashboard_update: dict
     ) -> Dashboard:
         """Actualizar un dashboard"""
-        dashboard = self.db.query(Dashboard).filter(
+        dashboard = await self.db.scalar(select(Dashboard).where(
             Dashboard.id == dashboard_id,
             Dashboard.user_id == user_id
-        ).first()
+        ))
 
         if not dashboard:
             raise HTTPException(
@@ -286,16 +269,16 @@ class AnalyticsService:
             setattr(dashboard, key, value)
 
         dashboard.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(dashboard)
+        await self.db.commit()
+        await self.db.refresh(dashboard)
         return dashboard
 
-    def delete_dashboard(self, dashboard_id: int, user_id: int) -> bool:
+    async def delete_dashboard(self, dashboard_id: int, user_id: int) -> bool:
         """Eliminar un dashboard"""
-        dashboard = self.db.query(Dashboard).filter(
+        dashboard = await self.db.scalar(select(Dashboard).where(
             Dashboard.id == dashboard_id,
             Dashboard.user_id == user_id
-        ).first()
+        ))
 
         if not dashboard:
             raise HTTPException(
@@ -303,18 +286,18 @@ class AnalyticsService:
                 detail="Dashboard no encontrado"
             )
 
-        self.db.delete(dashboard)
-        self.db.commit()
+        await self.db.delete(dashboard)
+        await self.db.commit()
         return True
 
-    def generate_weekly_report(self, business_id: int) -> Dict[str, Any]:
+    async def generate_weekly_report(self, business_id: int) -> Dict[str, Any]:
         """Generar reporte semanal para un negocio"""
         end_date = date.today()
         start_date = end_date - timedelta(days=7)
 
-        revenue_metrics = self.get_revenue_metrics(business_id, start_date, end_date)
-        delivery_metrics = self.get_delivery_metrics(business_id, start_date, end_date)
-        business_metrics = self.get_business_metrics(business_id)
+        revenue_metrics = await self.get_revenue_metrics(business_id, start_date, end_date)
+        delivery_metrics = await self.get_delivery_metrics(business_id, start_date, end_date)
+        business_metrics = await self.get_business_metrics(business_id)
 
         return {
             "period": {
@@ -324,4 +307,69 @@ class AnalyticsService:
             "revenue": revenue_metrics,
             "deliveries": delivery_metrics,
             "overview": business_metrics
-        } 
\ No newline at end of file
+        } 
+
+    async def get_krizoworker_stats(self, user_id: int) -> Dict[str, Any]:
+        """
+        Estadísticas del KrizoWorker en una sola consulta: cada tabla se agrega una vez
+        con agregación condicional (FILTER / CASE) y las tres filas se combinan.
+        """
+        now = datetime.utcnow()
+        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        accepted = Delivery.status.in_(ACCEPTED_DELIVERY_STATUSES)
+
+        earnings = select(
+            func.coalesce(func.sum(Transaction.amount), 0).label("total_earnings"),
+            func.coalesce(
+                func.sum(Transaction.amount).filter(Transaction.created_at >= start_of_month), 0
+            ).label("monthly_earnings")
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.type == "PAYMENT",
+            Transaction.status == "COMPLETED"
+        ).subquery()
+
+        deliveries = select(
+            func.count(Delivery.id).label("total_requests"),
+            func.count(Delivery.id).filter(Delivery.status == "completed").label("completed_services"),
+            func.count(Delivery.id).filter(
+                Delivery.status.in_(PENDING_DELIVERY_STATUSES)
+            ).label("pending_services"),
+            func.count(Delivery.id).filter(accepted).label("accepted_requests"),
+            # Tiempo entre creación y cierre (deliveries no tiene marca de aceptación);
+            # CASE sin ELSE deja NULL y AVG lo ignora
+            func.avg(case(
+                (
+                    and_(accepted, Delivery.completed_at.isnot(None)),
+                    (func.extract('epoch', Delivery.completed_at) - func.extract('epoch', Delivery.created_at)) / 60
+                )
+            )).label("avg_response_minutes")
+        ).where(Delivery.user_id == user_id).subquery()
+
+        ratings = select(
+            func.avg(Rating.rating).label("avg_rating"),
+            func.count(Rating.id).label("total_reviews")
+        ).where(Rating.user_id == user_id).subquery()
+
+        # Cada subconsulta devuelve exactamente una fila: el JOIN ON TRUE las une sin multiplicar
+        row = (await self.db.execute(
+            select(earnings, deliveries, ratings).select_from(
+                earnings.join(deliveries, true()).join(ratings, true())
+            )
+        )).one()
+
+        total_requests = row.total_requests or 0
+        acceptance_rate = (row.accepted_requests / total_requests * 100) if total_requests > 0 else 0
+
+        return {
+            "total_earnings": round(float(row.total_earnings), 2),
+            "monthly_earnings": round(float(row.monthly_earnings), 2),
+            "completed_services": row.completed_services or 0,
+            "pending_services": row.pending_services or 0,
+            "average_rating": round(float(row.avg_rating), 1) if row.avg_rating else 0.0,
+            "total_reviews": row.total_reviews or 0,
+            "acceptance_rate": round(acceptance_rate, 0),
+            "response_time_minutes": int(row.avg_response_minutes) if row.avg_response_minutes else 0,
+            "user_id": user_id,
+            "calculated_at": now.isoformat()
+        }
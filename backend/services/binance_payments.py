@@ -0,0 +1,245 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+import asyncio
+import json
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    BINANCE_RECONCILE_INTERVAL, BINANCE_RECONCILE_MIN_AGE,
+    BINANCE_RECONCILE_BATCH, BINANCE_RECONCILE_CONCURRENCY
+)
+from database.database import async_session
+from database.models import Payment, PaymentWebhookEvent, Transaction, PaymentStatus
+from payment.binance import startup_binance_service
+from services.wallet_ledger import WalletLedgerService
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = "binance_pay"
+
+# Estado de la orden en Binance -> estado final del pago
+FINAL_STATUSES = {
+    "PAID": PaymentStatus.COMPLETED,
+    "CANCELED": PaymentStatus.FAILED,
+    "EXPIRED": PaymentStatus.FAILED,
+    "ERROR": PaymentStatus.FAILED,
+}
+# bizStatus del webhook -> estado de la orden
+WEBHOOK_STATUSES = {
+    "PAY_SUCCESS": "PAID",
+    "PAY_CLOSED": "CANCELED",
+}
+# Estado del pago -> estado mostrado en GET /payments/binance/status
+DISPLAY_STATUSES = {
+    PaymentStatus.PENDING: "PENDING",
+    PaymentStatus.COMPLETED: "PAID",
+    PaymentStatus.FAILED: "CANCELED",
+    PaymentStatus.REFUNDED: "REFUNDED",
+}
+
+
+class BinancePaymentService:
+    """
+    Confirmación de pagos de Binance Pay (webhook y conciliación). Cada pago se
+    liquida una sola vez: el UPDATE condicionado a status = pending decide quién
+    gana entre webhooks repetidos, el conciliador y peticiones concurrentes.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_status(self, prepay_id: str, user_id: int) -> Optional[dict]:
+        """Estado local del pago (una consulta, sin llamar a Binance)"""
+        payment = await self.db.scalar(
+            select(Payment)
+            .join(Transaction, Payment.transaction_id == Transaction.id)
+            .where(Payment.binance_prepay_id == prepay_id, Transaction.user_id == user_id)
+        )
+        if payment is None:
+            return None
+        return {
+            "prepay_id": prepay_id,
+            "status": DISPLAY_STATUSES.get(payment.status, payment.status.value),
+            "transaction_id": payment.payment_provider_id if payment.payment_provider_id != prepay_id else None,
+            "amount": payment.amount,
+            "currency": payment.currency,
+            "crypto_amount": payment.crypto_amount,
+            "crypto_currency": payment.crypto_currency,
+            "paid_at": payment.updated_at if payment.status == PaymentStatus.COMPLETED else None
+        }
+
+    async def _settle(self, prepay_id: str, order_status: str, binance_transaction_id: Optional[str] = None) -> bool:
+        """
+        Aplicar el estado final de la orden dentro de la transacción actual (sin commit).
+        Retorna False si el estado no es final o el pago ya estaba liquidado.
+        """
+        new_status = FINAL_STATUSES.get(order_status)
+        if new_status is None:
+            return False
+
+        values = {"status": new_status, "updated_at": func.now()}
+        if binance_transaction_id:
+            values["payment_provider_id"] = binance_transaction_id
+        transaction_id = (await self.db.execute(
+            update(Payment)
+            .where(Payment.binance_prepay_id == prepay_id, Payment.status == PaymentStatus.PENDING)
+            .values(**values)
+            .returning(Payment.transaction_id)
+        )).scalar()
+        if transaction_id is None:
+            return False
+
+        settled = (await self.db.execute(
+            update(Transaction)
+            .where(Transaction.id == transaction_id, Transaction.status == PaymentStatus.PENDING)
+            .values(status=new_status, updated_at=func.now())
+            .returning(Transaction.wallet_id, Transaction.amount)
+        )).first()
+        if settled is not None and new_status == PaymentStatus.COMPLETED:
+            await self.db.run_sync(lambda session: WalletLedgerService(session).credit(
+                settled.wallet_id, settled.amount, "deposit", transaction_id
+            ))
+        return True
+
+    async def settle(self, prepay_id: str, order_status: str, binance_transaction_id: Optional[str] = None) -> bool:
+        """Liquidar un pago en una sola transacción de base de datos"""
+        try:
+            settled = await self._settle(prepay_id, order_status, binance_transaction_id)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        return settled
+
+    async def handle_webhook(self, event: dict) -> bool:
+        """
+        Procesar una notificación ya verificada. El evento se registra en la misma
+        transacción que la liquidación: un reenvío choca con la restricción única
+        y se confirma sin volver a aplicar nada. Retorna True si liquidó el pago.
+        """
+        biz_type = event.get("bizType")
+        biz_status = event.get("bizStatus")
+        prepay_id = str(event.get("bizIdStr") or event.get("bizId") or "")
+        data = event.get("data")
+        if isinstance(data, str):
+            data = json.loads(data) if data else {}
+        data = data or {}
+
+        self.db.add(PaymentWebhookEvent(
+            provider=PROVIDER,
+            event_id=f"{biz_type}:{prepay_id}:{biz_status}",
+            event_type=biz_type,
+            payload=event
+        ))
+        try:
+            await self.db.flush()
+        except IntegrityError:
+            await self.db.rollback()
+            logger.info("Webhook de Binance repetido: %s %s %s", biz_type, prepay_id, biz_status)
+            return False
+
+        settled = False
+        try:
+            if biz_type == "PAY" and biz_status in WEBHOOK_STATUSES:
+                settled = await self._settle(
+                    prepay_id, WEBHOOK_STATUSES[biz_status], data.get("transactionId")
+                )
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        return settled
+
+    async def pending_prepay_ids(self, min_age: int = BINANCE_RECONCILE_MIN_AGE, limit: int = BINANCE_RECONCILE_BATCH) -> List[str]:
+        """prepayIds pendientes con más de `min_age` segundos, los más viejos primero"""
+        cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+        result = await self.db.scalars(
+            select(Payment.binance_prepay_id).where(
+                Payment.payment_provider == PROVIDER,
+                Payment.status == PaymentStatus.PENDING,
+                Payment.created_at <= cutoff,
+                Payment.binance_prepay_id.isnot(None)
+            ).order_by(Payment.created_at).limit(limit)
+        )
+        return list(result)
+
+
+class BinancePaymentReconciler:
+    """
+    Tarea en segundo plano para pagos cuyo webhook no llegó: consulta en Binance
+    los pendientes (concurrencia acotada, Binance no ofrece consulta por lotes)
+    y liquida los que ya tienen estado final.
+    """
+
+    def __init__(
+        self,
+        interval: float = BINANCE_RECONCILE_INTERVAL,
+        concurrency: int = BINANCE_RECONCILE_CONCURRENCY
+    ):
+        self.interval = interval
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Retorna cuántos pagos se liquidaron"""
+        binance_service = startup_binance_service()
+        if binance_service is None:
+            return 0
+
+        async with async_session() as db:
+            prepay_ids = await BinancePaymentService(db).pending_prepay_ids()
+        if not prepay_ids:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(prepay_id: str):
+            async with semaphore:
+                return await binance_service.check_payment_status(prepay_id)
+
+        results = await asyncio.gather(*(check(prepay_id) for prepay_id in prepay_ids), return_exceptions=True)
+
+        settled = failed = 0
+        async with async_session() as db:
+            service = BinancePaymentService(db)
+            for prepay_id, result in zip(prepay_ids, results):
+                if isinstance(result, Exception):
+                    failed += 1
+                    last_error = result.detail if isinstance(result, HTTPException) else result
+                    continue
+                if await service.settle(prepay_id, result.get("status"), result.get("transaction_id")):
+                    settled += 1
+        if failed:
+            logger.warning("Conciliación de Binance Pay: %s consultas fallidas (%s)", failed, last_error)
+        if settled:
+            logger.info("Conciliación de Binance Pay: %s pagos liquidados", settled)
+        return settled
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Error conciliando pagos de Binance Pay")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+binance_reconciler = BinancePaymentReconciler()
@@ -0,0 +1,78 @@
+from typing import Callable, Optional
+import time
+
+
+class CircuitBreaker:
+    """
+    Cortocircuito para APIs externas. Tras `failure_threshold` fallos seguidos se
+    abre y rechaza llamadas sin tocar la red durante `reset_timeout` segundos;
+    luego deja pasar una sola llamada de prueba (semiabierto) que lo cierra o
+    lo vuelve a abrir.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def allow(self) -> bool:
+        """¿Se puede intentar la llamada ahora?"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        now = self._clock()
+        # Una prueba a la vez; si la anterior nunca informó resultado, se permite otra
+        if state == self.HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_started = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._probe_started = None
+
+    def retry_after(self) -> float:
+        """Segundos hasta la próxima llamada de prueba (0 si no está abierto)"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "rejected": self.rejected,
+            "retry_after": round(self.retry_after(), 1)
+        }
@@ -0,0 +1,117 @@
+from typing import Any, Optional, Tuple
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from config import (
+    GEOCODING_CACHE_TTL, GEOCODING_CACHE_SIZE, GEOCODING_CACHE_PRECISION,
+    GEOCODING_CACHE_DB, GEOCODING_CACHE_DB_MAX_ROWS
+)
+from services.cache import MISSING, TTLCache
+
+
+def normalize_address(address: str) -> str:
+    """
+    Normalizar una dirección para usarla como clave: sin acentos, en minúsculas
+    y con espacios y comas colapsados ("Av.  Bolívar ,Caracas" == "av. bolivar, caracas")
+    """
+    text = unicodedata.normalize("NFKD", address)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ,.")
+
+
+def quantize_coordinates(latitude: float, longitude: float, precision: int = GEOCODING_CACHE_PRECISION) -> Tuple[float, float]:
+    """Redondear coordenadas (4 decimales ≈ 11 m) para que puntos casi iguales compartan clave"""
+    return round(latitude, precision) + 0.0, round(longitude, precision) + 0.0
+
+
+class GeocodingCache:
+    """
+    Caché de dos niveles para geocodificación: LRU en memoria y, opcionalmente,
+    una tabla SQLite que sobrevive a reinicios y se comparte entre workers.
+    """
+
+    def __init__(
+        self,
+        ttl: float = GEOCODING_CACHE_TTL,
+        max_size: int = GEOCODING_CACHE_SIZE,
+        db_path: str = GEOCODING_CACHE_DB,
+        db_max_rows: int = GEOCODING_CACHE_DB_MAX_ROWS,
+        precision: int = GEOCODING_CACHE_PRECISION
+    ):
+        self.ttl = ttl
+        self.precision = precision
+        self.db_max_rows = db_max_rows
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocoding_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_geocoding_cache_expires_at ON geocoding_cache (expires_at)"
+            )
+            self._db.commit()
+
+    def address_key(self, address: str) -> str:
+        return f"addr:{normalize_address(address)}"
+
+    def coordinates_key(self, latitude: float, longitude: float) -> str:
+        lat, lng = quantize_coordinates(latitude, longitude, self.precision)
+        return f"latlng:{lat:.{self.precision}f},{lng:.{self.precision}f}"
+
+    def get(self, key: str) -> Any:
+        """Buscar primero en memoria y luego en disco; retorna MISSING si no hay entrada vigente"""
+        value = self.memory.get(key)
+        if value is not MISSING or self._db is None:
+            return value
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM geocoding_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return MISSING
+
+        value = json.loads(row[0])
+        # Promover al nivel de memoria con el tiempo de vida restante
+        self.memory.set(key, value, ttl=row[1] - time.time())
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self._db is None:
+            return
+
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocoding_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl)
+            )
+            self._writes += 1
+            # Limpieza periódica: expirados primero y luego los más antiguos si se supera el tope
+            if self._writes % 500 == 0:
+                self._evict_locked()
+            self._db.commit()
+
+    def _evict_locked(self):
+        self._db.execute("DELETE FROM geocoding_cache WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM geocoding_cache WHERE key IN ("
+            "SELECT key FROM geocoding_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.db_max_rows,)
+        )
+
+
+# Caché compartida por todas las instancias de GeolocationService del proceso
+geocoding_cache = GeocodingCache()
@@ -0,0 +1,71 @@
+from typing import Sequence, Tuple, Union
+import math
+import numpy as np
+
+# Radio medio de la Tierra en kilómetros
+EARTH_RADIUS_KM = 6371.0
+# Kilómetros por grado de latitud (aproximación esférica)
+KM_PER_DEGREE = 111.32
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia Haversine en km entre dos puntos (versión escalar)"""
+    lat1_rad, lng1_rad, lat2_rad, lng2_rad = map(math.radians, (lat1, lng1, lat2, lng2))
+    dlat = lat2_rad - lat1_rad
+    dlng = lng2_rad - lng1_rad
+
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_one_to_many(lat: float, lng: float, lats: ArrayLike, lngs: ArrayLike) -> np.ndarray:
+    """
+    Distancias en km desde un origen hasta N destinos en una sola operación vectorizada.
+    Retorna un arreglo de forma (N,).
+    """
+    lat_rad = math.radians(lat)
+    lng_rad = math.radians(lng)
+    lats_rad = np.radians(np.asarray(lats, dtype=np.float64))
+    lngs_rad = np.radians(np.asarray(lngs, dtype=np.float64))
+
+    a = (
+        np.sin((lats_rad - lat_rad) / 2) ** 2
+        + math.cos(lat_rad) * np.cos(lats_rad) * np.sin((lngs_rad - lng_rad) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_many_to_many(
+    lats1: ArrayLike,
+    lngs1: ArrayLike,
+    lats2: ArrayLike,
+    lngs2: ArrayLike
+) -> np.ndarray:
+    """
+    Matriz de distancias en km entre M orígenes y N destinos.
+    Retorna un arreglo de forma (M, N).
+    """
+    lats1_rad = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lngs1_rad = np.radians(np.asarray(lngs1, dtype=np.float64))[:, np.newaxis]
+    lats2_rad = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+    lngs2_rad = np.radians(np.asarray(lngs2, dtype=np.float64))[np.newaxis, :]
+
+    a = (
+        np.sin((lats2_rad - lats1_rad) / 2) ** 2
+        + np.cos(lats1_rad) * np.cos(lats2_rad) * np.sin((lngs2_rad - lngs1_rad) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Rectángulo (min_lat, max_lat, min_lng, max_lng) que envuelve un radio en km.
+    Las longitudes pueden salirse de [-180, 180] cerca del antimeridiano.
+    El marketplace lo filtra en SQL sobre ix_service_profiles_location.
+    """
+    lat_span = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 89.9)))
+    lng_span = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    return lat - lat_span, lat + lat_span, lng - lng_span, lng + lng_span
@@ -1,12 +1,28 @@
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
+import asyncio
 import os
 import aiohttp
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
 from database.models import Location
-import math
+from config import (
+    DISTANCE_MATRIX_MAX_DESTINATIONS, DISTANCE_MATRIX_MAX_ELEMENTS, DISTANCE_MATRIX_CONCURRENCY
+)
+from services.cache import MISSING
+from services.geodesic import haversine_km, haversine_one_to_many
+from services.geocoding_cache import GeocodingCache, geocoding_cache
+from services.http_client import get_http_session
+
+# Velocidad promedio usada para estimar tiempos sin la API (km/h)
+AVERAGE_SPEED_KMH = 30
 
 class GeolocationService:
-    def __init__(self):
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        cache: Optional[GeocodingCache] = geocoding_cache
+    ):
+        self.session = session
+        self.cache = cache
         self.google_maps_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         self.distance_matrix_url = "https://maps.googleapis.com/maps/api/distancematrix/json"
         self.geocoding_url = "https://maps.googleapis.com/maps/api/geocode/json"
@@ -31,33 +47,123 @@ class GeolocationService:
             "mode": "driving"
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.distance_matrix_url, params=params) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Error al calcular la distancia"
-                    )
+        session = self.session or await get_http_session()
+        async with session.get(self.distance_matrix_url, params=params) as response:
+            if response.status != 200:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Error al calcular la distancia"
+                )
 
-                data = await response.json()
-                if data["status"] != "OK":
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Error en la respuesta de Google Maps"
-                    )
+            data = await response.json()
+            if data["status"] != "OK":
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Error en la respuesta de Google Maps"
+                )
 
-                element = data["rows"][0]["elements"][0]
-                if element["status"] != "OK":
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="No se pudo calcular la ruta"
-                    )
+            element = data["rows"][0]["elements"][0]
+            if element["status"] != "OK":
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="No se pudo calcular la ruta"
+                )
+
+            # Convertir metros a kilómetros y segundos a minutos
+            distance_km = element["distance"]["value"] / 1000
+            duration_minutes = element["duration"]["value"] / 60
+
+            return distance_km, duration_minutes
+
+    async def calculate_distances(
+        self,
+        origin: Location,
+        destinations: List[Location],
+        max_elements: int = DISTANCE_MATRIX_MAX_ELEMENTS
+    ) -> List[Tuple[float, float]]:
+        """
+        Calcula distancia y tiempo desde un origen hasta varios destinos.
+        Agrupa los destinos en lotes del tamaño máximo de la API y los consulta
+        en paralelo; los destinos que exceden max_elements, los lotes que fallan
+        y los elementos sin ruta usan la estimación Haversine.
+        Retorna una lista de (distancia_en_km, tiempo_en_minutos) en el mismo orden.
+        """
+        if not destinations:
+            return []
+
+        # Estimación vectorizada para todos los destinos
+        approx_km = haversine_one_to_many(
+            origin.latitude, origin.longitude,
+            [destination.latitude for destination in destinations],
+            [destination.longitude for destination in destinations]
+        )
+        results = [
+            (float(distance), float(distance) / AVERAGE_SPEED_KMH * 60)
+            for distance in approx_km
+        ]
+
+        if not self.google_maps_api_key:
+            return results
+
+        budget = min(len(destinations), max(max_elements, 0))
+        chunks = [
+            list(range(start, min(start + DISTANCE_MATRIX_MAX_DESTINATIONS, budget)))
+            for start in range(0, budget, DISTANCE_MATRIX_MAX_DESTINATIONS)
+        ]
+        semaphore = asyncio.Semaphore(DISTANCE_MATRIX_CONCURRENCY)
+
+        async def fetch(chunk: List[int]):
+            async with semaphore:
+                return await self._fetch_distance_matrix(origin, [destinations[i] for i in chunk])
 
-                # Convertir metros a kilómetros y segundos a minutos
-                distance_km = element["distance"]["value"] / 1000
-                duration_minutes = element["duration"]["value"] / 60
+        responses = await asyncio.gather(*[fetch(chunk) for chunk in chunks], return_exceptions=True)
+        for chunk, elements in zip(chunks, responses):
+            if isinstance(elements, Exception) or elements is None:
+                continue
+            for index, element in zip(chunk, elements):
+                if element is not None:
+                    results[index] = element
 
-                return distance_km, duration_minutes
+        return results
+
+    async def _fetch_distance_matrix(
+        self,
+        origin: Location,
+        destinations: List[Location]
+    ) -> Optional[List[Optional[Tuple[float, float]]]]:
+        """
+        Una llamada a la Distance Matrix API para un lote de destinos.
+        Retorna None si la llamada falla (incluye OVER_QUERY_LIMIT) y None por
+        cada elemento sin ruta.
+        """
+        params = {
+            "origins": f"{origin.latitude},{origin.longitude}",
+            "destinations": "|".join(
+                f"{destination.latitude},{destination.longitude}" for destination in destinations
+            ),
+            "key": self.google_maps_api_key,
+            "mode": "driving"
+        }
+
+        session = self.session or await get_http_session()
+        async with session.get(self.distance_matrix_url, params=params) as response:
+            if response.status != 200:
+                return None
+
+            data = await response.json()
+            if data["status"] != "OK":
+                return None
+
+            elements = []
+            for element in data["rows"][0]["elements"]:
+                if element["status"] != "OK":
+                    elements.append(None)
+                else:
+                    elements.append((
+                        element["distance"]["value"] / 1000,
+                        element["duration"]["value"] / 60
+                    ))
+            return elements
 
     def _calculate_approximate_distance(
         self,
@@ -68,24 +174,13 @@ class GeolocationService:
         Calcula una distancia aproximada usando la fórmula de Haversine
         Retorna una tupla con (distancia_en_km, tiempo_estimado_en_minutos)
         """
-        # Radio de la Tierra en kilómetros
-        R = 6371.0
-
-        # Convertir coordenadas a radianes
-        lat1, lon1 = math.radians(origin.latitude), math.radians(origin.longitude)
-        lat2, lon2 = math.radians(destination.latitude), math.radians(destination.longitude)
-
-        # Diferencia de coordenadas
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-
-        # Fórmula de Haversine
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distance = R * c
+        distance = haversine_km(
+            origin.latitude, origin.longitude,
+            destination.latitude, destination.longitude
+        )
 
         # Estimar tiempo (asumiendo velocidad promedio de 30 km/h)
-        estimated_time = (distance / 30) * 60  # en minutos
+        estimated_time = (distance / AVERAGE_SPEED_KMH) * 60  # en minutos
 
         return distance, estimated_time
 
@@ -100,21 +195,30 @@ class GeolocationService:
         if not self.google_maps_api_key:
             return None
 
+        cache_key = self.cache.coordinates_key(latitude, longitude) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not MISSING:
+                return cached
+
         params = {
             "latlng": f"{latitude},{longitude}",
             "key": self.google_maps_api_key
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.geocoding_url, params=params) as response:
-                if response.status != 200:
-                    return None
+        session = self.session or await get_http_session()
+        async with session.get(self.geocoding_url, params=params) as response:
+            if response.status != 200:
+                return None
 
-                data = await response.json()
-                if data["status"] != "OK" or not data["results"]:
-                    return None
+            data = await response.json()
+            if data["status"] != "OK" or not data["results"]:
+                return None
 
-                return data["results"][0]["formatted_address"]
+            formatted_address = data["results"][0]["formatted_address"]
+            if cache_key:
+                self.cache.set(cache_key, formatted_address)
+            return formatted_address
 
     async def get_coordinates_from_address(
         self,
@@ -126,22 +230,37 @@ class GeolocationService:
         if not self.google_maps_api_key:
             return None
 
+        cache_key = self.cache.address_key(address) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not MISSING:
+                return tuple(cached)
+
         params = {
             "address": address,
             "key": self.google_maps_api_key
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.geocoding_url, params=params) as response:
-                if response.status != 200:
-                    return None
+        session = self.session or await get_http_session()
+        async with session.get(self.geocoding_url, params=params) as response:
+            if response.status != 200:
+                return None
 
-                data = await response.json()
-                if data["status"] != "OK" or not data["results"]:
-                    return None
+            data = await response.json()
+            if data["status"] != "OK" or not data["results"]:
+                return None
 
-                location = data["results"][0]["geometry"]["location"]
-                return location["lat"], location["lng"]
+            result = data["results"][0]
+            location = result["geometry"]["location"]
+            if cache_key:
+                self.cache.set(cache_key, (location["lat"], location["lng"]))
+                # La respuesta ya trae la dirección formateada: evita la geocodificación inversa
+                if result.get("formatted_address"):
+                    self.cache.set(
+                        self.cache.coordinates_key(location["lat"], location["lng"]),
+                        result["formatted_address"]
+                    )
+            return location["lat"], location["lng"]
 
     def calculate_delivery_fee(
         self,
@@ -164,4 +283,10 @@ class GeolocationService:
         Verifica si la ubicación de destino está dentro del radio de entrega
         """
         distance, _ = self._calculate_approximate_distance(origin, destination)
-        return distance <= max_radius_km 
\ No newline at end of file
+        return distance <= max_radius_km
+
+async def get_geolocation_service(
+    session: aiohttp.ClientSession = Depends(get_http_session)
+) -> GeolocationService:
+    """Dependency de FastAPI: servicio de geolocalización sobre la sesión HTTP compartida"""
+    return GeolocationService(session)
@@ -0,0 +1,52 @@
+from typing import Optional
+import aiohttp
+
+from config import (
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_TOTAL_TIMEOUT
+)
+
+# Sesión HTTP compartida por toda la aplicación (una por proceso)
+_http_session: Optional[aiohttp.ClientSession] = None
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    Crear una sesión aiohttp con pool de conexiones, keep-alive, caché de DNS,
+    límite de conexiones por host y timeouts explícitos
+    """
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=HTTP_TOTAL_TIMEOUT,
+        sock_connect=HTTP_CONNECT_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def startup_http_session() -> aiohttp.ClientSession:
+    """Abrir la sesión compartida (llamar desde el lifespan de la app)"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = create_http_session()
+    return _http_session
+
+
+async def shutdown_http_session():
+    """Cerrar la sesión compartida y liberar las conexiones del pool"""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Dependency de FastAPI con la sesión compartida.
+    Si la app no la abrió en el lifespan, se crea en el primer uso.
+    """
+    return await startup_http_session()
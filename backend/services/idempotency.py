@@ -0,0 +1,235 @@
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import functools
+import hashlib
+import json
+import time
+import weakref
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_LOCK_TIMEOUT, IDEMPOTENCY_PURGE_INTERVAL
+from database.database import async_session
+from database.models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+# Header agregado a las respuestas reproducidas desde lo guardado
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(scope: str, arguments: dict) -> str:
+    """sha256 del endpoint y de los argumentos de la petición (cuerpo y parámetros simples)"""
+    payload = {
+        name: value.model_dump(mode="json") if isinstance(value, BaseModel) else value
+        for name, value in arguments.items()
+        if value is None or isinstance(value, (BaseModel, str, int, float, bool))
+    }
+    return hashlib.sha256(
+        json.dumps([scope, payload], sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _in_progress() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Hay una petición en curso con esta Idempotency-Key",
+        headers={"Retry-After": "1"}
+    )
+
+
+class IdempotencyStore:
+    """
+    Respuestas guardadas por (usuario, Idempotency-Key) en idempotency_keys.
+    La primera petición reclama la clave (fila sin status_code) y ejecuta; las
+    repetidas reproducen la respuesta guardada con una lectura por clave primaria.
+    Duplicados concurrentes en el mismo proceso esperan al primero; en otro
+    worker reciben 409 hasta que termine. Un reclamo abandonado (caída del
+    proceso) vence a los IDEMPOTENCY_LOCK_TIMEOUT segundos.
+    """
+
+    def __init__(
+        self,
+        ttl: int = IDEMPOTENCY_KEY_TTL,
+        lock_timeout: int = IDEMPOTENCY_LOCK_TIMEOUT,
+        purge_interval: int = IDEMPOTENCY_PURGE_INTERVAL
+    ):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.purge_interval = purge_interval
+        self._locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._last_purge = 0.0
+
+    def _lock(self, user_id: int, key: str) -> asyncio.Lock:
+        lock = self._locks.get((user_id, key))
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[(user_id, key)] = lock
+        return lock
+
+    async def run(
+        self,
+        user_id: int,
+        key: str,
+        scope: str,
+        fingerprint: str,
+        call: Callable[[], Awaitable[Any]],
+        serialize: Callable[[Any], Any] = jsonable_encoder
+    ) -> Any:
+        """
+        Ejecutar `call` una sola vez por clave; las repeticiones obtienen la misma
+        respuesta. `serialize` convierte el resultado en el cuerpo JSON que se guarda.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key no puede superar {MAX_KEY_LENGTH} caracteres"
+            )
+
+        async with self._lock(user_id, key):
+            replay = await self._claim(user_id, key, scope, fingerprint)
+            if replay is not None:
+                return replay
+            try:
+                result = await call()
+            except BaseException:
+                # Sin respuesta que guardar: el cliente puede reintentar con la misma clave
+                await self._release(user_id, key)
+                raise
+            if isinstance(result, Response):
+                # Respuestas ya construidas no se guardan
+                await self._release(user_id, key)
+            else:
+                await self._complete(user_id, key, serialize(result))
+            return result
+
+    async def _claim(self, user_id: int, key: str, scope: str, fingerprint: str) -> Optional[JSONResponse]:
+        now = datetime.utcnow()
+        async with async_session() as db:
+            await self._purge(db, now)
+            record = await db.get(IdempotencyKey, (user_id, key))
+            if record is not None and record.expires_at <= now:
+                await db.delete(record)
+                await db.flush()
+                record = None
+
+            if record is None:
+                db.add(IdempotencyKey(
+                    user_id=user_id,
+                    key=key,
+                    scope=scope,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=self.lock_timeout)
+                ))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # Otro worker la reclamó entre la lectura y el insert
+                    raise _in_progress()
+                return None
+
+        if record.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key ya usada con otra petición"
+            )
+        if record.status_code is None:
+            raise _in_progress()
+        return JSONResponse(
+            content=record.response,
+            status_code=record.status_code,
+            headers={REPLAY_HEADER: "true"}
+        )
+
+    async def _complete(self, user_id: int, key: str, body: Any):
+        async with async_session() as db:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+                .values(
+                    status_code=status.HTTP_200_OK,
+                    response=body,
+                    expires_at=datetime.utcnow() + timedelta(seconds=self.ttl)
+                )
+            )
+            await db.commit()
+
+    async def _release(self, user_id: int, key: str):
+        async with async_session() as db:
+            await db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None)
+            ))
+            await db.commit()
+
+    async def _purge(self, db, now: datetime):
+        """Borrar claves vencidas, como mucho una vez cada purge_interval segundos"""
+        if time.monotonic() - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = time.monotonic()
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+        await db.commit()
+
+
+idempotency_store = IdempotencyStore()
+
+
+async def _call_endpoint(endpoint, kwargs: dict) -> Any:
+    try:
+        return await endpoint(**kwargs)
+    except BaseException:
+        # Descartar la transacción del endpoint antes de liberar la clave
+        # (en SQLite seguiría reteniendo el bloqueo de escritura)
+        for value in kwargs.values():
+            if isinstance(value, Session):
+                value.rollback()
+            elif isinstance(value, AsyncSession):
+                await value.rollback()
+        raise
+
+
+def idempotent(scope: str, response_model: Any = None):
+    """
+    Decorador para endpoints con Idempotency-Key. El endpoint declara
+    `idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")` y
+    `current_user`; sin el header se ejecuta como siempre. `response_model` debe
+    ser el mismo de la ruta: la respuesta se guarda filtrada por él, igual que
+    la que FastAPI envía la primera vez.
+    """
+    serialize = jsonable_encoder
+    if response_model is not None:
+        adapter = TypeAdapter(response_model)
+
+        def serialize(result):
+            # Mismo camino que FastAPI: validar contra el modelo y volcar en modo JSON
+            if isinstance(result, BaseModel):
+                result = result.model_dump(by_alias=True)
+            return adapter.dump_python(
+                adapter.validate_python(result, from_attributes=True), mode="json", by_alias=True
+            )
+
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            key = kwargs.get("idempotency_key")
+            if not key:
+                return await endpoint(**kwargs)
+            arguments = {name: value for name, value in kwargs.items() if name != "idempotency_key"}
+            return await idempotency_store.run(
+                kwargs["current_user"].id,
+                key,
+                scope,
+                request_fingerprint(scope, arguments),
+                lambda: _call_endpoint(endpoint, kwargs),
+                serialize
+            )
+        return wrapper
+    return decorator
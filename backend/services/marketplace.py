@@ -0,0 +1,157 @@
+from typing import Any, List, Optional, Sequence, Tuple
+import base64
+import json
+import math
+from sqlalchemy import String, and_, case, cast, func, or_
+from sqlalchemy.orm import Query, Session
+
+from models_simple import User as UserModel, ServiceProfile
+from services.geodesic import KM_PER_DEGREE, bounding_box
+
+SORT_OPTIONS = ("distance", "rating", "price", "experience")
+
+# Valores que se muestran cuando el perfil no tiene datos (ver KrizoWorkerResponse)
+DEFAULT_RATING = 4.0
+DEFAULT_EXPERIENCE = 1
+
+
+def parse_services(services: Optional[str]) -> List[str]:
+    """Convertir el parámetro "a, b,c" en una lista sin vacíos"""
+    if not services:
+        return []
+    return [s.strip() for s in services.split(',') if s.strip()]
+
+
+def _json_list_contains_any(column, values: List[str]):
+    """
+    Condición portable (SQLite/PostgreSQL) para "la lista JSON contiene alguno
+    de los valores". Compara contra el texto serializado con json.dumps, que
+    es el mismo serializador que usa la columna JSON al guardar.
+    """
+    text = cast(column, String)
+    conditions = []
+    for value in values:
+        token = json.dumps(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append(text.like(f"%{token}%", escape="\\"))
+    return or_(*conditions)
+
+
+def approximate_distance_sq(lat: float, lng: float):
+    """
+    Distancia equirectangular al cuadrado (km²) como expresión SQL.
+    Solo usa aritmética, por lo que funciona en SQLite sin funciones
+    trigonométricas, y para radios urbanos difiere de Haversine en menos de 0.1%.
+    """
+    cos_lat = math.cos(math.radians(lat))
+    dy = (ServiceProfile.location_lat - lat) * KM_PER_DEGREE
+    dx = (ServiceProfile.location_lng - lng) * (KM_PER_DEGREE * cos_lat)
+    return dy * dy + dx * dx
+
+
+def build_krizoworkers_query(
+    db: Session,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    services: Optional[List[str]] = None,
+    min_rating: Optional[float] = None,
+    online_only: bool = False,
+    sort_by: str = "distance",
+    cursor_values: Optional[List[Any]] = None
+) -> Query:
+    """
+    Construir la consulta del marketplace con todos los filtros y el orden en SQL.
+    Cada fila es (User, ServiceProfile, *valores_de_orden); quien llama solo
+    tiene que aplicar limit y materializar la página.
+    """
+    query = db.query(UserModel, ServiceProfile).join(
+        ServiceProfile, UserModel.id == ServiceProfile.user_id
+    ).filter(
+        UserModel.user_type == "SERVICE_PROVIDER",
+        UserModel.is_active == True
+    )
+
+    if online_only:
+        query = query.filter(ServiceProfile.is_online == True)
+
+    if min_rating:
+        query = query.filter(ServiceProfile.average_rating >= min_rating)
+
+    if services:
+        query = query.filter(_json_list_contains_any(ServiceProfile.services, services))
+
+    if lat and lng and max_distance:
+        # Rectángulo (rango sobre ix_service_profiles_location) y radio aproximado en SQL
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, max_distance)
+        in_radius = [ServiceProfile.location_lat.between(min_lat, max_lat)]
+        if min_lng >= -180.0 and max_lng <= 180.0:
+            in_radius.append(ServiceProfile.location_lng.between(min_lng, max_lng))
+            in_radius.append(approximate_distance_sq(lat, lng) <= max_distance * max_distance)
+        query = query.filter(or_(
+            and_(*in_radius),
+            ServiceProfile.location_lat.is_(None),
+            ServiceProfile.location_lng.is_(None)
+        ))
+
+    sort_keys = marketplace_sort_keys(sort_by, lat, lng)
+    if cursor_values is not None:
+        query = query.filter(_keyset_condition(sort_keys, cursor_values))
+
+    # Las claves de orden se devuelven como columnas extra para poder armar el cursor
+    query = query.add_columns(*[expr for expr, _ in sort_keys])
+    return query.order_by(*[expr.desc() if descending else expr for expr, descending in sort_keys])
+
+
+def marketplace_sort_keys(sort_by: str, lat: Optional[float], lng: Optional[float]) -> List[Tuple[Any, bool]]:
+    """
+    Claves de orden del marketplace como pares (expresión, descendente).
+    Todas terminan en ServiceProfile.id para que el orden sea total y el
+    cursor no repita ni salte trabajadores con el mismo valor.
+    """
+    if sort_by == "distance" and lat and lng:
+        missing_location = or_(
+            ServiceProfile.location_lat.is_(None),
+            ServiceProfile.location_lng.is_(None)
+        )
+        keys = [
+            (case((missing_location, 1), else_=0), False),
+            (func.coalesce(approximate_distance_sq(lat, lng), 0.0), False),
+        ]
+    elif sort_by == "rating":
+        keys = [(func.coalesce(func.nullif(ServiceProfile.average_rating, 0), DEFAULT_RATING), True)]
+    elif sort_by == "experience":
+        keys = [(func.coalesce(func.nullif(ServiceProfile.experience_years, 0), DEFAULT_EXPERIENCE), True)]
+    else:
+        keys = []
+    return keys + [(ServiceProfile.id, False)]
+
+
+def _keyset_condition(sort_keys: List[Tuple[Any, bool]], values: List[Any]):
+    """Condición "fila posterior al cursor" para un orden compuesto"""
+    (expr, descending), value = sort_keys[0], values[0]
+    after = expr < value if descending else expr > value
+    if len(sort_keys) == 1:
+        return after
+    return or_(after, and_(expr == value, _keyset_condition(sort_keys[1:], values[1:])))
+
+
+def encode_cursor(sort_by: str, values: Sequence[Any]) -> str:
+    """Cursor opaco con el orden activo y los valores de la última fila entregada"""
+    payload = json.dumps({"s": sort_by, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, lat: Optional[float], lng: Optional[float]) -> List[Any]:
+    """Validar y decodificar un cursor; lanza ValueError si no corresponde a esta consulta"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor inválido")
+
+    if payload.get("s") != sort_by or not isinstance(values, list):
+        raise ValueError("El cursor no corresponde al orden solicitado")
+    if len(values) != len(marketplace_sort_keys(sort_by, lat, lng)):
+        raise ValueError("El cursor no corresponde a la consulta")
+    return values
@@ -1,5 +1,6 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
 from database.models import (
     User, Notification, NotificationPreference, DeviceToken,
     NotificationType, NotificationPriority
@@ -8,11 +9,13 @@ from schemas.notification import NotificationCreate
 from datetime import datetime
 import os
 from typing import List, Optional
-import aiohttp
+import asyncio
 import json
 
+from services.http_client import get_http_session
+
 class NotificationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.firebase_server_key = os.getenv("FIREBASE_SERVER_KEY")
         self.sms_api_key = os.getenv("SMS_API_KEY")
@@ -28,7 +31,7 @@ class NotificationService:
         data: Optional[dict] = None
     ) -> Notification:
         # Verificar que el usuario existe
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = await self.db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -36,14 +39,14 @@ class NotificationService:
             )
 
         # Obtener preferencias de notificación
-        preferences = self.db.query(NotificationPreference).filter(
+        preferences = await self.db.scalar(select(NotificationPreference).where(
             NotificationPreference.user_id == user_id
-        ).first()
+        ).limit(1))
 
         if not preferences:
             preferences = NotificationPreference(user_id=user_id)
             self.db.add(preferences)
-            self.db.commit()
+            await self.db.commit()
 
         # Verificar si el usuario quiere recibir este tipo de notificación
         if not self._should_send_notification(preferences, type):
@@ -59,8 +62,8 @@ class NotificationService:
             data=data
         )
         self.db.add(notification)
-        self.db.commit()
-        self.db.refresh(notification)
+        await self.db.commit()
+        await self.db.refresh(notification)
 
         # Enviar notificaciones según las preferencias
         await self._send_notifications(notification, user, preferences)
@@ -109,10 +112,10 @@ class NotificationService:
 
     async def _send_push_notification(self, notification: Notification, user: User):
         # Obtener tokens de dispositivos activos
-        device_tokens = self.db.query(DeviceToken).filter(
+        device_tokens = (await self.db.scalars(select(DeviceToken).where(
             DeviceToken.user_id == user.id,
             DeviceToken.is_active == True
-        ).all()
+        ))).all()
 
         if not device_tokens:
             return
@@ -128,18 +131,18 @@ class NotificationService:
         }
 
         # Enviar a Firebase
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"key={self.firebase_server_key}",
-                "Content-Type": "application/json"
-            }
-            async with session.post(
-                "https://fcm.googleapis.com/fcm/send",
-                headers=headers,
-                json=message
-            ) as response:
-                if response.status != 200:
-                    print(f"Error sending push notification: {await response.text()}")
+        session = await get_http_session()
+        headers = {
+            "Authorization": f"key={self.firebase_server_key}",
+            "Content-Type": "application/json"
+        }
+        async with session.post(
+            "https://fcm.googleapis.com/fcm/send",
+            headers=headers,
+            json=message
+        ) as response:
+            if response.status != 200:
+                print(f"Error sending push notification: {await response.text()}")
 
     async def _send_email_notification(self, notification: Notification, user: User):
         # Implementar envío de email usando el servicio de email configurado
@@ -151,25 +154,28 @@ class NotificationService:
         # Por ejemplo, usando Twilio, MessageBird, etc.
         pass
 
-    def get_user_notifications(
+    async def get_user_notifications(
         self,
         user_id: int,
         skip: int = 0,
         limit: int = 20,
         unread_only: bool = False
     ) -> List[Notification]:
-        query = self.db.query(Notification).filter(Notification.user_id == user_id)
+        query = select(Notification).where(Notification.user_id == user_id)
         
         if unread_only:
-            query = query.filter(Notification.is_read == False)
+            query = query.where(Notification.is_read == False)
         
-        return query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+        result = await self.db.scalars(
+            query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+        )
+        return list(result)
 
-    def mark_notification_as_read(self, notification_id: int, user_id: int) -> Notification:
-        notification = self.db.query(Notification).filter(
+    async def mark_notification_as_read(self, notification_id: int, user_id: int) -> Notification:
+        notification = await self.db.scalar(select(Notification).where(
             Notification.id == notification_id,
             Notification.user_id == user_id
-        ).first()
+        ))
 
         if not notification:
             raise HTTPException(
@@ -179,34 +185,46 @@ class NotificationService:
 
         notification.is_read = True
         notification.read_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(notification)
+        await self.db.commit()
+        await self.db.refresh(notification)
         return notification
 
-    def mark_all_as_read(self, user_id: int):
-        self.db.query(Notification).filter(
+    async def mark_all_as_read(self, user_id: int):
+        await self.db.execute(update(Notification).where(
             Notification.user_id == user_id,
             Notification.is_read == False
-        ).update({
-            "is_read": True,
-            "read_at": datetime.utcnow()
-        })
-        self.db.commit()
-
-    def get_unread_count(self, user_id: int) -> int:
-        return self.db.query(Notification).filter(
+        ).values(
+            is_read=True,
+            read_at=datetime.utcnow()
+        ))
+        await self.db.commit()
+
+    async def get_unread_count(self, user_id: int) -> int:
+        return await self.db.scalar(select(func.count(Notification.id)).where(
             Notification.user_id == user_id,
             Notification.is_read == False
-        ).count()
+        ))
+
+    async def get_notification_preferences(self, user_id: int) -> NotificationPreference:
+        preferences = await self.db.scalar(select(NotificationPreference).where(
+            NotificationPreference.user_id == user_id
+        ).limit(1))
+
+        if not preferences:
+            preferences = NotificationPreference(user_id=user_id)
+            self.db.add(preferences)
+            await self.db.commit()
+            await self.db.refresh(preferences)
+        return preferences
 
-    def update_notification_preferences(
+    async def update_notification_preferences(
         self,
         user_id: int,
         preferences: dict
     ) -> NotificationPreference:
-        db_preferences = self.db.query(NotificationPreference).filter(
+        db_preferences = await self.db.scalar(select(NotificationPreference).where(
             NotificationPreference.user_id == user_id
-        ).first()
+        ).limit(1))
 
         if not db_preferences:
             db_preferences = NotificationPreference(user_id=user_id)
@@ -216,26 +234,26 @@ class NotificationService:
             if hasattr(db_preferences, key):
                 setattr(db_preferences, key, value)
 
-        self.db.commit()
-        self.db.refresh(db_preferences)
+        await self.db.commit()
+        await self.db.refresh(db_preferences)
         return db_preferences
 
-    def register_device_token(
+    async def register_device_token(
         self,
         user_id: int,
         token: str,
         device_type: str
     ) -> DeviceToken:
         # Verificar si el token ya existe
-        existing_token = self.db.query(DeviceToken).filter(
+        existing_token = await self.db.scalar(select(DeviceToken).where(
             DeviceToken.token == token
-        ).first()
+        ).limit(1))
 
         if existing_token:
             if existing_token.user_id != user_id:
                 # El token pertenece a otro usuario, desactivarlo
                 existing_token.is_active = False
-                self.db.commit()
+                await self.db.commit()
 
         # Crear nuevo token
         device_token = DeviceToken(
@@ -244,12 +262,12 @@ class NotificationService:
             device_type=device_type
         )
         self.db.add(device_token)
-        self.db.commit()
-        self.db.refresh(device_token)
+        await self.db.commit()
+        await self.db.refresh(device_token)
         return device_token
 
-    def unregister_device_token(self, token: str):
-        self.db.query(DeviceToken).filter(
+    async def unregister_device_token(self, token: str):
+        await self.db.execute(update(DeviceToken).where(
             DeviceToken.token == token
-        ).update({"is_active": False})
-        self.db.commit() 
\ No newline at end of file
+        ).values(is_active=False))
+        await self.db.commit() 
\ No newline at end of file
@@ -0,0 +1,237 @@
+from collections import defaultdict
+from typing import Callable, Dict, Tuple
+import logging
+
+from sqlalchemy import event, func, inspect, select, update, case
+from sqlalchemy.orm import Session, aliased
+
+from database.models import BusinessProfile, Delivery, Rating, Service, ServiceProfile, Transaction
+
+logger = logging.getLogger(__name__)
+
+# Contribución de una fila a los contadores de su proveedor, a partir de sus valores
+Contribution = Callable[[dict], Dict[str, float]]
+
+def _enum_name(value):
+    return getattr(value, "name", value)
+
+
+def delivery_contribution(values: dict) -> Dict[str, float]:
+    return {"total_services": 1} if values["status"] == "completed" else {}
+
+
+def transaction_contribution(values: dict) -> Dict[str, float]:
+    if _enum_name(values["type"]) == "PAYMENT" and _enum_name(values["status"]) == "COMPLETED":
+        return {"total_earnings": values["amount"] or 0.0}
+    return {}
+
+
+def rating_contribution(values: dict) -> Dict[str, float]:
+    # rating_sum no es columna: mueve average_rating junto con total_reviews
+    return {"total_reviews": 1, "rating_sum": values["rating"] or 0}
+
+
+def rated_provider(service_id, business_id):
+    """
+    user_id del proveedor calificado (expresión SQL): el dueño del perfil del
+    servicio o, si la calificación no tiene servicio de un perfil, el dueño del negocio.
+    Rating.user_id es quien escribe la reseña, no a quién se califica.
+    """
+    # Alias: dentro del UPDATE de service_profiles la subconsulta no debe correlacionarse
+    profile = aliased(ServiceProfile)
+    by_service = (
+        select(profile.user_id)
+        .join(Service, Service.service_profile_id == profile.id)
+        .where(Service.id == service_id)
+        .scalar_subquery()
+    )
+    by_business = select(BusinessProfile.user_id).where(BusinessProfile.id == business_id).scalar_subquery()
+    return func.coalesce(by_service, by_business)
+
+
+def _same_user(user_id):
+    return user_id
+
+
+class ProviderStatsTracker:
+    """
+    Mantiene los contadores de ServiceProfile (servicios completados, ganancias,
+    reseñas y calificación promedio) aplicando deltas O(1) en el mismo flush que
+    crea, modifica o borra entregas, transacciones y calificaciones: si la
+    transacción hace rollback, los contadores también. Entregas y transacciones
+    se atribuyen por user_id, igual que en las estadísticas del KrizoWorker; las
+    calificaciones, al proveedor del servicio o negocio calificado.
+    Los cambios hechos fuera del ORM (UPDATE masivos, SQL manual) no se ven:
+    reconcile() reconstruye todo desde cero.
+    """
+
+    def __init__(self):
+        self._models: Dict[type, Tuple[Tuple[str, ...], Tuple[str, ...], Contribution, Callable]] = {}
+        self._installed = False
+
+    def watch(
+        self,
+        model,
+        fields: Tuple[str, ...],
+        contribution: Contribution,
+        owner_fields: Tuple[str, ...] = ("user_id",),
+        owner: Callable = _same_user
+    ):
+        """
+        `owner(*valores de owner_fields)` da el user_id del proveedor al que se
+        suman los contadores (un valor o una expresión SQL). Las columnas
+        observadas se declaran con active_history=True: al asignar sobre un objeto
+        expirado (p.ej. tras un commit) se carga el valor anterior, necesario
+        para restar su contribución.
+        """
+        keys = owner_fields + fields
+        self._models[model] = (owner_fields, keys, contribution, owner)
+        if not self._installed:
+            event.listen(Session, "after_flush", self._after_flush)
+            self._installed = True
+
+    def _values(self, instance, keys: Tuple[str, ...], previous: bool) -> dict:
+        """Valores actuales o, con previous=True, los que tenía antes de este flush"""
+        attrs = inspect(instance).attrs
+        values = {}
+        for key in keys:
+            if not previous:
+                values[key] = attrs[key].value
+                continue
+            history = attrs[key].history
+            if history.deleted:
+                values[key] = history.deleted[0]
+            elif history.unchanged:
+                values[key] = history.unchanged[0]
+            else:
+                values[key] = attrs[key].value
+        return values
+
+    def _accumulate(self, deltas, instance, previous: bool, sign: int):
+        owner_fields, keys, contribution, owner = self._models[type(instance)]
+        values = self._values(instance, keys, previous)
+        owner_values = tuple(values[field] for field in owner_fields)
+        if all(value is None for value in owner_values):
+            return
+        for counter, amount in contribution(values).items():
+            deltas[(owner, owner_values)][counter] += sign * amount
+
+    def _after_flush(self, session: Session, flush_context):
+        # En after_flush new/dirty/deleted y el historial de atributos aún
+        # reflejan el estado previo al flush
+        deltas: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for instance in session.new:
+            if type(instance) in self._models:
+                self._accumulate(deltas, instance, previous=False, sign=1)
+        for instance in session.deleted:
+            if type(instance) in self._models:
+                self._accumulate(deltas, instance, previous=True, sign=-1)
+        for instance in session.dirty:
+            if type(instance) in self._models and session.is_modified(instance):
+                self._accumulate(deltas, instance, previous=True, sign=-1)
+                self._accumulate(deltas, instance, previous=False, sign=1)
+
+        connection = session.connection()
+        for (owner, owner_values), counters in deltas.items():
+            statement = self._delta_statement(owner(*owner_values), counters)
+            if statement is not None:
+                connection.execute(statement)
+
+    @staticmethod
+    def _delta_statement(user_id, counters: Dict[str, float]):
+        table = ServiceProfile.__table__
+        values = {}
+        if counters.get("total_services"):
+            values["total_services"] = func.coalesce(table.c.total_services, 0) + int(counters["total_services"])
+        if counters.get("total_earnings"):
+            values["total_earnings"] = func.coalesce(table.c.total_earnings, 0.0) + counters["total_earnings"]
+        if counters.get("total_reviews") or counters.get("rating_sum"):
+            reviews = func.coalesce(table.c.total_reviews, 0)
+            new_reviews = reviews + int(counters.get("total_reviews", 0))
+            # Todas las expresiones del SET leen los valores anteriores de la fila
+            values["total_reviews"] = new_reviews
+            values["average_rating"] = case(
+                (
+                    new_reviews > 0,
+                    (func.coalesce(table.c.average_rating, 0.0) * reviews + counters.get("rating_sum", 0))
+                    / new_reviews
+                ),
+                else_=0.0
+            )
+        if not values:
+            return None
+        return update(table).where(table.c.user_id == user_id).values(**values)
+
+    def reconcile(self, db: Session) -> int:
+        """Recalcular todos los contadores desde las filas originales; retorna perfiles actualizados"""
+        table = ServiceProfile.__table__
+        # Cada agregado se calcula una sola vez, agrupado por proveedor
+        services = select(
+            Delivery.user_id.label("provider_id"),
+            func.count(Delivery.id).label("total")
+        ).where(Delivery.status == "completed").group_by(Delivery.user_id).subquery()
+        earnings = select(
+            Transaction.user_id.label("provider_id"),
+            func.sum(Transaction.amount).label("total")
+        ).where(
+            Transaction.type == "PAYMENT",
+            Transaction.status == "COMPLETED"
+        ).group_by(Transaction.user_id).subquery()
+        # Mismo proveedor que rated_provider(), resuelto con joins en lugar de subconsultas por fila
+        rated_profile = aliased(ServiceProfile)
+        rated = (
+            select(
+                func.coalesce(rated_profile.user_id, BusinessProfile.user_id).label("provider_id"),
+                Rating.rating
+            )
+            .outerjoin(Service, Service.id == Rating.service_id)
+            .outerjoin(rated_profile, rated_profile.id == Service.service_profile_id)
+            .outerjoin(BusinessProfile, BusinessProfile.id == Rating.business_id)
+            .subquery()
+        )
+        reviews = select(
+            rated.c.provider_id,
+            func.count().label("total"),
+            func.avg(rated.c.rating).label("average")
+        ).group_by(rated.c.provider_id).subquery()
+
+        # Una fila por proveedor con los tres agregados (LEFT JOIN: sin filas = 0)
+        profile = aliased(ServiceProfile)
+        stats = (
+            select(
+                profile.user_id,
+                func.coalesce(services.c.total, 0).label("total_services"),
+                func.coalesce(earnings.c.total, 0.0).label("total_earnings"),
+                func.coalesce(reviews.c.total, 0).label("total_reviews"),
+                func.coalesce(reviews.c.average, 0.0).label("average_rating")
+            )
+            .outerjoin(services, services.c.provider_id == profile.user_id)
+            .outerjoin(earnings, earnings.c.provider_id == profile.user_id)
+            .outerjoin(reviews, reviews.c.provider_id == profile.user_id)
+            .distinct()
+            .subquery()
+        )
+
+        # UPDATE ... FROM stats: un solo recorrido en PostgreSQL y SQLite >= 3.33
+        result = db.execute(
+            update(table)
+            .where(table.c.user_id == stats.c.user_id)
+            .values(
+                total_services=stats.c.total_services,
+                total_earnings=stats.c.total_earnings,
+                total_reviews=stats.c.total_reviews,
+                average_rating=stats.c.average_rating
+            )
+        )
+        db.commit()
+        logger.info("Contadores de %s perfiles de proveedor reconciliados", result.rowcount)
+        return result.rowcount
+
+
+provider_stats = ProviderStatsTracker()
+provider_stats.watch(Delivery, ("status",), delivery_contribution)
+provider_stats.watch(Transaction, ("type", "status", "amount"), transaction_contribution)
+provider_stats.watch(
+    Rating, ("rating",), rating_contribution,
+    owner_fields=("service_id", "business_id"), owner=rated_provider
+)
@@ -1,25 +1,90 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, select, inspect
+from sqlalchemy.orm import joinedload, selectinload
 from database.models import (
     Rating, ReviewImage, RatingResponse, User, BusinessProfile, Service, Delivery
 )
-from schemas.rating import RatingCreate, RatingUpdate, RatingFilter
-from typing import List, Optional
+from schemas.rating import (
+    RatingCreate, RatingUpdate, RatingFilter,
+    ReviewImage as ReviewImageSchema, RatingResponse as RatingResponseSchema
+)
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from config import RATING_SUMMARY_CACHE_TTL, RATING_SUMMARY_CACHE_SIZE
+from services.cache import MISSING, TTLCache
+
+STAR_VALUES = range(1, 6)
+# Calificaciones recientes que muestra el resumen del negocio
+RECENT_RATINGS_LIMIT = 5
+
+
+class RatingSummaryCache:
+    """
+    Resumen por negocio: histograma {estrellas: cantidad} y calificaciones recientes.
+    create/update/delete ajustan el histograma en O(1) tras el commit y descartan
+    las recientes (también al agregar imágenes o respuestas), así el resumen sale
+    de memoria. Es por proceso: en otros workers el dato puede quedar viejo hasta
+    RATING_SUMMARY_CACHE_TTL.
+    """
+
+    def __init__(self, ttl: float = RATING_SUMMARY_CACHE_TTL, max_size: int = RATING_SUMMARY_CACHE_SIZE):
+        self.histograms = TTLCache(max_size=max_size, ttl=ttl)
+        self.recent = TTLCache(max_size=max_size, ttl=ttl)
+        # Cambios por negocio; evita guardar datos leídos antes de un cambio concurrente
+        self._generations: Dict[int, int] = {}
+
+    def get(self, business_id: int) -> Optional[Dict[int, int]]:
+        histogram = self.histograms.get(business_id)
+        return None if histogram is MISSING else histogram
+
+    def generation(self, business_id: int) -> int:
+        return self._generations.get(business_id, 0)
+
+    def set(self, business_id: int, histogram: Dict[int, int], generation: int):
+        if generation == self.generation(business_id):
+            self.histograms.set(business_id, histogram)
+
+    def get_recent(self, business_id: int) -> Optional[List[dict]]:
+        ratings = self.recent.get(business_id)
+        return None if ratings is MISSING else ratings
+
+    def set_recent(self, business_id: int, ratings: List[dict], generation: int):
+        if generation == self.generation(business_id):
+            self.recent.set(business_id, ratings)
+
+    def invalidate(self, business_id: int):
+        """Descartar las calificaciones recientes del negocio (el histograma no cambia)"""
+        self._generations[business_id] = self.generation(business_id) + 1
+        self.recent.pop(business_id)
+
+    def adjust(self, business_id: int, removed: Optional[int] = None, added: Optional[int] = None):
+        self.invalidate(business_id)
+        histogram = self.get(business_id)
+        if histogram is None:
+            return
+        if removed is not None:
+            histogram[removed] = histogram.get(removed, 0) - 1
+        if added is not None:
+            histogram[added] = histogram.get(added, 0) + 1
+
+
+rating_summary_cache = RatingSummaryCache()
+
+
 class RatingService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_rating(
+    async def create_rating(
         self,
         user_id: int,
         rating_data: RatingCreate
     ) -> Rating:
         """Crear una nueva calificación"""
         # Verificar que el usuario existe
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = await self.db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -27,9 +92,7 @@ class RatingService:
             )
 
         # Verificar que el negocio existe
-        business = self.db.query(BusinessProfile).filter(
-            BusinessProfile.id == rating_data.business_id
-        ).first()
+        business = await self.db.get(BusinessProfile, rating_data.business_id)
         if not business:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -38,10 +101,10 @@ class RatingService:
 
         # Verificar que no existe una calificación previa para la misma entrega
         if rating_data.delivery_id:
-            existing_rating = self.db.query(Rating).filter(
+            existing_rating = await self.db.scalar(select(Rating).where(
                 Rating.delivery_id == rating_data.delivery_id,
                 Rating.user_id == user_id
-            ).first()
+            ).limit(1))
             if existing_rating:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -54,26 +117,30 @@ class RatingService:
             **rating_data.dict()
         )
         self.db.add(rating)
-        self.db.commit()
-        self.db.refresh(rating)
+        await self.db.commit()
+        rating_summary_cache.adjust(rating.business_id, added=rating.rating)
+        await self.db.refresh(rating)
         return rating
 
-    def get_rating(self, rating_id: int) -> Optional[Rating]:
+    async def get_rating(self, rating_id: int) -> Optional[Rating]:
         """Obtener una calificación específica"""
-        return self.db.query(Rating).filter(Rating.id == rating_id).first()
+        return await self.db.get(Rating, rating_id)
 
-    def get_user_ratings(
+    async def get_user_ratings(
         self,
         user_id: int,
         skip: int = 0,
         limit: int = 20
     ) -> List[Rating]:
         """Obtener las calificaciones de un usuario"""
-        return self.db.query(Rating).filter(
-            Rating.user_id == user_id
-        ).order_by(Rating.created_at.desc()).offset(skip).limit(limit).all()
+        result = await self.db.scalars(
+            select(Rating).where(
+                Rating.user_id == user_id
+            ).order_by(Rating.created_at.desc()).offset(skip).limit(limit)
+        )
+        return list(result)
 
-    def get_business_ratings(
+    async def get_business_ratings(
         self,
         business_id: int,
         skip: int = 0,
@@ -81,34 +148,96 @@ class RatingService:
         filters: Optional[RatingFilter] = None
     ) -> List[Rating]:
         """Obtener las calificaciones de un negocio"""
-        query = self.db.query(Rating).filter(Rating.business_id == business_id)
+        result = await self.db.scalars(
+            self._business_ratings_query(business_id, filters).offset(skip).limit(limit)
+        )
+        return list(result)
+
+    async def get_business_ratings_with_details(
+        self,
+        business_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        filters: Optional[RatingFilter] = None
+    ) -> List[dict]:
+        """Página de calificaciones con imágenes, respuestas y nombres (3 consultas por página)"""
+        result = await self.db.scalars(
+            self._with_details(self._business_ratings_query(business_id, filters)).offset(skip).limit(limit)
+        )
+        return [self._details(rating) for rating in result.unique()]
+
+    async def get_recent_ratings(self, business_id: int) -> List[dict]:
+        """Últimas RECENT_RATINGS_LIMIT calificaciones con detalles, desde la caché del resumen"""
+        ratings = rating_summary_cache.get_recent(business_id)
+        if ratings is None:
+            generation = rating_summary_cache.generation(business_id)
+            ratings = await self.get_business_ratings_with_details(
+                business_id, skip=0, limit=RECENT_RATINGS_LIMIT
+            )
+            rating_summary_cache.set_recent(business_id, ratings, generation)
+        return ratings
+
+    @staticmethod
+    def _business_ratings_query(business_id: int, filters: Optional[RatingFilter] = None):
+        query = select(Rating).where(Rating.business_id == business_id)
 
         if filters:
             if filters.min_rating:
-                query = query.filter(Rating.rating >= filters.min_rating)
+                query = query.where(Rating.rating >= filters.min_rating)
             if filters.max_rating:
-                query = query.filter(Rating.rating <= filters.max_rating)
+                query = query.where(Rating.rating <= filters.max_rating)
             if filters.has_review is not None:
                 if filters.has_review:
-                    query = query.filter(Rating.review.isnot(None))
+                    query = query.where(Rating.review.isnot(None))
                 else:
-                    query = query.filter(Rating.review.is_(None))
+                    query = query.where(Rating.review.is_(None))
             if filters.is_anonymous is not None:
-                query = query.filter(Rating.is_anonymous == filters.is_anonymous)
+                query = query.where(Rating.is_anonymous == filters.is_anonymous)
+
+        return query.order_by(Rating.created_at.desc())
+
+    @staticmethod
+    def _with_details(query):
+        """
+        Cargar en bloque lo que muestra RatingWithDetails: imágenes y respuestas con
+        una consulta IN por relación, autor y negocio en el mismo SELECT (JOIN)
+        """
+        return query.options(
+            selectinload(Rating.images),
+            selectinload(Rating.responses),
+            joinedload(Rating.user).load_only(User.first_name, User.last_name),
+            joinedload(Rating.business).load_only(BusinessProfile.business_name)
+        )
+
+    @staticmethod
+    def _details(rating: Rating) -> dict:
+        user_name = None
+        if not rating.is_anonymous and rating.user:
+            user_name = f"{rating.user.first_name} {rating.user.last_name}"
 
-        return query.order_by(Rating.created_at.desc()).offset(skip).limit(limit).all()
+        return {
+            **{attr.key: getattr(rating, attr.key) for attr in inspect(Rating).column_attrs},
+            # Ya serializadas: el dict puede validarse como RatingWithDetails sin from_attributes
+            "images": [ReviewImageSchema.model_validate(image, from_attributes=True) for image in rating.images],
+            "responses": [
+                RatingResponseSchema.model_validate(response, from_attributes=True)
+                for response in rating.responses
+            ],
+            "user_name": user_name,
+            "business_name": rating.business.business_name if rating.business else None
+        }
 
-    def update_rating(
+    async def update_rating(
         self,
         rating_id: int,
         user_id: int,
         rating_update: RatingUpdate
     ) -> Rating:
         """Actualizar una calificación"""
-        rating = self.db.query(Rating).filter(
+        rating = await self.db.scalar(select(Rating).where(
             Rating.id == rating_id,
             Rating.user_id == user_id
-        ).first()
+        ))
 
         if not rating:
             raise HTTPException(
@@ -124,20 +253,27 @@ class RatingService:
                 detail="Solo se pueden editar calificaciones dentro de las primeras 24 horas"
             )
 
+        previous_business_id, previous_rating = rating.business_id, rating.rating
         for key, value in rating_update.dict(exclude_unset=True).items():
             setattr(rating, key, value)
 
         rating.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(rating)
+        await self.db.commit()
+        if (previous_business_id, previous_rating) != (rating.business_id, rating.rating):
+            rating_summary_cache.adjust(previous_business_id, removed=previous_rating)
+            rating_summary_cache.adjust(rating.business_id, added=rating.rating)
+        else:
+            # Reseña o anonimato: solo cambian las calificaciones recientes
+            rating_summary_cache.invalidate(rating.business_id)
+        await self.db.refresh(rating)
         return rating
 
-    def delete_rating(self, rating_id: int, user_id: int) -> bool:
+    async def delete_rating(self, rating_id: int, user_id: int) -> bool:
         """Eliminar una calificación"""
-        rating = self.db.query(Rating).filter(
+        rating = await self.db.scalar(select(Rating).where(
             Rating.id == rating_id,
             Rating.user_id == user_id
-        ).first()
+        ))
 
         if not rating:
             raise HTTPException(
@@ -145,45 +281,54 @@ class RatingService:
                 detail="Calificación no encontrada"
             )
 
-        self.db.delete(rating)
-        self.db.commit()
+        await self.db.delete(rating)
+        await self.db.commit()
+        rating_summary_cache.adjust(rating.business_id, removed=rating.rating)
         return True
 
-    def get_business_rating_summary(self, business_id: int) -> dict:
-        """Obtener resumen de calificaciones de un negocio"""
-        # Calcular promedio y total
-        result = self.db.query(
-            func.avg(Rating.rating).label('average_rating'),
-            func.count(Rating.id).label('total_ratings')
-        ).filter(Rating.business_id == business_id).first()
-
-        # Calcular distribución de calificaciones
-        distribution = {}
-        for i in range(1, 6):
-            count = self.db.query(Rating).filter(
-                Rating.business_id == business_id,
-                Rating.rating == i
-            ).count()
-            distribution[i] = count
+    async def get_rating_histogram(self, business_id: int) -> Dict[int, int]:
+        """Cantidad de calificaciones por estrella, en una sola consulta GROUP BY"""
+        generation = rating_summary_cache.generation(business_id)
+        rows = await self.db.execute(
+            select(Rating.rating, func.count(Rating.id))
+            .where(Rating.business_id == business_id)
+            .group_by(Rating.rating)
+        )
+        histogram = {stars: 0 for stars in STAR_VALUES}
+        histogram.update({stars: count for stars, count in rows})
+        rating_summary_cache.set(business_id, histogram, generation)
+        return histogram
+
+    async def get_business_rating_summary(self, business_id: int) -> dict:
+        """Obtener resumen de calificaciones de un negocio (promedio, total y distribución)"""
+        histogram = rating_summary_cache.get(business_id)
+        if histogram is None:
+            histogram = await self.get_rating_histogram(business_id)
+
+        total_ratings = sum(histogram.values())
+        average_rating = (
+            sum(stars * count for stars, count in histogram.items()) / total_ratings
+            if total_ratings else 0.0
+        )
 
         return {
             "business_id": business_id,
-            "average_rating": float(result.average_rating) if result.average_rating else 0.0,
-            "total_ratings": result.total_ratings,
-            "rating_distribution": distribution
+            "average_rating": float(average_rating),
+            "total_ratings": total_ratings,
+            "rating_distribution": {stars: histogram.get(stars, 0) for stars in STAR_VALUES}
         }
 
-    def add_review_image(
+    async def add_review_image(
         self,
         rating_id: int,
         user_id: int,
         image_url: str
     ) -> ReviewImage:
         """Agregar imagen a una reseña"""
-        rating = self.db.query(Rating).filter(
+        rating = await self.db.scalar(select(Rating).where(
             Rating.id == rating_id,
             Rating.user_id == user_id
-        ).first()
+        ))
 
         if not rating:
             raise HTTPException(
@@ -196,21 +341,22 @@ class RatingService:
             image_url=image_url
         )
         self.db.add(review_image)
-        self.db.commit()
-        self.db.refresh(review_image)
+        await self.db.commit()
+        rating_summary_cache.invalidate(rating.business_id)
+        await self.db.refresh(review_image)
         return review_image
 
-    def create_rating_response(
+    async def create_rating_response(
         self,
         rating_id: int,
         business_id: int,
         response: str
     ) -> RatingResponse:
         """Crear respuesta del negocio a una calificación"""
-        rating = self.db.query(Rating).filter(
+        rating = await self.db.scalar(select(Rating).where(
             Rating.id == rating_id,
             Rating.business_id == business_id
-        ).first()
+        ))
 
         if not rating:
             raise HTTPException(
@@ -219,9 +365,9 @@ class RatingService:
             )
 
         # Verificar que no existe una respuesta previa
-        existing_response = self.db.query(RatingResponse).filter(
+        existing_response = await self.db.scalar(select(RatingResponse).where(
             RatingResponse.rating_id == rating_id
-        ).first()
+        ).limit(1))
 
         if existing_response:
             raise HTTPException(
@@ -235,41 +381,16 @@ class RatingService:
             response=response
         )
         self.db.add(rating_response)
-        self.db.commit()
-        self.db.refresh(rating_response)
+        await self.db.commit()
+        rating_summary_cache.invalidate(business_id)
+        await self.db.refresh(rating_response)
         return rating_response
 
-    def get_rating_with_details(self, rating_id: int) -> Optional[dict]:
+    async def get_rating_with_details(self, rating_id: int) -> Optional[dict]:
         """Obtener calificación con detalles completos"""
-        rating = self.db.query(Rating).filter(Rating.id == rating_id).first()
+        rating = (await self.db.scalars(
+            self._with_details(select(Rating).where(Rating.id == rating_id))
+        )).unique().first()
         if not rating:
             return None
-
-        # Obtener imágenes
-        images = self.db.query(ReviewImage).filter(
-            ReviewImage.rating_id == rating_id
-        ).all()
-
-        # Obtener respuestas
-        responses = self.db.query(RatingResponse).filter(
-            RatingResponse.rating_id == rating_id
-        ).all()
-
-        # Obtener nombres
-        user_name = None
-        if not rating.is_anonymous:
-            user = self.db.query(User).filter(User.id == rating.user_id).first()
-            user_name = f"{user.first_name} {user.last_name}" if user else None
-
-        business = self.db.query(BusinessProfile).filter(
-            BusinessProfile.id == rating.business_id
-        ).first()
-        business_name = business.business_name if business else None
-
-        return {
-            **rating.__dict__,
-            "images": [img.__dict__ for img in images],
-            "responses": [resp.__dict__ for resp in responses],
-            "user_name": user_name,
-            "business_name": business_name
-        } 
\ No newline at end of file
+        return self._details(rating)
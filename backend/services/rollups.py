@@ -0,0 +1,236 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import and_, case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from config import ROLLUP_REFRESH_INTERVAL, ROLLUP_WATERMARK_LAG
+from database.database import async_session
+from database.models import (
+    DailyBusinessMetrics, Delivery, RollupWatermark, Service, Transaction, PaymentStatus
+)
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "daily_business_metrics"
+
+# Última modificación de cada fila original. deliveries no tiene updated_at:
+# el único cambio que altera sus agregados (pasar a completed) fija completed_at.
+# Cada expresión tiene su índice (ix_transactions_changed_at, ix_deliveries_changed_at)
+CHANGED_AT = {
+    Transaction: func.coalesce(Transaction.updated_at, Transaction.created_at),
+    Delivery: func.coalesce(Delivery.completed_at, Delivery.created_at),
+}
+
+
+def changed_days_query(model, since: Optional[datetime], until: datetime) -> Select:
+    """Días (de creación) de las filas de `model` modificadas en (since, until]"""
+    changed_at = CHANGED_AT[model]
+    query = select(func.date(model.created_at)).where(changed_at <= until).distinct()
+    if since is not None:
+        query = query.where(changed_at > since)
+    return query
+
+
+def _as_date(value) -> date:
+    # func.date() devuelve date en PostgreSQL y 'YYYY-MM-DD' en SQLite
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _epoch(column):
+    return func.extract('epoch', column)
+
+
+def _consecutive_runs(days: List[date]) -> List[Tuple[date, date]]:
+    """[d1, d2, d3, d7] -> [(d1, d3), (d7, d7)] (días ya ordenados)"""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+class DailyRollupService:
+    """
+    Mantiene daily_business_metrics a partir de transactions y deliveries.
+    Cada pasada busca las filas modificadas desde la marca de agua
+    (CHANGED_AT), recalcula completos los días que tocan
+    y avanza la marca. Recalcular el día entero hace la pasada idempotente;
+    los borrados físicos no dejan rastro y requieren rebuild().
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def refresh(self) -> int:
+        """Recalcular los días con cambios desde la última pasada; retorna días recalculados"""
+        until = datetime.utcnow() - timedelta(seconds=ROLLUP_WATERMARK_LAG)
+        watermark = await self.db.get(RollupWatermark, WATERMARK_NAME)
+        if watermark is None:
+            days = await self._days_between(None, until)
+            watermark = RollupWatermark(name=WATERMARK_NAME, value=until)
+            self.db.add(watermark)
+        else:
+            if until <= watermark.value:
+                return 0
+            days = await self._days_between(watermark.value, until)
+            watermark.value = until
+
+        await self._recompute(days)
+        await self.db.commit()
+        if days:
+            logger.info("Agregados diarios recalculados para %s días", len(days))
+        return len(days)
+
+    async def rebuild(self, start_date: date, end_date: date) -> int:
+        """Recalcular un rango de días completo (p.ej. tras borrados o correcciones manuales)"""
+        days = {start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)}
+        await self._recompute(days)
+        await self.db.commit()
+        return len(days)
+
+    async def _days_between(self, since: Optional[datetime], until: datetime) -> Set[date]:
+        """Días (de creación) de las filas modificadas en (since, until]"""
+        days: Set[date] = set()
+        for model in CHANGED_AT:
+            rows = await self.db.scalars(changed_days_query(model, since, until))
+            days.update(_as_date(day) for day in rows if day is not None)
+        return days
+
+    async def _recompute(self, days: Iterable[date]):
+        days = sorted(days)
+        if not days:
+            return
+        rows: Dict[Tuple[int, date], dict] = defaultdict(dict)
+        # Un par de consultas por tramo de días consecutivos, acotadas por created_at
+        for first, last in _consecutive_runs(days):
+            await self._aggregate(
+                datetime.combine(first, datetime.min.time()),
+                datetime.combine(last + timedelta(days=1), datetime.min.time()),
+                rows
+            )
+
+        await self.db.execute(delete(DailyBusinessMetrics).where(DailyBusinessMetrics.day.in_(days)))
+        self.db.add_all([
+            DailyBusinessMetrics(
+                business_id=business, day=day,
+                revenue=values.get("revenue", 0.0),
+                transactions=values.get("transactions", 0),
+                deliveries=values.get("deliveries", 0),
+                completed_deliveries=values.get("completed_deliveries", 0),
+                delivery_hours=values.get("delivery_hours", 0.0),
+                timed_deliveries=values.get("timed_deliveries", 0)
+            )
+            for (business, day), values in rows.items()
+        ])
+        await self.db.flush()
+
+    async def _aggregate(self, start: datetime, end: datetime, rows: Dict[Tuple[int, date], dict]):
+        business_id = Transaction.business_id
+        transaction_day = func.date(Transaction.created_at)
+        revenue = await self.db.execute(select(
+            business_id.label("business_id"),
+            transaction_day.label("day"),
+            func.sum(Transaction.amount).label("revenue"),
+            func.count(Transaction.id).label("transactions")
+        ).where(
+            Transaction.status == PaymentStatus.COMPLETED,
+            business_id.isnot(None),
+            Transaction.created_at >= start,
+            Transaction.created_at < end
+        ).group_by(business_id, transaction_day))
+        for row in revenue:
+            rows[(row.business_id, _as_date(row.day))].update(
+                revenue=row.revenue or 0.0, transactions=row.transactions
+            )
+
+        completed = Delivery.status == "completed"
+        timed = and_(completed, Delivery.completed_at.isnot(None))
+        delivery_day = func.date(Delivery.created_at)
+        deliveries = await self.db.execute(select(
+            Service.business_profile_id.label("business_id"),
+            delivery_day.label("day"),
+            func.count(Delivery.id).label("deliveries"),
+            func.count(Delivery.id).filter(completed).label("completed_deliveries"),
+            func.sum(case(
+                (timed, (_epoch(Delivery.completed_at) - _epoch(Delivery.created_at)) / 3600)
+            )).label("delivery_hours"),
+            func.count(Delivery.id).filter(timed).label("timed_deliveries")
+        ).join(Service, Delivery.service_id == Service.id).where(
+            Service.business_profile_id.isnot(None),
+            Delivery.created_at >= start,
+            Delivery.created_at < end
+        ).group_by(Service.business_profile_id, delivery_day))
+        for row in deliveries:
+            rows[(row.business_id, _as_date(row.day))].update(
+                deliveries=row.deliveries,
+                completed_deliveries=row.completed_deliveries,
+                delivery_hours=row.delivery_hours or 0.0,
+                timed_deliveries=row.timed_deliveries
+            )
+
+    async def daily_revenue(self, business_id: int, start_date: date, end_date: date) -> List[DailyBusinessMetrics]:
+        result = await self.db.scalars(select(DailyBusinessMetrics).where(
+            DailyBusinessMetrics.business_id == business_id,
+            DailyBusinessMetrics.day >= start_date,
+            DailyBusinessMetrics.day <= end_date,
+            DailyBusinessMetrics.transactions > 0
+        ).order_by(DailyBusinessMetrics.day))
+        return list(result)
+
+    async def totals(self, business_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None):
+        """Sumas de todas las columnas en el rango (todo el historial si no se indica)"""
+        query = select(
+            func.coalesce(func.sum(DailyBusinessMetrics.revenue), 0.0).label("revenue"),
+            func.coalesce(func.sum(DailyBusinessMetrics.deliveries), 0).label("deliveries"),
+            func.coalesce(func.sum(DailyBusinessMetrics.completed_deliveries), 0).label("completed_deliveries"),
+            func.coalesce(func.sum(DailyBusinessMetrics.delivery_hours), 0.0).label("delivery_hours"),
+            func.coalesce(func.sum(DailyBusinessMetrics.timed_deliveries), 0).label("timed_deliveries")
+        ).where(DailyBusinessMetrics.business_id == business_id)
+        if start_date is not None:
+            query = query.where(DailyBusinessMetrics.day >= start_date)
+        if end_date is not None:
+            query = query.where(DailyBusinessMetrics.day <= end_date)
+        return (await self.db.execute(query)).one()
+
+
+class DailyRollupJob:
+    """Tarea en segundo plano que ejecuta DailyRollupService.refresh() periódicamente"""
+
+    def __init__(self, interval: float = ROLLUP_REFRESH_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        async with async_session() as db:
+            return await DailyRollupService(db).refresh()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Error actualizando los agregados diarios")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+rollup_job = DailyRollupJob()
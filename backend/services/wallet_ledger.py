@@ -0,0 +1,133 @@
+from typing import List, Optional
+import asyncio
+import logging
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from config import WALLET_LEDGER_VERIFY_INTERVAL, WALLET_LEDGER_TOLERANCE
+from database.database import async_session
+from database.models import Wallet, WalletLedgerEntry
+
+logger = logging.getLogger(__name__)
+
+
+class WalletLedgerService:
+    """
+    Movimientos de saldo como un único UPDATE condicional más un asiento en
+    wallet_ledger, dentro de la transacción del llamador. El saldo nunca se lee
+    en Python, así que escritores concurrentes no pierden actualizaciones y un
+    débito sin fondos no afecta ninguna fila.
+    Con AsyncSession: `await db.run_sync(lambda s: WalletLedgerService(s).credit(...))`.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def credit(self, wallet_id: int, amount: float, entry_type: str, transaction_id: Optional[int] = None) -> float:
+        """Abonar `amount`; retorna el saldo resultante"""
+        return self._apply(wallet_id, amount, entry_type, transaction_id)
+
+    def debit(self, wallet_id: int, amount: float, entry_type: str, transaction_id: Optional[int] = None) -> float:
+        """Debitar `amount` solo si hay saldo suficiente (400 si no); retorna el saldo resultante"""
+        return self._apply(wallet_id, -amount, entry_type, transaction_id)
+
+    def _apply(self, wallet_id: int, delta: float, entry_type: str, transaction_id: Optional[int]) -> float:
+        current = func.coalesce(Wallet.balance, 0.0)
+        statement = update(Wallet).where(Wallet.id == wallet_id)
+        if delta < 0:
+            statement = statement.where(current >= -delta)
+        balance = self.db.execute(
+            statement.values(balance=current + delta)
+            .returning(Wallet.balance)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if balance is None:
+            if delta < 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Saldo insuficiente"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Billetera no encontrada"
+            )
+
+        self.db.execute(insert(WalletLedgerEntry).values(
+            wallet_id=wallet_id,
+            transaction_id=transaction_id,
+            amount=delta,
+            balance_after=balance,
+            entry_type=entry_type
+        ))
+        # La Wallet ya cargada en la sesión refleja el saldo escrito por la base de datos
+        wallet = self.db.identity_map.get(identity_key(Wallet, wallet_id))
+        if wallet is not None:
+            set_committed_value(wallet, "balance", balance)
+        return balance
+
+    def mismatches(self, tolerance: float = WALLET_LEDGER_TOLERANCE) -> List[dict]:
+        """Billeteras cuyo saldo no coincide con la suma de su libro mayor (una sola consulta)"""
+        ledger = (
+            select(WalletLedgerEntry.wallet_id, func.sum(WalletLedgerEntry.amount).label("total"))
+            .group_by(WalletLedgerEntry.wallet_id)
+            .subquery()
+        )
+        balance = func.coalesce(Wallet.balance, 0.0)
+        total = func.coalesce(ledger.c.total, 0.0)
+        rows = self.db.execute(
+            select(Wallet.id, balance.label("balance"), total.label("ledger_total"))
+            .outerjoin(ledger, ledger.c.wallet_id == Wallet.id)
+            .where(func.abs(balance - total) > tolerance)
+        )
+        return [
+            {"wallet_id": row.id, "balance": row.balance, "ledger_total": row.ledger_total}
+            for row in rows
+        ]
+
+
+class WalletLedgerVerifier:
+    """Tarea en segundo plano que compara periódicamente saldos contra el libro mayor"""
+
+    def __init__(self, interval: float = WALLET_LEDGER_VERIFY_INTERVAL):
+        self.interval = interval
+        self.last_mismatches: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> List[dict]:
+        async with async_session() as db:
+            mismatches = await db.run_sync(lambda session: WalletLedgerService(session).mismatches())
+        self.last_mismatches = mismatches
+        for mismatch in mismatches:
+            logger.error(
+                "Billetera %s: saldo %s distinto del libro mayor %s",
+                mismatch["wallet_id"], mismatch["balance"], mismatch["ledger_total"]
+            )
+        return mismatches
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Error verificando el libro mayor de billeteras")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+ledger_verifier = WalletLedgerVerifier()